@@ -1,23 +1,37 @@
 from django.views.generic import TemplateView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
-from django.db.models import Sum, Count, F
-from django.db.models.functions import TruncDay, TruncWeek, TruncMonth, TruncQuarter, TruncYear
+from django.db.models import Sum, Count, F, Q
 from django.utils import timezone
 from booking.models import Booking
 from accounts.models import User
 from tenants.utils import has_tenant_permission
 from django.shortcuts import redirect
+from django.http import JsonResponse
+from django.template.loader import render_to_string
+from django.contrib import messages
+from django.urls import reverse
+from core.models import Notification
+from core.notifications import notify_many
+from core.tasks import run_in_background
 import datetime
-from services.models import GuestOrder
-from events.models import EventBooking
-from gym.models import GymMembership
 from core.models import TenantSetting
-import os
-import tempfile
+from analytics.models import DailyTenantStats
+from analytics.cache import cached_stats, get_data_version, get_stats_cache, is_shared_stats_cache, peek_stats, stats_key
+from analytics.revenue import RevenueService
+from analytics.kpis import compute_kpis
+from analytics.rollups import GRANULARITIES, get_rollup, get_rollups, window_start
 
 import json
 from django.core.serializers.json import DjangoJSONEncoder
 
+Stream = DailyTenantStats.Stream
+
+# Buckets per table in the PDF/Excel exports
+REPORT_BUCKETS = {'daily': 30, 'weekly': 12, 'monthly': 12, 'quarterly': 4, 'yearly': 5}
+
+# Window for the KPI cards
+KPI_DAYS = 30
+
 class HotelStatisticsView(LoginRequiredMixin, UserPassesTestMixin, TemplateView):
     template_name = 'analytics/hotel_statistics.html'
 
@@ -27,36 +41,40 @@ class HotelStatisticsView(LoginRequiredMixin, UserPassesTestMixin, TemplateView)
         if not tenant: return False
         return has_tenant_permission(self.request.user, tenant, ['ADMIN', 'MANAGER'])
 
+    def get(self, request, *args, **kwargs):
+        # AJAX period switch: only the requested period's trend and tables
+        if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+            context = self.get_cached_period_context(request.GET.get('period', 'all'))
+            tables_html = render_to_string('analytics/partials/tables.html', context, request=request)
+            return JsonResponse({
+                'chart_labels': context['chart_labels_list'],
+                'chart_values': context['chart_values_list'],
+                'tables_html': tables_html
+            })
+        return super().get(request, *args, **kwargs)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
+        context.update(cached_stats(self.request.tenant, 'overview', self.get_overview_context))
+        context.update(self.get_cached_period_context(self.request.GET.get('period', 'all')))
+        return context
+
+    def get_overview_context(self):
         tenant = self.request.tenant
-        now = timezone.now()
-        
-        # Base QuerySets
+        context = {}
+
         bookings = Booking.objects.filter(tenant=tenant)
-        orders = GuestOrder.objects.filter(booking__tenant=tenant).exclude(status='CANCELLED')
-        events = EventBooking.objects.filter(hall__tenant=tenant).exclude(status='CANCELLED')
-        gym_memberships = GymMembership.objects.filter(plan__tenant=tenant).exclude(status='CANCELLED')
-        
+
         # 1. Overview Cards (Total Lifetime)
-        # Note: Ideally we should use Payment model for cash flow, but aggregated model sums work for accrued revenue
-        
-        room_revenue = bookings.aggregate(total=Sum('total_price'))['total'] or 0
-        service_revenue = orders.aggregate(total=Sum('total_price'))['total'] or 0
-        event_revenue = events.aggregate(total=Sum('total_price'))['total'] or 0
-        
-        # Gym revenue calculation (price is on Plan)
-        # We need to sum plan.price for all memberships
-        gym_revenue = 0
-        for m in gym_memberships:
-            if m.plan:
-                gym_revenue += m.plan.price
-        
-        total_revenue = room_revenue + service_revenue + event_revenue + gym_revenue
-        
-        context['total_sales'] = total_revenue
+        revenue = RevenueService(tenant).booked()
+        room_revenue = revenue.rooms
+        service_revenue = revenue.services
+        event_revenue = revenue.events
+        gym_revenue = revenue.gym
+
+        context['total_sales'] = revenue.total
         context['total_guests'] = bookings.values('guest_email').distinct().count()
-        context['total_bookings'] = bookings.count()
+        context['total_bookings'] = revenue.counts[Stream.ROOMS]
         
         # Revenue Breakdown for Charts
         revenue_breakdown = {
@@ -68,99 +86,64 @@ class HotelStatisticsView(LoginRequiredMixin, UserPassesTestMixin, TemplateView)
         context['revenue_breakdown'] = revenue_breakdown
         context['revenue_breakdown_json'] = json.dumps(revenue_breakdown, cls=DjangoJSONEncoder)
         
-        # 2. Aggregations (Sales & Guests)
-        # We will focus on Booking trends for the main graphs as combining all temporal data is complex for this scope
-        # unless we use a unified Transaction model.
-        
-        # Helper to get data
-        def get_aggregated_data(trunc_func, date_field='created_at'):
-            return bookings.annotate(
-                period=trunc_func(date_field)
-            ).values('period').annotate(
-                sales=Sum('total_price'),
-                guests=Count('id') 
-            ).order_by('period') # Chronological order for charts
-
-        # Per Day (Last 30 Days)
-        daily_stats = list(get_aggregated_data(TruncDay))[-30:]
-        context['daily_stats'] = daily_stats[::-1] # Reverse for table (Newest first)
-        
-        # Per Week (Last 12 Weeks)
-        weekly_stats = list(get_aggregated_data(TruncWeek))[-12:]
-        context['weekly_stats'] = weekly_stats[::-1]
-        
-        # Per Month (Last 12 Months)
-        monthly_stats = list(get_aggregated_data(TruncMonth))[-12:]
-        context['monthly_stats'] = monthly_stats[::-1]
-        
-        # Per Quarter
-        quarterly_stats = list(get_aggregated_data(TruncQuarter))[-8:]
-        context['quarterly_stats'] = quarterly_stats[::-1]
-        
-        # Per Year
-        yearly_stats = list(get_aggregated_data(TruncYear))
-        context['yearly_stats'] = yearly_stats[::-1]
-        
-        # Filter Logic
-        period = self.request.GET.get('period', 'all')
-        context['selected_period'] = period
-        
-        # Prepare Chart Data
-        # 1. Revenue Breakdown
         context['breakdown_labels'] = json.dumps(['Room Bookings', 'Room Service', 'Events', 'Gym'])
         context['breakdown_values'] = json.dumps([
             float(room_revenue), float(service_revenue), float(event_revenue), float(gym_revenue)
         ])
-        
-        # 2. Sales Trend
-        # Select data based on filter, default to daily (last 30 days) if 'all' or 'daily'
-        trend_data = context['daily_stats']
-        trend_label_fmt = '%Y-%m-%d'
-        
-        if period == 'weekly': 
-            trend_data = context['weekly_stats']
-            trend_label_fmt = 'Week %W'
-        elif period == 'monthly': 
-            trend_data = context['monthly_stats']
-            trend_label_fmt = '%b %Y'
-        elif period == 'quarterly': 
-            trend_data = context['quarterly_stats']
-            trend_label_fmt = 'Q%q %Y' # Custom handling needed for JS usually, but simple strftime fallback
-        elif period == 'yearly': 
-            trend_data = context['yearly_stats']
-            trend_label_fmt = '%Y'
-            
-        # Prepare lists (reverse to show chronological order left-to-right)
+
+        # Room KPIs for the last 30 days (NumPy engine)
+        context['kpis'] = compute_kpis(tenant, days=KPI_DAYS)
+        return context
+
+    def get_cached_period_context(self, period):
+        # 2. Sales Trend & Tables
+        if period not in GRANULARITIES:
+            period = 'all'
+        return cached_stats(self.request.tenant, f'period:{period}', lambda: self.get_period_context(period))
+
+    def get_period_context(self, period):
+        """
+        Trend chart and table data for the selected period. Each granularity is
+        a date-bounded rollup, and only the ones the page shows are computed.
+        """
+        if period not in GRANULARITIES:
+            period = 'all'
+        tenant = self.request.tenant
+
+        # 'all' shows every table with the daily trend chart
+        periods = list(GRANULARITIES) if period == 'all' else [period]
+        rollups = get_rollups(tenant, periods)
+
+        context = {'selected_period': period}
+        for name, rows in rollups.items():
+            context[f'{name}_stats'] = rows[::-1] # Newest first for tables
+
+        trend_period = 'daily' if period == 'all' else period
         chart_labels = []
         chart_values = []
-        
-        for item in reversed(trend_data):
-            # Format label
-            d = item['period']
-            if period == 'quarterly':
-                q = (d.month - 1) // 3 + 1
-                lbl = f"Q{q} {d.year}"
-            elif period == 'weekly':
-                lbl = f"W{d.strftime('%W')} {d.year}"
-            else:
-                lbl = d.strftime(trend_label_fmt)
-            
-            chart_labels.append(lbl)
+        for item in rollups[trend_period]:
+            chart_labels.append(format_period_label(item['period'], trend_period))
             chart_values.append(float(item['sales'] or 0))
-            
+
+        context['chart_labels_list'] = chart_labels
+        context['chart_values_list'] = chart_values
         context['chart_labels'] = json.dumps(chart_labels)
         context['chart_values'] = json.dumps(chart_values)
-        
-        if self.request.headers.get('x-requested-with') == 'XMLHttpRequest':
-            tables_html = render_to_string('analytics/partials/tables.html', context, request=self.request)
-            return JsonResponse({
-                'chart_labels': chart_labels,
-                'chart_values': chart_values,
-                'tables_html': tables_html
-            })
-        
         return context
 
+
+def format_period_label(d, period):
+    if period == 'quarterly':
+        q = (d.month - 1) // 3 + 1
+        return f"Q{q} {d.year}"
+    if period == 'weekly':
+        return f"W{d.strftime('%W')} {d.year}"
+    if period == 'monthly':
+        return d.strftime('%b %Y')
+    if period == 'yearly':
+        return d.strftime('%Y')
+    return d.strftime('%Y-%m-%d')
+
 from django.http import HttpResponse
 from fpdf import FPDF
 import io
@@ -180,35 +163,91 @@ def download_statistics_report(request):
 
     # Get Filter
     period_filter = request.GET.get('period', 'all')
+    if period_filter not in REPORT_BUCKETS:
+        period_filter = 'all'
 
-    # Gather Data
-    bookings = Booking.objects.filter(tenant=tenant)
-    orders = GuestOrder.objects.filter(booking__tenant=tenant).exclude(status='CANCELLED')
-    events = EventBooking.objects.filter(hall__tenant=tenant).exclude(status='CANCELLED')
-    gym_memberships = GymMembership.objects.filter(plan__tenant=tenant).exclude(status='CANCELLED')
-    
+    name = f'pdf:{period_filter}'
+    version = request.GET.get('version', '')
+    pdf_content = get_stats_cache().get(stats_key(tenant, name, version=version)) if version.isdigit() else None
+
+    if pdf_content is None:
+        # Large reports are rendered by a background job, which notifies the user when ready.
+        # The PDF is handed back through the stats cache, so that must be shared between processes.
+        version = get_data_version(tenant)
+        if peek_stats(tenant, name) is None and is_shared_stats_cache() and is_large_report(tenant, period_filter):
+            if get_stats_cache().add(f"{stats_key(tenant, name, version=version)}:pending", True, timeout=600):
+                run_in_background(render_statistics_pdf_in_background, tenant.pk, period_filter, request.user.pk, version)
+            messages.info(request, "Your report is being prepared. You'll get a notification with the download link when it's ready.")
+            return redirect('hotel_statistics')
+        pdf_content = cached_stats(tenant, name, lambda: build_statistics_pdf(tenant, period_filter))
+
+    response = HttpResponse(pdf_content, content_type='application/pdf')
+    filename = f"Statistics_{period_filter}_{timezone.localdate()}.pdf"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def is_large_report(tenant, period_filter):
+    """
+    True when the report's tables cover more fact rows than
+    STATISTICS_PDF_BACKGROUND_ROWS; that is what the rollups scan and render.
+    """
+    from django.conf import settings
+    threshold = getattr(settings, 'STATISTICS_PDF_BACKGROUND_ROWS', 1000)
+    periods = list(REPORT_BUCKETS) if period_filter not in REPORT_BUCKETS else [period_filter]
+    rows = DailyTenantStats.objects.filter(tenant=tenant, stream=Stream.ROOMS).aggregate(**{
+        period: Count('id', filter=Q(date__gte=window_start(period, REPORT_BUCKETS[period])))
+        for period in periods
+    })
+    return sum(rows.values()) > threshold
+
+
+def render_statistics_pdf_in_background(tenant_id, period_filter, user_id, version):
+    """
+    Renders and caches the PDF under the data version it was requested at. The
+    notification links to that version, so writes made meanwhile don't send
+    the user round again.
+    """
+    from tenants.models import Tenant
+
+    tenant = Tenant.objects.get(pk=tenant_id)
+    name = f'pdf:{period_filter}'
+    try:
+        cached_stats(tenant, name, lambda: build_statistics_pdf(tenant, period_filter), version=version)
+    finally:
+        get_stats_cache().delete(f"{stats_key(tenant, name, version=version)}:pending")
+
+    notify_many(
+        tenant,
+        "Statistics report ready",
+        f"Your {period_filter} statistics report is ready to download.",
+        users=[user_id],
+        notification_type=Notification.Type.SUCCESS,
+        link=f"{reverse('download_statistics_report')}?period={period_filter}&version={version}",
+    )
+
+
+def build_statistics_pdf(tenant, period_filter):
+    """
+    Renders the statistics report for `period_filter` ('all' or a REPORT_BUCKETS key) to PDF bytes, in memory.
+    """
     # Financials
-    room_revenue = float(bookings.aggregate(total=Sum('total_price'))['total'] or 0)
-    service_revenue = float(orders.aggregate(total=Sum('total_price'))['total'] or 0)
-    event_revenue = float(events.aggregate(total=Sum('total_price'))['total'] or 0)
-    gym_revenue = float(sum(m.plan.price for m in gym_memberships if m.plan))
-    total_sales = room_revenue + service_revenue + event_revenue + gym_revenue
-    total_bookings = bookings.count()
-    
-    # Helper
-    def get_data(trunc_func):
-        return bookings.annotate(
-            period=trunc_func('created_at')
-        ).values('period').annotate(
-            sales=Sum('total_price'),
-            guests=Count('id')
-        ).order_by('-period')
-
-    daily = get_data(TruncDay)[:30]
-    weekly = get_data(TruncWeek)[:12]
-    monthly = get_data(TruncMonth)[:12]
-    quarterly = get_data(TruncQuarter)[:4]
-    yearly = get_data(TruncYear)[:5]
+    revenue = RevenueService(tenant).booked()
+    room_revenue = float(revenue.rooms)
+    service_revenue = float(revenue.services)
+    event_revenue = float(revenue.events)
+    gym_revenue = float(revenue.gym)
+    total_sales = float(revenue.total)
+    total_bookings = revenue.counts[Stream.ROOMS]
+    
+    # Date-bounded rollups, only for the periods in this report (newest first)
+    periods = list(REPORT_BUCKETS) if period_filter not in REPORT_BUCKETS else [period_filter]
+    rollups = {name: rows[::-1] for name, rows in get_rollups(tenant, periods, buckets=REPORT_BUCKETS).items()}
+    daily = rollups.get('daily', [])
+    weekly = rollups.get('weekly', [])
+    monthly = rollups.get('monthly', [])
+    quarterly = rollups.get('quarterly', [])
+    yearly = rollups.get('yearly', [])
     
     # PDF Generation
     # Get Theme Settings
@@ -529,24 +568,8 @@ def download_statistics_report(request):
             pdf.set_draw_color(230, 230, 230)
             pdf.line(10, pdf.get_y(), 200, pdf.get_y())
     
-    # Output
-    # FIX: Remove .encode('latin-1') because pdf.output(dest='S') returns bytearray in newer FPDF versions
-    
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_pdf:
-        tmp_pdf_path = tmp_pdf.name
-
-    try:
-        pdf.output(name=tmp_pdf_path, dest='F')
-        with open(tmp_pdf_path, 'rb') as f:
-            pdf_content = f.read()
-            
-        response = HttpResponse(pdf_content, content_type='application/pdf')
-        filename = f"Statistics_{period_filter}_{timezone.now().date()}.pdf"
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        return response
-    finally:
-        if os.path.exists(tmp_pdf_path):
-            os.unlink(tmp_pdf_path)
+    # Output (fpdf2 returns a bytearray when no file name is given)
+    return bytes(pdf.output())
 
 import openpyxl
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
@@ -567,18 +590,26 @@ def download_statistics_excel(request):
         
     # Get Filter
     period_filter = request.GET.get('period', 'all')
+    if period_filter not in REPORT_BUCKETS:
+        period_filter = 'all'
 
-    # Gather Data
-    bookings = Booking.objects.filter(tenant=tenant)
-    orders = GuestOrder.objects.filter(booking__tenant=tenant).exclude(status='CANCELLED')
-    events = EventBooking.objects.filter(hall__tenant=tenant).exclude(status='CANCELLED')
-    gym_memberships = GymMembership.objects.filter(plan__tenant=tenant).exclude(status='CANCELLED')
-    
-    room_revenue = bookings.aggregate(total=Sum('total_price'))['total'] or 0
-    service_revenue = orders.aggregate(total=Sum('total_price'))['total'] or 0
-    event_revenue = events.aggregate(total=Sum('total_price'))['total'] or 0
-    gym_revenue = sum(m.plan.price for m in gym_memberships if m.plan)
-    total_sales = room_revenue + service_revenue + event_revenue + gym_revenue
+    content = cached_stats(tenant, f'excel:{period_filter}', lambda: build_statistics_excel(tenant, period_filter))
+    response = HttpResponse(content, content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    filename = f"Statistics_{period_filter}_{timezone.localdate()}.xlsx"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def build_statistics_excel(tenant, period_filter):
+    """
+    Builds the statistics workbook for `period_filter` and returns the .xlsx bytes.
+    """
+    revenue = RevenueService(tenant).booked()
+    room_revenue = revenue.rooms
+    service_revenue = revenue.services
+    event_revenue = revenue.events
+    gym_revenue = revenue.gym
+    total_sales = revenue.total
     
     # Create Workbook
     wb = openpyxl.Workbook()
@@ -701,7 +732,7 @@ def download_statistics_excel(request):
     row += 3
     
     # --- Helper for Data Tables ---
-    def add_excel_table(title, qs, period_trunc, date_fmt):
+    def add_excel_table(title, period, date_fmt):
         nonlocal row, chart_counter
         start_row = row
         ws.merge_cells(f'A{row}:C{row}')
@@ -721,18 +752,7 @@ def download_statistics_excel(request):
             cell.alignment = center_align
         row += 1
         
-        stats = bookings.annotate(
-            period=period_trunc('created_at')
-        ).values('period').annotate(
-            sales=Sum('total_price'),
-            guests=Count('id')
-        ).order_by('-period')
-        
-        if 'Day' in str(period_trunc): stats = stats[:30]
-        elif 'Week' in str(period_trunc): stats = stats[:12]
-        elif 'Month' in str(period_trunc): stats = stats[:12]
-        elif 'Quarter' in str(period_trunc): stats = stats[:4]
-        elif 'Year' in str(period_trunc): stats = stats[:5]
+        stats = get_rollup(tenant, period, buckets=REPORT_BUCKETS[period])[::-1]
         
         data_start_row = row
         count = 0
@@ -803,19 +823,19 @@ def download_statistics_excel(request):
 
     # --- Daily Stats ---
     if period_filter in ['all', 'daily']:
-        add_excel_table("Daily Room Stats (Last 30 Days)", bookings, TruncDay, "%Y-%m-%d")
+        add_excel_table("Daily Room Stats (Last 30 Days)", 'daily', "%Y-%m-%d")
     
     if period_filter in ['all', 'weekly']:
-        add_excel_table("Weekly Room Stats (Last 12 Weeks)", bookings, TruncWeek, "Week %W, %Y")
+        add_excel_table("Weekly Room Stats (Last 12 Weeks)", 'weekly', "Week %W, %Y")
         
     if period_filter in ['all', 'monthly']:
-        add_excel_table("Monthly Room Stats", bookings, TruncMonth, "%B %Y")
+        add_excel_table("Monthly Room Stats", 'monthly', "%B %Y")
         
     if period_filter in ['all', 'quarterly']:
-        add_excel_table("Quarterly Room Stats", bookings, TruncQuarter, "%q")
+        add_excel_table("Quarterly Room Stats", 'quarterly', "%q")
         
     if period_filter in ['all', 'yearly']:
-        add_excel_table("Yearly Room Stats", bookings, TruncYear, "%Y")
+        add_excel_table("Yearly Room Stats", 'yearly', "%Y")
 
     # Adjust Column Widths
     ws.column_dimensions['A'].width = 30
@@ -823,9 +843,111 @@ def download_statistics_excel(request):
     ws.column_dimensions['C'].width = 20
     
     # Output
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    filename = f"Statistics_{period_filter}_{timezone.now().date()}.xlsx"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    output = io.BytesIO()
+    wb.save(output)
+    return output.getvalue()
+
+from django.http import StreamingHttpResponse, FileResponse
+from analytics.exports import get_export_datasets, export_rows, parse_date, stream_csv, write_xlsx
+
+def export_data(request):
+    """
+    Streams a raw data export as CSV or XLSX, e.g.
+    ?dataset=bookings&format=csv&start=2024-01-01&end=2024-03-31&status=CONFIRMED
+    """
+    # Permission Check
+    if not request.user.is_authenticated:
+        return redirect('login')
     
-    wb.save(response)
+    tenant = getattr(request, 'tenant', None)
+    if not tenant:
+        return redirect('home')
+        
+    if not has_tenant_permission(request.user, tenant, ['ADMIN', 'MANAGER']):
+        return redirect('dashboard')
+
+    datasets = get_export_datasets()
+    name = request.GET.get('dataset', 'bookings')
+    if name not in datasets:
+        return HttpResponse(f"Unknown dataset '{name}'", status=400)
+    dataset = datasets[name]
+
+    rows = export_rows(
+        dataset, tenant,
+        start=parse_date(request.GET.get('start')),
+        end=parse_date(request.GET.get('end')),
+        status=request.GET.get('status') or None,
+    )
+    filename = f"{name}_{timezone.localdate()}"
+
+    if request.GET.get('format') == 'xlsx':
+        return FileResponse(write_xlsx(dataset, rows), as_attachment=True, filename=f"{filename}.xlsx")
+
+    response = StreamingHttpResponse(stream_csv(dataset, rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
     return response
+
+from django.shortcuts import render
+from analytics.pace import pace_report, pickup_report
+
+def get_stay_range(request, default_days=30):
+    today = timezone.localdate()
+    start = parse_date(request.GET.get('start')) or today
+    end = parse_date(request.GET.get('end')) or start + datetime.timedelta(days=default_days - 1)
+    if end < start:
+        end = start
+    # Keep the page bounded
+    return start, min(end, start + datetime.timedelta(days=365))
+
+def otb_pace_report(request):
+    """On-the-books room nights and revenue for upcoming stay dates vs the same point last year."""
+    # Permission Check
+    if not request.user.is_authenticated:
+        return redirect('login')
+    
+    tenant = getattr(request, 'tenant', None)
+    if not tenant:
+        return redirect('home')
+        
+    if not has_tenant_permission(request.user, tenant, ['ADMIN', 'MANAGER']):
+        return redirect('dashboard')
+
+    start, end = get_stay_range(request)
+    context = pace_report(tenant, start, end)
+    context.update({
+        'report': 'pace',
+        'report_title': 'Pace Report',
+        'previous_label': 'Same Time Last Year',
+        'start': start,
+        'end': end,
+    })
+    return render(request, 'analytics/otb_report.html', context)
+
+def otb_pickup_report(request):
+    """Room nights and revenue picked up for upcoming stay dates over the last N days."""
+    # Permission Check
+    if not request.user.is_authenticated:
+        return redirect('login')
+    
+    tenant = getattr(request, 'tenant', None)
+    if not tenant:
+        return redirect('home')
+        
+    if not has_tenant_permission(request.user, tenant, ['ADMIN', 'MANAGER']):
+        return redirect('dashboard')
+
+    start, end = get_stay_range(request)
+    try:
+        days = max(1, min(int(request.GET.get('days', 7)), 365))
+    except ValueError:
+        days = 7
+    context = pickup_report(tenant, start, end, days=days)
+    context.update({
+        'report': 'pickup',
+        'report_title': 'Pickup Report',
+        'previous_label': f'{days} Days Ago',
+        'days': days,
+        'start': start,
+        'end': end,
+    })
+    return render(request, 'analytics/otb_report.html', context)
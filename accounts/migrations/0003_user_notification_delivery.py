@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0002_alter_user_role"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="notification_batch_minutes",
+            field=models.PositiveIntegerField(
+                default=30,
+                help_text="Batch interval in minutes (Batched delivery only)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="notification_delivery",
+            field=models.CharField(
+                choices=[
+                    ("IMMEDIATE", "Immediately"),
+                    ("BATCHED", "Batched"),
+                    ("DAILY", "Daily Digest"),
+                ],
+                default="IMMEDIATE",
+                help_text="How notification emails are delivered",
+                max_length=20,
+            ),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="notification_digest_sent_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="When the last notification digest was emailed",
+                null=True,
+            ),
+        ),
+    ]
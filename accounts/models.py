@@ -14,15 +14,47 @@ class User(AbstractUser):
         GYM_MANAGER = "GYM_MANAGER", "Gym Manager"
         GUEST = "GUEST", "Guest"
 
+    class NotificationDelivery(models.TextChoices):
+        IMMEDIATE = "IMMEDIATE", "Immediately"
+        BATCHED = "BATCHED", "Batched"
+        DAILY = "DAILY", "Daily Digest"
+
     role = models.CharField(max_length=50, choices=Role.choices, default=Role.GUEST)
     phone_number = models.CharField(max_length=15, blank=True, null=True)
     profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
 
+    # Notification Email Preferences
+    notification_delivery = models.CharField(max_length=20, choices=NotificationDelivery.choices, default=NotificationDelivery.IMMEDIATE, help_text="How notification emails are delivered")
+    notification_batch_minutes = models.PositiveIntegerField(default=30, help_text="Batch interval in minutes (Batched delivery only)")
+    notification_digest_sent_at = models.DateTimeField(null=True, blank=True, help_text="When the last notification digest was emailed")
+
     def save(self, *args, **kwargs):
         if self.is_superuser:
             self.role = self.Role.ADMIN
         super().save(*args, **kwargs)
 
+    @property
+    def wants_immediate_notification_emails(self):
+        return self.notification_delivery == self.NotificationDelivery.IMMEDIATE
+
+    @property
+    def notification_digest_due(self):
+        """
+        True if a batched/daily digest is due for this user.
+        """
+        from datetime import timedelta
+        from django.utils import timezone
+
+        if self.wants_immediate_notification_emails:
+            return False
+        if not self.notification_digest_sent_at:
+            return True
+        if self.notification_delivery == self.NotificationDelivery.DAILY:
+            interval = timedelta(days=1)
+        else:
+            interval = timedelta(minutes=max(self.notification_batch_minutes, 1))
+        return self.notification_digest_sent_at + interval <= timezone.now()
+
     @property
     def can_manage_bookings(self):
         # Owners are implicitly Admins for their tenant
@@ -14,6 +14,9 @@ urlpatterns = [
     path('statistics/', analytics_views.HotelStatisticsView.as_view(), name='hotel_statistics'),
     path('statistics/report/', analytics_views.download_statistics_report, name='download_statistics_report'),
     path('statistics/excel/', analytics_views.download_statistics_excel, name='download_statistics_excel'),
+    path('statistics/export/', analytics_views.export_data, name='export_data'),
+    path('statistics/pace/', analytics_views.otb_pace_report, name='otb_pace_report'),
+    path('statistics/pickup/', analytics_views.otb_pickup_report, name='otb_pickup_report'),
 
     # User Management
     path('users/', views.UserListView.as_view(), name='user_list'),
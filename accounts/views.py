@@ -1,11 +1,12 @@
 from django.shortcuts import render, redirect
+from django.conf import settings
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.views.generic import ListView, CreateView, UpdateView, DeleteView
 from django.urls import reverse_lazy, reverse
 from django.db import transaction
-from django.db.models import Sum, Count
+from django.db.models import Sum, Count, Q
 from django.utils.text import slugify
 from django.contrib import messages
 from tenants.mixins import TenantAdminRequiredMixin
@@ -19,6 +20,9 @@ from events.models import EventBooking
 from gym.models import GymMembership
 from tenants.models import Tenant, Domain, Plan, Membership
 from core.models import TenantSetting
+from analytics.cache import cached_stats
+from analytics.occupancy import daily_occupancy
+from analytics.revenue import RevenueService
 from django.utils import timezone
 from datetime import timedelta
 from core.email_utils import send_branded_email
@@ -438,107 +442,79 @@ def dashboard(request):
             messages.error(request, "Please access your dashboard via your hotel's unique URL.")
             return redirect('home')
 
-    # Gather Statistics
-    # Filter by tenant if present (which is now guaranteed for non-superusers)
-    tenant_filter = {'tenant': request.tenant}
+    # Gather Statistics (cached briefly; any booking/invoice write refreshes them)
+    context = cached_stats(
+        request.tenant, 'dashboard',
+        lambda: get_dashboard_stats(request.tenant),
+        timeout=getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 60)
+    )
+
+    # Recent Bookings
+    context['recent_bookings'] = Booking.objects.filter(tenant=request.tenant).select_related('room', 'room__room_type').order_by('-created_at')[:5]
+    context['is_platform_admin'] = False
     
-    total_guests = Booking.objects.filter(**tenant_filter).values('guest_email').distinct().count()
+    return render(request, 'accounts/dashboard.html', context)
+
+def get_dashboard_stats(tenant):
+    """
+    Staff dashboard figures: totals, room status, occupancy for this and last
+    week and revenue for the last 7 days, in a handful of queries.
+    """
+    tenant_filter = {'tenant': tenant}
     
-    # Invoice filtering
-    # Invoice now has tenant field
-    invoices = Invoice.objects.filter(**tenant_filter)
+    total_guests = Booking.objects.filter(**tenant_filter).values('guest_email').distinct().count()
     
-    # Filter out SUBSCRIPTION payments (platform fees) so tenant only sees their revenue
-    # Assuming Invoice.Type.SUBSCRIPTION exists. If not, filter by booking__isnull=False or similar
-    # But we added Type recently.
-    if hasattr(Invoice, 'Type'):
-         invoices = invoices.exclude(invoice_type=Invoice.Type.SUBSCRIPTION)
-         
-    total_revenue = invoices.filter(
-        status=Invoice.Status.PAID
-    ).aggregate(total=Sum('amount'))['total'] or 0
+    # Paid, non-subscription invoice revenue (platform fees excluded)
+    revenue = RevenueService(tenant)
+    total_revenue = revenue.collected().total
     
     # Only count PAID bookings as valid bookings for the dashboard
     total_bookings = Booking.objects.filter(**tenant_filter, invoices__status=Invoice.Status.PAID).distinct().count()
     
     # Room Status
-    rooms = Room.objects.filter(**tenant_filter)
-    total_rooms = rooms.count()
-    occupied_rooms = rooms.filter(status=Room.Status.OCCUPIED).count()
-    available_rooms = rooms.filter(status=Room.Status.AVAILABLE).count()
-    
-    # Recent Bookings
-    recent_bookings = Booking.objects.filter(**tenant_filter).select_related('room', 'room__room_type').order_by('-created_at')[:5]
+    room_counts = Room.objects.filter(**tenant_filter).aggregate(
+        total=Count('id'),
+        occupied=Count('id', filter=Q(status=Room.Status.OCCUPIED)),
+        available=Count('id', filter=Q(status=Room.Status.AVAILABLE)),
+    )
 
     # Dynamic Data for Charts
-    # Occupancy Trends (Last 7 Days vs Previous 7 Days)
-    today = timezone.now().date()
+    # Occupancy Trends (This Week vs Last Week), one range query over both weeks
+    today = timezone.localdate()
     start_of_week = today - timedelta(days=today.weekday()) # Monday
     last_week_start = start_of_week - timedelta(days=7)
     
+    occupied = daily_occupancy(tenant, last_week_start, start_of_week + timedelta(days=6))
     occupancy_data = {
-        'this_week': [],
-        'last_week': []
+        'this_week': occupied[7:],
+        'last_week': occupied[:7]
     }
-    
-    # Calculate daily occupancy for this week
-    for i in range(7):
-        day = start_of_week + timedelta(days=i)
-        # Count rooms booked for this specific day
-        count = Booking.objects.filter(
-            **tenant_filter,
-            check_in_date__date__lte=day,
-            check_out_date__date__gt=day,
-            status__in=[Booking.Status.CONFIRMED, Booking.Status.CHECKED_IN]
-        ).count()
-        occupancy_data['this_week'].append(count)
-        
-    # Calculate daily occupancy for last week
-    for i in range(7):
-        day = last_week_start + timedelta(days=i)
-        count = Booking.objects.filter(
-            **tenant_filter,
-            check_in_date__date__lte=day,
-            check_out_date__date__gt=day,
-            status__in=[Booking.Status.CONFIRMED, Booking.Status.CHECKED_IN]
-        ).count()
-        occupancy_data['last_week'].append(count)
-
-    # Revenue Overview (Last 7 Days)
+
+    # Revenue Overview (Last 7 Days), one grouped query
     revenue_data = {
         'days': [],
         'amounts': [],
         'total_7_days': 0
     }
     
-    for i in range(7):
-        day = today - timedelta(days=6-i) # 6 days ago to today
+    daily_revenue = revenue.daily_collected(today - timedelta(days=6), today)
+    for day, amount in daily_revenue.items():
         revenue_data['days'].append(day.strftime("%a")) # Mon, Tue, etc.
-        
-        daily_revenue = invoices.filter(
-            status=Invoice.Status.PAID,
-            issued_date__date=day
-        ).aggregate(total=Sum('amount'))['total'] or 0
-        
-        revenue_data['amounts'].append(float(daily_revenue))
-        revenue_data['total_7_days'] += daily_revenue
+        revenue_data['amounts'].append(float(amount))
+        revenue_data['total_7_days'] += amount
 
-    context = {
+    return {
         'total_guests': total_guests,
         'total_revenue': total_revenue,
         'total_bookings': total_bookings,
-        'total_rooms': total_rooms,
-        'occupied_rooms': occupied_rooms,
-        'available_rooms': available_rooms,
-        'recent_bookings': recent_bookings,
-        'is_platform_admin': False,
+        'total_rooms': room_counts['total'],
+        'occupied_rooms': room_counts['occupied'],
+        'available_rooms': room_counts['available'],
         'occupancy_data': occupancy_data,
         'revenue_data': revenue_data,
-        'occupancy_max': max(max(occupancy_data['this_week'], default=0), max(occupancy_data['last_week'], default=0), 10), # For chart scaling
+        'occupancy_max': max(max(occupied, default=0), 10), # For chart scaling
         'revenue_max': max(revenue_data['amounts'], default=1000),
     }
-    
-    return render(request, 'accounts/dashboard.html', context)
 
 @login_required
 def guest_dashboard(request):
@@ -613,25 +589,13 @@ def guest_dashboard(request):
     gym_memberships = gym_memberships.order_by('-end_date')
     
     # Recent Transactions (Paid Invoices)
-    # We want to show a combined list of payments for bookings, events, and gym
+    # Payments for bookings, events, gym and room service, via the invoice's denormalized guest
     from billing.models import Payment
     
-    # Base filter for invoice tenant
-    tenant_filter = {}
+    recent_transactions = Payment.objects.filter(invoice__guest=request.user)
     if request.tenant:
-        tenant_filter['invoice__tenant'] = request.tenant
-        
-    recent_transactions = Payment.objects.filter(
-        invoice__booking__user=request.user,
-        **tenant_filter
-    ) | Payment.objects.filter(
-        invoice__event_booking__user=request.user,
-        **tenant_filter
-    ) | Payment.objects.filter(
-        invoice__gym_membership__user=request.user,
-        **tenant_filter
-    )
-    recent_transactions = recent_transactions.distinct().order_by('-payment_date')[:10]
+        recent_transactions = recent_transactions.filter(tenant=request.tenant)
+    recent_transactions = recent_transactions.select_related('invoice').order_by('-payment_date')[:10]
 
     context = {
         'total_bookings': total_bookings,
@@ -654,6 +618,14 @@ def profile(request):
         user.email = request.POST.get('email')
         user.phone_number = request.POST.get('phone_number')
         
+        # Notification Email Preferences
+        delivery = request.POST.get('notification_delivery')
+        if delivery in User.NotificationDelivery.values:
+            user.notification_delivery = delivery
+        batch_minutes = request.POST.get('notification_batch_minutes')
+        if batch_minutes and batch_minutes.isdigit() and int(batch_minutes) > 0:
+            user.notification_batch_minutes = int(batch_minutes)
+        
         # Handle Password Change if provided
         new_password = request.POST.get('new_password')
         if new_password:
@@ -663,7 +635,9 @@ def profile(request):
         user.save()
         return redirect('profile')
         
-    return render(request, 'accounts/profile.html')
+    return render(request, 'accounts/profile.html', {
+        'delivery_choices': User.NotificationDelivery.choices,
+    })
 
 # User Management Views
 class UserListView(TenantAdminRequiredMixin, ListView):
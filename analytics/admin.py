@@ -0,0 +1,20 @@
+from django.contrib import admin
+from .models import DailyTenantStats, TenantDataVersion, OnTheBooksSnapshot
+
+@admin.register(DailyTenantStats)
+class DailyTenantStatsAdmin(admin.ModelAdmin):
+    list_display = ('tenant', 'date', 'stream', 'count', 'revenue', 'updated_at')
+    list_filter = ('stream', 'tenant')
+    date_hierarchy = 'date'
+
+
+@admin.register(TenantDataVersion)
+class TenantDataVersionAdmin(admin.ModelAdmin):
+    list_display = ('tenant', 'version', 'updated_at')
+
+
+@admin.register(OnTheBooksSnapshot)
+class OnTheBooksSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('tenant', 'snapshot_date', 'stay_date', 'room_nights', 'revenue')
+    list_filter = ('tenant',)
+    date_hierarchy = 'snapshot_date'
@@ -0,0 +1,112 @@
+"""
+Versioned cache for computed tenant statistics.
+
+Entries are keyed by the tenant's TenantDataVersion, which analytics.signals
+bumps on every write to the data statistics are built from. A bump makes the
+tenant's older entries unreachable (they simply expire), so a cached payload is
+never stale and unchanged data is never recomputed.
+
+Uses the 'stats' cache alias (local memory by default, file-based with
+STATS_CACHE_BACKEND=file). Hits and misses are counted in the same cache;
+`manage.py stats_cache` reports them.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import TenantDataVersion
+
+HITS_KEY = 'stats:hits'
+MISSES_KEY = 'stats:misses'
+
+
+def get_stats_cache():
+    return caches['stats'] if 'stats' in settings.CACHES else caches['default']
+
+
+def is_shared_stats_cache():
+    """
+    False for per-process backends (local memory, dummy), where a value cached
+    by one worker process is invisible to the others.
+    """
+    backend = settings.CACHES.get('stats', settings.CACHES['default'])['BACKEND']
+    return not backend.endswith(('.LocMemCache', '.DummyCache'))
+
+
+def get_data_version(tenant):
+    return TenantDataVersion.objects.filter(tenant=tenant).values_list('version', flat=True).first() or 0
+
+
+def bump_data_version(tenant_id=None):
+    """
+    Bumps one tenant's data version, or every tenant's when `tenant_id` is None.
+    """
+    if tenant_id is None:
+        from tenants.models import Tenant
+
+        TenantDataVersion.objects.update(version=F('version') + 1)
+        TenantDataVersion.objects.bulk_create(
+            [TenantDataVersion(tenant_id=pk, version=1) for pk in Tenant.objects.filter(data_version__isnull=True).values_list('pk', flat=True)],
+            ignore_conflicts=True,
+        )
+        return
+    if not TenantDataVersion.objects.filter(tenant_id=tenant_id).update(version=F('version') + 1):
+        try:
+            with transaction.atomic():
+                TenantDataVersion.objects.create(tenant_id=tenant_id, version=1)
+        except IntegrityError:
+            # Created concurrently
+            TenantDataVersion.objects.filter(tenant_id=tenant_id).update(version=F('version') + 1)
+
+
+def stats_key(tenant, name, version=None):
+    # The local date is part of the key because rollup windows end today
+    if version is None:
+        version = get_data_version(tenant)
+    return f"stats:{tenant.pk}:v{version}:{timezone.localdate():%Y%m%d}:{name}"
+
+
+def count(key):
+    cache = get_stats_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def peek_stats(tenant, name):
+    """The cached value for this tenant's current data version, or None. Not counted as a hit or miss."""
+    return get_stats_cache().get(stats_key(tenant, name))
+
+
+def cached_stats(tenant, name, compute, timeout=None, version=None):
+    """
+    Returns the cached result of `compute()` for this tenant's current data
+    version (or `version`), computing and storing it on a miss.
+    """
+    cache = get_stats_cache()
+    key = stats_key(tenant, name, version=version)
+    value = cache.get(key)
+    if value is not None:
+        count(HITS_KEY)
+        return value
+
+    count(MISSES_KEY)
+    value = compute()
+    cache.set(key, value, timeout or getattr(settings, 'STATS_CACHE_TIMEOUT', 3600))
+    return value
+
+
+def cache_stats():
+    """{'hits', 'misses', 'hit_rate'} since the counters were last reset."""
+    cache = get_stats_cache()
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {'hits': hits, 'misses': misses, 'hit_rate': hits / lookups if lookups else 0.0}
+
+
+def reset_cache_stats():
+    get_stats_cache().delete_many([HITS_KEY, MISSES_KEY])
@@ -0,0 +1,181 @@
+"""
+Streaming raw data exports (booking ledger, invoices, payments, orders, guests).
+
+Rows are read with values_list() and iterator(chunk_size=...), so no model
+instances are built and only one chunk is held at a time. CSV is generated
+lazily row by row; XLSX uses openpyxl's write-only mode, which spools rows to
+a temporary file instead of keeping the workbook in memory.
+"""
+import csv
+import datetime
+import tempfile
+from collections import namedtuple
+from django.db.models import Count, Max, Min, Sum
+from django.utils import timezone
+from .stats import day_bounds
+
+# title, queryset(tenant), date field and status field for filters, [(header, field)]
+ExportDataset = namedtuple('ExportDataset', 'title queryset date_field status_field columns')
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+def get_export_datasets():
+    from booking.models import Booking
+    from billing.models import Invoice, Payment
+    from services.models import GuestOrder
+
+    return {
+        'bookings': ExportDataset(
+            'Booking Ledger',
+            lambda tenant: Booking.objects.filter(tenant=tenant).order_by('created_at', 'id'),
+            'created_at', 'status',
+            [
+                ('Reference', 'booking_reference'),
+                ('Guest', 'guest_name'),
+                ('Email', 'guest_email'),
+                ('Phone', 'guest_phone'),
+                ('Room', 'room__room_number'),
+                ('Room Type', 'room__room_type__name'),
+                ('Check In', 'check_in_date'),
+                ('Check Out', 'check_out_date'),
+                ('Status', 'status'),
+                ('Total Price', 'total_price'),
+                ('Created', 'created_at'),
+            ],
+        ),
+        'invoices': ExportDataset(
+            'Invoices',
+            lambda tenant: Invoice.objects.filter(tenant=tenant).order_by('issued_date', 'id'),
+            'issued_date', 'status',
+            [
+                ('Invoice', 'id'),
+                ('Type', 'invoice_type'),
+                ('Booking', 'booking__booking_reference'),
+                ('Amount', 'amount'),
+                ('Status', 'status'),
+                ('Issued', 'issued_date'),
+                ('Due', 'due_date'),
+            ],
+        ),
+        'payments': ExportDataset(
+            'Payments',
+            lambda tenant: Payment.objects.filter(invoice__tenant=tenant).order_by('payment_date', 'id'),
+            'payment_date', 'invoice__status',
+            [
+                ('Payment', 'id'),
+                ('Invoice', 'invoice_id'),
+                ('Invoice Type', 'invoice__invoice_type'),
+                ('Amount', 'amount'),
+                ('Method', 'payment_method'),
+                ('Transaction ID', 'transaction_id'),
+                ('Date', 'payment_date'),
+            ],
+        ),
+        'orders': ExportDataset(
+            'Room Service Orders',
+            lambda tenant: GuestOrder.objects.filter(booking__tenant=tenant).order_by('created_at', 'id'),
+            'created_at', 'status',
+            [
+                ('Order', 'order_id'),
+                ('Booking', 'booking__booking_reference'),
+                ('Room', 'room_number'),
+                ('Guest', 'user__email'),
+                ('Status', 'status'),
+                ('Total Price', 'total_price'),
+                ('Created', 'created_at'),
+            ],
+        ),
+        # One row per guest email, from their bookings
+        'guests': ExportDataset(
+            'Guests',
+            lambda tenant: Booking.objects.filter(tenant=tenant).exclude(guest_email='').values('guest_email').annotate(
+                name=Max('guest_name'),
+                phone=Max('guest_phone'),
+                booking_count=Count('id'),
+                total_spent=Sum('total_price'),
+                first_stay=Min('check_in_date'),
+                last_stay=Max('check_in_date'),
+            ).order_by('guest_email'),
+            'created_at', 'status',
+            [
+                ('Email', 'guest_email'),
+                ('Name', 'name'),
+                ('Phone', 'phone'),
+                ('Bookings', 'booking_count'),
+                ('Total Spent', 'total_spent'),
+                ('First Stay', 'first_stay'),
+                ('Last Stay', 'last_stay'),
+            ],
+        ),
+    }
+
+
+def parse_date(value):
+    try:
+        return datetime.date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def export_rows(dataset, tenant, start=None, end=None, status=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yields one tuple per row, filtered to the inclusive `start`/`end` dates and `status`.
+    """
+    queryset = dataset.queryset(tenant)
+    if start:
+        queryset = queryset.filter(**{f'{dataset.date_field}__gte': day_bounds(start)[0]})
+    if end:
+        queryset = queryset.filter(**{f'{dataset.date_field}__lt': day_bounds(end)[1]})
+    if status:
+        queryset = queryset.filter(**{dataset.status_field: status})
+
+    fields = [field for _, field in dataset.columns]
+    for row in queryset.values_list(*fields).iterator(chunk_size=chunk_size):
+        yield tuple(local_value(value) for value in row)
+
+
+def local_value(value):
+    # Spreadsheets can't hold time zones; show local wall-clock time
+    if isinstance(value, datetime.datetime) and timezone.is_aware(value):
+        return timezone.localtime(value).replace(tzinfo=None, microsecond=0)
+    return value
+
+
+class Echo:
+    """File-like object whose write() returns the value, for lazy csv.writer output."""
+    def write(self, value):
+        return value
+
+
+def stream_csv(dataset, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow([header for header, _ in dataset.columns])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_xlsx(dataset, rows):
+    """
+    Writes the rows to a write-only workbook in a temporary file and returns
+    the file, rewound for reading.
+    """
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(dataset.title[:31])
+    header = []
+    for title, _ in dataset.columns:
+        cell = WriteOnlyCell(ws, value=title)
+        cell.font = Font(bold=True)
+        header.append(cell)
+    ws.append(header)
+    for row in rows:
+        ws.append(row)
+
+    output = tempfile.TemporaryFile()
+    wb.save(output)
+    output.seek(0)
+    return output
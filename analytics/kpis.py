@@ -0,0 +1,213 @@
+"""
+Vectorized hotel KPIs.
+
+A tenant's bookings for a window are read once, in chunks of KPI_CHUNK_SIZE
+rows, as NumPy columns (check-in/check-out/created epochs, price, room type,
+status). Each chunk is folded into fixed-size accumulators (a per-day
+difference array and histograms), so memory stays bounded however many
+bookings a tenant has. From those come occupancy %, ADR, RevPAR, the
+length-of-stay and lead-time distributions and day-of-week patterns.
+
+Days are local dates using the time zone's UTC offset at the window start.
+"""
+import datetime
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+SECONDS_PER_DAY = 86400
+
+# Bookings that occupy a room (pending and cancelled ones don't)
+OCCUPYING_STATUSES = ('CONFIRMED', 'CHECKED_IN', 'CHECKED_OUT')
+STATUS_CODES = {status: code for code, status in enumerate(
+    ('PENDING', 'CONFIRMED', 'CHECKED_IN', 'CHECKED_OUT', 'CANCELLED')
+)}
+
+# Histogram bins: nights 1..14 then 15+; lead time in days
+LOS_LABELS = [str(n) for n in range(1, 15)] + ['15+']
+LEAD_TIME_BINS = np.array([0, 1, 3, 7, 14, 30, 60, 90])
+LEAD_TIME_LABELS = ['Same day', '1-2 days', '3-6 days', '1-2 weeks', '2-4 weeks', '1-2 months', '2-3 months', '90+ days']
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+def get_chunk_size():
+    return getattr(settings, 'KPI_CHUNK_SIZE', 50000)
+
+
+def to_epoch(values):
+    return np.fromiter((value.timestamp() for value in values), dtype=np.int64, count=len(values))
+
+
+def iter_booking_columns(tenant, start, end, chunk_size=None):
+    """
+    Yields dicts of NumPy columns for the tenant's bookings overlapping the
+    local dates [start, end), at most `chunk_size` rows at a time.
+    """
+    from booking.models import Booking
+    from .stats import day_bounds
+
+    chunk_size = chunk_size or get_chunk_size()
+    rows = Booking.objects.filter(
+        tenant=tenant,
+        check_in_date__lt=day_bounds(end)[0],
+        check_out_date__gt=day_bounds(start)[0],
+    ).values_list(
+        'check_in_date', 'check_out_date', 'created_at', 'total_price', 'room__room_type_id', 'status'
+    ).order_by().iterator(chunk_size=chunk_size)
+
+    while True:
+        chunk = [row for _, row in zip(range(chunk_size), rows)]
+        if not chunk:
+            return
+        check_in, check_out, created, price, room_type, status = zip(*chunk)
+        yield {
+            'check_in': to_epoch(check_in),
+            'check_out': to_epoch(check_out),
+            'created': to_epoch(created),
+            'price': np.array(price, dtype=np.float64),
+            'room_type': np.array(room_type, dtype=np.int64),
+            'status': np.array([STATUS_CODES.get(s, -1) for s in status], dtype=np.int8),
+        }
+
+
+class KPIAccumulator:
+    """
+    Folds booking column chunks into per-day and histogram totals for the
+    local dates [start, end).
+    """
+
+    def __init__(self, start, end):
+        self.start = start
+        self.days = (end - start).days
+        origin = timezone.make_aware(datetime.datetime.combine(start, datetime.time.min))
+        self.origin = int(origin.timestamp())
+        self.start_weekday = start.weekday()
+
+        # One extra slot so stays running past the window fall off the end
+        self.nights_delta = np.zeros(self.days + 1, dtype=np.int64)
+        self.revenue_delta = np.zeros(self.days + 1, dtype=np.float64)
+        self.los_counts = np.zeros(len(LOS_LABELS), dtype=np.int64)
+        self.lead_counts = np.zeros(len(LEAD_TIME_LABELS), dtype=np.int64)
+        self.arrivals_by_weekday = np.zeros(7, dtype=np.int64)
+        self.room_type_nights = {}
+        self.room_type_revenue = {}
+        self.lead_days_total = 0
+        self.los_total = 0
+        self.arrivals = 0
+        self.cancelled_arrivals = 0
+
+    def day_index(self, epochs):
+        # Local day number relative to the window start (floor division handles stays before it)
+        return (epochs - self.origin) // SECONDS_PER_DAY
+
+    def add(self, columns):
+        check_in_day = self.day_index(columns['check_in'])
+        check_out_day = self.day_index(columns['check_out'])
+        nights = np.maximum(check_out_day - check_in_day, 1)
+        check_out_day = check_in_day + nights
+        status = columns['status']
+
+        # Arrivals in the window (for distributions), cancelled ones only counted
+        arriving = (check_in_day >= 0) & (check_in_day < self.days)
+        cancelled = status == STATUS_CODES['CANCELLED']
+        self.cancelled_arrivals += int(np.count_nonzero(arriving & cancelled))
+
+        occupying = np.isin(status, [STATUS_CODES[s] for s in OCCUPYING_STATUSES])
+        arrived = arriving & occupying
+        self.arrivals += int(np.count_nonzero(arrived))
+
+        arrival_nights = nights[arrived]
+        self.los_total += int(arrival_nights.sum())
+        self.los_counts += np.bincount(np.minimum(arrival_nights, 15) - 1, minlength=len(LOS_LABELS))
+
+        lead_days = np.maximum((columns['check_in'][arrived] - columns['created'][arrived]) // SECONDS_PER_DAY, 0)
+        self.lead_days_total += int(lead_days.sum())
+        self.lead_counts += np.bincount(
+            np.searchsorted(LEAD_TIME_BINS, lead_days, side='right') - 1, minlength=len(LEAD_TIME_LABELS)
+        )
+        self.arrivals_by_weekday += np.bincount(
+            (check_in_day[arrived] + self.start_weekday) % 7, minlength=7
+        )
+
+        # Room nights and nightly revenue: +1 on the first night, -1 after the last, clipped to the window
+        first = np.clip(check_in_day[occupying], 0, self.days)
+        last = np.clip(check_out_day[occupying], 0, self.days)
+        nightly_rate = columns['price'][occupying] / nights[occupying]
+        np.add.at(self.nights_delta, first, 1)
+        np.add.at(self.nights_delta, last, -1)
+        np.add.at(self.revenue_delta, first, nightly_rate)
+        np.add.at(self.revenue_delta, last, -nightly_rate)
+
+        # Nights and revenue inside the window per room type
+        room_types, index = np.unique(columns['room_type'][occupying], return_inverse=True)
+        window_nights = last - first
+        type_nights = np.bincount(index, weights=window_nights, minlength=len(room_types))
+        type_revenue = np.bincount(index, weights=window_nights * nightly_rate, minlength=len(room_types))
+        for room_type, type_night, type_rev in zip(room_types.tolist(), type_nights, type_revenue):
+            self.room_type_nights[room_type] = self.room_type_nights.get(room_type, 0) + int(type_night)
+            self.room_type_revenue[room_type] = self.room_type_revenue.get(room_type, 0.0) + float(type_rev)
+
+    def nights_per_day(self):
+        return np.cumsum(self.nights_delta)[:self.days]
+
+    def revenue_per_day(self):
+        return np.cumsum(self.revenue_delta)[:self.days]
+
+    def adr_by_room_type(self, names):
+        return {
+            names.get(room_type, str(room_type)): round(self.room_type_revenue[room_type] / nights, 2)
+            for room_type, nights in self.room_type_nights.items() if nights
+        }
+
+    def result(self, room_count, room_type_names=None):
+        nights = self.nights_per_day()
+        revenue = self.revenue_per_day()
+        nights_sold = int(nights.sum())
+        room_revenue = float(revenue.sum())
+        available = room_count * self.days
+
+        weekday_index = (np.arange(self.days) + self.start_weekday) % 7
+        weekday_days = np.bincount(weekday_index, minlength=7)
+        weekday_nights = np.bincount(weekday_index, weights=nights, minlength=7)
+        weekday_occupancy = np.divide(
+            weekday_nights * 100, weekday_days * room_count,
+            out=np.zeros(7), where=weekday_days * room_count > 0
+        )
+
+        total_arrivals = self.arrivals + self.cancelled_arrivals
+        return {
+            'start': self.start,
+            'days': self.days,
+            'room_count': room_count,
+            'nights_sold': nights_sold,
+            'room_revenue': round(room_revenue, 2),
+            'occupancy': round(nights_sold * 100 / available, 1) if available else 0.0,
+            'adr': round(room_revenue / nights_sold, 2) if nights_sold else 0.0,
+            'revpar': round(room_revenue / available, 2) if available else 0.0,
+            'arrivals': self.arrivals,
+            'avg_length_of_stay': round(self.los_total / self.arrivals, 1) if self.arrivals else 0.0,
+            'avg_lead_time': round(self.lead_days_total / self.arrivals, 1) if self.arrivals else 0.0,
+            'cancellation_rate': round(self.cancelled_arrivals * 100 / total_arrivals, 1) if total_arrivals else 0.0,
+            'length_of_stay': dict(zip(LOS_LABELS, self.los_counts.tolist())),
+            'lead_time': dict(zip(LEAD_TIME_LABELS, self.lead_counts.tolist())),
+            'arrivals_by_weekday': dict(zip(WEEKDAYS, self.arrivals_by_weekday.tolist())),
+            'occupancy_by_weekday': dict(zip(WEEKDAYS, np.round(weekday_occupancy, 1).tolist())),
+            'adr_by_room_type': self.adr_by_room_type(room_type_names or {}),
+            'busiest_weekday': WEEKDAYS[int(np.argmax(weekday_occupancy))] if nights_sold else None,
+            'nights_per_day': nights.tolist(),
+        }
+
+
+def compute_kpis(tenant, days=30, end=None, chunk_size=None):
+    """
+    KPIs for the `days` local dates ending with `end` (default today).
+    """
+    from hotel.models import Room, RoomType
+
+    end = (end or timezone.localdate()) + datetime.timedelta(days=1)
+    start = end - datetime.timedelta(days=days)
+    accumulator = KPIAccumulator(start, end)
+    for columns in iter_booking_columns(tenant, start, end, chunk_size=chunk_size):
+        accumulator.add(columns)
+    names = dict(RoomType.objects.filter(pk__in=list(accumulator.room_type_nights)).values_list('pk', 'name'))
+    return accumulator.result(Room.objects.filter(tenant=tenant).count(), room_type_names=names)
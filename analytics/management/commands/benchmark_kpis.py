@@ -0,0 +1,73 @@
+import datetime
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from tenants.models import Tenant
+from booking.models import Booking
+from analytics.kpis import OCCUPYING_STATUSES, compute_kpis
+
+
+def orm_nights_per_day(tenant, start, days):
+    """The per-day ORM approach: one occupancy count and one arrivals count per day."""
+    bookings = Booking.objects.filter(tenant=tenant, status__in=OCCUPYING_STATUSES)
+    nights = []
+    for i in range(days):
+        day = start + datetime.timedelta(days=i)
+        nights.append(bookings.filter(check_in_date__date__lte=day, check_out_date__date__gt=day).count())
+        bookings.filter(check_in_date__date=day).count()
+    return nights
+
+
+class Command(BaseCommand):
+    help = 'Compares the NumPy KPI engine against per-day ORM queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', required=True, help='Tenant slug')
+        parser.add_argument('--days', type=int, default=30, help='Window length in days (default: 30)')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per approach, best time is reported (default: 3)')
+        parser.add_argument('--chunk-size', type=int, help='Rows per NumPy chunk (default: KPI_CHUNK_SIZE)')
+
+    def handle(self, *args, **options):
+        tenant = Tenant.objects.filter(slug=options['tenant']).first()
+        if not tenant:
+            raise CommandError(f"Tenant '{options['tenant']}' not found")
+
+        days = options['days']
+        end = timezone.localdate()
+        start = end - datetime.timedelta(days=days - 1)
+        self.stdout.write(
+            f"{tenant.name}: {Booking.objects.filter(tenant=tenant).count()} bookings, {days} day window"
+        )
+
+        orm_time, orm_queries, orm_nights = self.run(options['repeat'], lambda: orm_nights_per_day(tenant, start, days))
+        numpy_time, numpy_queries, kpis = self.run(
+            options['repeat'], lambda: compute_kpis(tenant, days=days, end=end, chunk_size=options['chunk_size'])
+        )
+
+        self.stdout.write(f"ORM per-day:  {orm_time * 1000:9.1f} ms  {orm_queries} queries")
+        self.stdout.write(f"NumPy engine: {numpy_time * 1000:9.1f} ms  {numpy_queries} queries")
+        if numpy_time:
+            self.stdout.write(f"Speedup: {orm_time / numpy_time:.1f}x")
+
+        if orm_nights == kpis['nights_per_day']:
+            self.stdout.write(self.style.SUCCESS(f"Room nights match ({sum(orm_nights)})."))
+        else:
+            self.stdout.write(self.style.ERROR(
+                f"Room nights differ: ORM {sum(orm_nights)}, NumPy {kpis['nights_sold']}"
+            ))
+        self.stdout.write(
+            f"Occupancy {kpis['occupancy']}%  ADR {kpis['adr']:,.2f}  RevPAR {kpis['revpar']:,.2f}  "
+            f"Avg stay {kpis['avg_length_of_stay']}  Avg lead time {kpis['avg_lead_time']} days"
+        )
+
+    def run(self, repeat, func):
+        best = None
+        for _ in range(max(repeat, 1)):
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                result = func()
+                elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, len(queries), result
@@ -0,0 +1,30 @@
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from tenants.models import Tenant
+from analytics.stats import rebuild_daily_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the DailyTenantStats fact table from bookings, orders, events and gym memberships'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', help='Tenant slug (default: all tenants)')
+        parser.add_argument('--since', help='Only rebuild from this date (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        tenant = None
+        if options['tenant']:
+            tenant = Tenant.objects.filter(slug=options['tenant']).first()
+            if not tenant:
+                raise CommandError(f"Tenant '{options['tenant']}' not found")
+
+        since = None
+        if options['since']:
+            try:
+                since = datetime.date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError("--since must be YYYY-MM-DD")
+
+        written = rebuild_daily_stats(tenant=tenant, since=since)
+        scope = tenant.name if tenant else 'all tenants'
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {written} daily stats rows for {scope}."))
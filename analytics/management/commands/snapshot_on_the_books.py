@@ -0,0 +1,44 @@
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from tenants.models import Tenant
+from analytics.pace import compact_otb_snapshots, take_otb_snapshot
+
+
+class Command(BaseCommand):
+    help = "Snapshots each tenant's on-the-books room nights and revenue per future stay date, then compacts old snapshots"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', help='Tenant slug (default: all active tenants)')
+        parser.add_argument('--date', help='Snapshot date (YYYY-MM-DD, default: today)')
+        parser.add_argument('--horizon', type=int, help='Stay dates to cover, in days (default: OTB_HORIZON_DAYS)')
+        parser.add_argument('--skip-compact', action='store_true', help="Don't compact old snapshots")
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.filter(is_active=True)
+        if options['tenant']:
+            tenants = Tenant.objects.filter(slug=options['tenant'])
+            if not tenants.exists():
+                raise CommandError(f"Tenant '{options['tenant']}' not found")
+
+        snapshot_date = None
+        if options['date']:
+            try:
+                snapshot_date = datetime.date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError("--date must be YYYY-MM-DD")
+
+        total = 0
+        for tenant in tenants:
+            try:
+                written = take_otb_snapshot(tenant, snapshot_date=snapshot_date, horizon=options['horizon'])
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"{tenant.name}: snapshot failed: {e}"))
+                continue
+            total += written
+            self.stdout.write(f"{tenant.name}: {written} stay dates on the books")
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {total} on-the-books rows."))
+
+        if not options['skip_compact']:
+            deleted = compact_otb_snapshots()
+            self.stdout.write(self.style.SUCCESS(f"Compacted {deleted} old snapshot rows."))
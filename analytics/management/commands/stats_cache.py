@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from analytics.cache import cache_stats, get_stats_cache, reset_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Reports the statistics cache hit rate'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Reset the hit/miss counters after reporting')
+        parser.add_argument('--clear', action='store_true', help='Clear all cached statistics')
+
+    def handle(self, *args, **options):
+        backend = settings.CACHES.get('stats', settings.CACHES['default'])['BACKEND']
+        stats = cache_stats()
+        self.stdout.write(f"Backend: {backend}")
+        self.stdout.write(f"Hits: {stats['hits']}  Misses: {stats['misses']}  Hit rate: {stats['hit_rate']:.1%}")
+        if backend.endswith('LocMemCache'):
+            self.stdout.write(self.style.WARNING(
+                "Local-memory counters are per process; set STATS_CACHE_BACKEND=file to see the web workers' numbers."
+            ))
+
+        if options['clear']:
+            get_stats_cache().clear()
+            self.stdout.write(self.style.SUCCESS("Statistics cache cleared."))
+        elif options['reset']:
+            reset_cache_stats()
+            self.stdout.write(self.style.SUCCESS("Counters reset."))
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ("tenants", "0005_subscriptionnotice"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyTenantStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                (
+                    "stream",
+                    models.CharField(
+                        choices=[
+                            ("ROOMS", "Room Bookings"),
+                            ("SERVICES", "Room Service"),
+                            ("EVENTS", "Events"),
+                            ("GYM", "Gym Memberships"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("count", models.PositiveIntegerField(default=0)),
+                (
+                    "revenue",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_stats",
+                        to="tenants.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["tenant", "stream", "date"],
+                        name="dailystats_tenant_stream_idx",
+                    )
+                ],
+                "unique_together": {("tenant", "date", "stream")},
+            },
+        ),
+    ]
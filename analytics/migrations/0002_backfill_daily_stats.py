@@ -0,0 +1,55 @@
+from django.db import migrations
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+STREAMS = [
+    ("ROOMS", "booking", "Booking", "tenant", "total_price"),
+    ("SERVICES", "services", "GuestOrder", "booking__tenant", "total_price"),
+    ("EVENTS", "events", "EventBooking", "hall__tenant", "total_price"),
+    ("GYM", "gym", "GymMembership", "plan__tenant", "plan__price"),
+]
+
+
+def backfill_daily_stats(apps, schema_editor):
+    DailyTenantStats = apps.get_model("analytics", "DailyTenantStats")
+    facts = []
+    for stream, app_label, model_name, tenant_lookup, amount_field in STREAMS:
+        model = apps.get_model(app_label, model_name)
+        tenant_field = f"{tenant_lookup}_id"
+        rows = (
+            model.objects.exclude(status="CANCELLED")
+            .filter(**{f"{tenant_lookup}__isnull": False})
+            .annotate(day=TruncDate("created_at"))
+            .values(tenant_field, "day")
+            .annotate(count=Count("id"), revenue=Sum(amount_field))
+            .order_by()
+        )
+        facts.extend(
+            DailyTenantStats(
+                tenant_id=row[tenant_field],
+                date=row["day"],
+                stream=stream,
+                count=row["count"],
+                revenue=row["revenue"] or 0,
+            )
+            for row in rows
+        )
+    DailyTenantStats.objects.bulk_create(facts, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0001_initial"),
+        ("booking", "0002_booking_booking_reference_booking_sequence_number"),
+        (
+            "services",
+            "0003_guestorder_order_id_housekeepingrequest_request_id_and_more",
+        ),
+        ("events", "0002_eventhall_amenities_alter_eventhall_description"),
+        ("gym", "0002_alter_gymmembership_end_date_and_more"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_daily_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0002_backfill_daily_stats"),
+        ("tenants", "0005_subscriptionnotice"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TenantDataVersion",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("version", models.PositiveBigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "tenant",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="data_version",
+                        to="tenants.tenant",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("analytics", "0003_tenantdataversion"),
+        ("tenants", "0006_platform_metrics_snapshots"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OnTheBooksSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("snapshot_date", models.DateField()),
+                ("stay_date", models.DateField()),
+                ("room_nights", models.PositiveIntegerField(default=0)),
+                (
+                    "revenue",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="otb_snapshots",
+                        to="tenants.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["tenant", "stay_date", "snapshot_date"],
+                        name="otb_tenant_stay_idx",
+                    )
+                ],
+                "unique_together": {("tenant", "snapshot_date", "stay_date")},
+            },
+        ),
+    ]
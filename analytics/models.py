@@ -0,0 +1,66 @@
+from django.db import models
+
+
+class DailyTenantStats(models.Model):
+    """
+    Per tenant, per day, per revenue stream counts and sums (non-cancelled records,
+    bucketed by created date). Kept current by analytics.signals; rebuild with
+    `manage.py rebuild_daily_stats`.
+    """
+    class Stream(models.TextChoices):
+        ROOMS = 'ROOMS', 'Room Bookings'
+        SERVICES = 'SERVICES', 'Room Service'
+        EVENTS = 'EVENTS', 'Events'
+        GYM = 'GYM', 'Gym Memberships'
+
+    tenant = models.ForeignKey('tenants.Tenant', on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    stream = models.CharField(max_length=20, choices=Stream.choices)
+    count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('tenant', 'date', 'stream')
+        indexes = [
+            models.Index(fields=['tenant', 'stream', 'date'], name='dailystats_tenant_stream_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tenant} {self.date} {self.stream}: {self.count} / {self.revenue}"
+
+
+class TenantDataVersion(models.Model):
+    """
+    Per tenant counter bumped on every Booking/Invoice/Payment/Order/Event/Gym
+    and Room/RoomType/GymPlan write (analytics.signals). Cached statistics are keyed by it, so any change
+    to the underlying data makes older cache entries unreachable.
+    """
+    tenant = models.OneToOneField('tenants.Tenant', on_delete=models.CASCADE, related_name='data_version')
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.tenant} v{self.version}"
+
+
+class OnTheBooksSnapshot(models.Model):
+    """
+    Room nights and room revenue on the books for one future stay date, as they
+    stood on `snapshot_date`. Written nightly by `manage.py snapshot_on_the_books`;
+    pace and pickup reports compare snapshots.
+    """
+    tenant = models.ForeignKey('tenants.Tenant', on_delete=models.CASCADE, related_name='otb_snapshots')
+    snapshot_date = models.DateField()
+    stay_date = models.DateField()
+    room_nights = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('tenant', 'snapshot_date', 'stay_date')
+        indexes = [
+            models.Index(fields=['tenant', 'stay_date', 'snapshot_date'], name='otb_tenant_stay_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tenant} as of {self.snapshot_date}: {self.stay_date} {self.room_nights} / {self.revenue}"
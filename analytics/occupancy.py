@@ -0,0 +1,42 @@
+"""
+Per-day occupancy from one range query.
+
+Fetches only the (check-in, check-out) intervals overlapping the window, then
+a difference array turns them into occupied-room counts per local date: +1 on
+the check-in date, -1 on the check-out date, and a running sum.
+"""
+import datetime
+from django.utils import timezone
+from .stats import day_bounds
+
+
+def daily_occupancy(tenant, start, end, statuses=('CONFIRMED', 'CHECKED_IN')):
+    """
+    [rooms occupied] for each local date from `start` to `end` (inclusive).
+    A booking occupies the dates from its check-in date up to, not including,
+    its check-out date.
+    """
+    from booking.models import Booking
+
+    days = (end - start).days + 1
+    intervals = Booking.objects.filter(
+        tenant=tenant,
+        status__in=statuses,
+        check_in_date__lt=day_bounds(end)[1],
+        check_out_date__gte=day_bounds(start)[0] + datetime.timedelta(days=1),
+    ).values_list('check_in_date', 'check_out_date').order_by()
+
+    delta = [0] * (days + 1)
+    for check_in, check_out in intervals:
+        first = max((timezone.localdate(check_in) - start).days, 0)
+        last = min((timezone.localdate(check_out) - start).days, days)
+        if first < last:
+            delta[first] += 1
+            delta[last] -= 1
+
+    occupied = []
+    running = 0
+    for change in delta[:days]:
+        running += change
+        occupied.append(running)
+    return occupied
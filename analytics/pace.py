@@ -0,0 +1,155 @@
+"""
+On-the-books (OTB) snapshots, pace and pickup.
+
+A snapshot records, for every future stay date in the horizon, the room nights
+and room revenue booked as of the snapshot date. Pace compares today's OTB
+with the OTB at the same point last year (364 days back, same weekday); pickup
+is the change in OTB since an earlier snapshot. Both read two snapshots with
+range queries on (tenant, snapshot_date, stay_date).
+
+Old snapshots are compacted: daily for OTB_KEEP_DAILY_DAYS, then weekly
+(Mondays) until OTB_KEEP_WEEKLY_DAYS, then monthly (first Monday).
+"""
+import datetime
+from decimal import Decimal
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from .kpis import KPIAccumulator, iter_booking_columns
+from .models import OnTheBooksSnapshot
+
+SAME_DAY_LAST_YEAR = datetime.timedelta(days=364)
+
+
+def get_otb_horizon():
+    return getattr(settings, 'OTB_HORIZON_DAYS', 365)
+
+
+def take_otb_snapshot(tenant, snapshot_date=None, horizon=None, chunk_size=None):
+    """
+    Writes the tenant's OTB snapshot for `snapshot_date` (default today),
+    replacing any earlier run for that date. Returns the number of rows written.
+    """
+    snapshot_date = snapshot_date or timezone.localdate()
+    end = snapshot_date + datetime.timedelta(days=horizon or get_otb_horizon())
+
+    accumulator = KPIAccumulator(snapshot_date, end)
+    for columns in iter_booking_columns(tenant, snapshot_date, end, chunk_size=chunk_size):
+        accumulator.add(columns)
+
+    rows = [
+        OnTheBooksSnapshot(
+            tenant=tenant,
+            snapshot_date=snapshot_date,
+            stay_date=snapshot_date + datetime.timedelta(days=i),
+            room_nights=int(nights),
+            revenue=Decimal(str(round(revenue, 2))),
+        )
+        for i, (nights, revenue) in enumerate(zip(accumulator.nights_per_day(), accumulator.revenue_per_day()))
+        if nights
+    ]
+    with transaction.atomic():
+        OnTheBooksSnapshot.objects.filter(tenant=tenant, snapshot_date=snapshot_date).delete()
+        OnTheBooksSnapshot.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def nearest_snapshot_date(tenant, on_or_before):
+    """The latest snapshot date on or before `on_or_before` (snapshots may have been compacted)."""
+    return OnTheBooksSnapshot.objects.filter(
+        tenant=tenant, snapshot_date__lte=on_or_before
+    ).aggregate(date=Max('snapshot_date'))['date']
+
+
+def otb_by_stay_date(tenant, snapshot_date, start, end):
+    """{stay_date: (room_nights, revenue)} for stay dates from `start` to `end` (inclusive)."""
+    if snapshot_date is None:
+        return {}
+    rows = OnTheBooksSnapshot.objects.filter(
+        tenant=tenant, snapshot_date=snapshot_date, stay_date__gte=start, stay_date__lte=end
+    ).values_list('stay_date', 'room_nights', 'revenue')
+    return {stay_date: (nights, revenue) for stay_date, nights, revenue in rows}
+
+
+def compare_snapshots(current, previous, start, end, shift=datetime.timedelta(0)):
+    """
+    Per stay date rows comparing two {stay_date: (nights, revenue)} maps.
+    `previous` is keyed by stay dates `shift` earlier (e.g. last year's).
+    """
+    rows = []
+    totals = {'nights': 0, 'revenue': Decimal(0), 'previous_nights': 0, 'previous_revenue': Decimal(0)}
+    day = start
+    while day <= end:
+        nights, revenue = current.get(day, (0, Decimal(0)))
+        previous_nights, previous_revenue = previous.get(day - shift, (0, Decimal(0)))
+        rows.append({
+            'stay_date': day,
+            'nights': nights,
+            'revenue': revenue,
+            'previous_nights': previous_nights,
+            'previous_revenue': previous_revenue,
+            'nights_change': nights - previous_nights,
+            'revenue_change': revenue - previous_revenue,
+        })
+        totals['nights'] += nights
+        totals['revenue'] += revenue
+        totals['previous_nights'] += previous_nights
+        totals['previous_revenue'] += previous_revenue
+        day += datetime.timedelta(days=1)
+    totals['nights_change'] = totals['nights'] - totals['previous_nights']
+    totals['revenue_change'] = totals['revenue'] - totals['previous_revenue']
+    return rows, totals
+
+
+def pace_report(tenant, start, end, as_of=None):
+    """
+    OTB for stay dates `start`..`end` as of `as_of` (default today) against the
+    OTB for the same stay dates last year at the same point in time.
+    """
+    as_of = as_of or timezone.localdate()
+    snapshot_date = nearest_snapshot_date(tenant, as_of)
+    last_year_date = nearest_snapshot_date(tenant, as_of - SAME_DAY_LAST_YEAR)
+
+    current = otb_by_stay_date(tenant, snapshot_date, start, end)
+    last_year = otb_by_stay_date(tenant, last_year_date, start - SAME_DAY_LAST_YEAR, end - SAME_DAY_LAST_YEAR)
+    rows, totals = compare_snapshots(current, last_year, start, end, shift=SAME_DAY_LAST_YEAR)
+    return {'snapshot_date': snapshot_date, 'previous_snapshot_date': last_year_date, 'rows': rows, 'totals': totals}
+
+
+def pickup_report(tenant, start, end, days=7, as_of=None):
+    """
+    Room nights and revenue picked up for stay dates `start`..`end` over the
+    `days` days up to `as_of` (default today).
+    """
+    as_of = as_of or timezone.localdate()
+    snapshot_date = nearest_snapshot_date(tenant, as_of)
+    previous_date = nearest_snapshot_date(tenant, as_of - datetime.timedelta(days=days))
+
+    current = otb_by_stay_date(tenant, snapshot_date, start, end)
+    previous = otb_by_stay_date(tenant, previous_date, start, end)
+    rows, totals = compare_snapshots(current, previous, start, end)
+    return {'snapshot_date': snapshot_date, 'previous_snapshot_date': previous_date, 'rows': rows, 'totals': totals}
+
+
+def compact_otb_snapshots(today=None, keep_daily=None, keep_weekly=None):
+    """
+    Thins out old snapshots: keeps Mondays once older than `keep_daily` days and
+    first Mondays of the month once older than `keep_weekly` days.
+    Returns the number of rows deleted.
+    """
+    today = today or timezone.localdate()
+    keep_daily = keep_daily if keep_daily is not None else getattr(settings, 'OTB_KEEP_DAILY_DAYS', 90)
+    keep_weekly = keep_weekly if keep_weekly is not None else getattr(settings, 'OTB_KEEP_WEEKLY_DAYS', 760)
+
+    # week_day: 1 = Sunday ... 2 = Monday
+    weekly_cutoff = today - datetime.timedelta(days=keep_daily)
+    deleted, _ = OnTheBooksSnapshot.objects.filter(snapshot_date__lt=weekly_cutoff).exclude(
+        snapshot_date__week_day=2
+    ).delete()
+
+    monthly_cutoff = today - datetime.timedelta(days=keep_weekly)
+    monthly_deleted, _ = OnTheBooksSnapshot.objects.filter(snapshot_date__lt=monthly_cutoff).exclude(
+        snapshot_date__day__lte=7
+    ).delete()
+    return deleted + monthly_deleted
@@ -0,0 +1,144 @@
+"""
+One place to compute a tenant's revenue, per stream and in total.
+
+The dashboard, the statistics page and the PDF/Excel exports all go through
+RevenueService so their numbers agree, and every method costs one query.
+"""
+import datetime
+from decimal import Decimal
+from django.db.models import CharField, Count, Q, Sum, Value
+from .models import DailyTenantStats
+from .stats import day_bounds, get_stream_sources, get_stream_totals, source_queryset
+
+Stream = DailyTenantStats.Stream
+
+
+class RevenueBreakdown:
+    """Revenue and record counts per stream, plus the total."""
+
+    def __init__(self, revenue=None, counts=None):
+        self.revenue = {stream: Decimal(0) for stream in Stream.values}
+        self.counts = {stream: 0 for stream in Stream.values}
+        self.revenue.update({k: Decimal(v or 0) for k, v in (revenue or {}).items()})
+        self.counts.update({k: v or 0 for k, v in (counts or {}).items()})
+
+    @property
+    def rooms(self):
+        return self.revenue[Stream.ROOMS]
+
+    @property
+    def services(self):
+        return self.revenue[Stream.SERVICES]
+
+    @property
+    def events(self):
+        return self.revenue[Stream.EVENTS]
+
+    @property
+    def gym(self):
+        return self.revenue[Stream.GYM]
+
+    @property
+    def total(self):
+        return sum(self.revenue.values(), Decimal(0))
+
+    def labelled(self):
+        """[(label, revenue)] in display order."""
+        return [(label, self.revenue[stream]) for stream, label in Stream.choices]
+
+
+class RevenueService:
+    def __init__(self, tenant):
+        self.tenant = tenant
+
+    def booked(self, start=None, end=None):
+        """
+        Accrued revenue of non-cancelled records created between `start` and
+        `end` (inclusive dates), read from the DailyTenantStats fact table.
+        """
+        totals = get_stream_totals(self.tenant, start=start, end=end)
+        return RevenueBreakdown(
+            revenue={stream: t['revenue'] for stream, t in totals.items()},
+            counts={stream: t['count'] for stream, t in totals.items()},
+        )
+
+    def booked_live(self, start=None, end=None):
+        """
+        Same as booked(), straight from the source tables: one UNION ALL of a
+        DB-side Sum per stream (gym joins to the plan price). Useful to verify
+        the fact table.
+        """
+        queries = []
+        for stream, source in get_stream_sources().items():
+            queryset = source_queryset(stream, tenant=self.tenant)
+            if start:
+                queryset = queryset.filter(created_at__gte=day_bounds(start)[0])
+            if end:
+                queryset = queryset.filter(created_at__lt=day_bounds(end)[1])
+            queries.append(
+                queryset.annotate(stream=Value(stream, output_field=CharField()))
+                .values('stream')
+                .annotate(count=Count('id'), revenue=Sum(source.amount_field))
+                .order_by()
+            )
+        rows = queries[0].union(*queries[1:], all=True)
+        return RevenueBreakdown(
+            revenue={row['stream']: row['revenue'] for row in rows},
+            counts={row['stream']: row['count'] for row in rows},
+        )
+
+    def collected(self, start=None, end=None):
+        """
+        Paid invoice amounts (cash collected) per stream, excluding platform
+        subscription invoices, from one conditional aggregate.
+        `start`/`end` are inclusive dates on the invoice's issued date.
+        """
+        from billing.models import Invoice
+
+        invoices = Invoice.objects.filter(tenant=self.tenant, status=Invoice.Status.PAID).exclude(
+            invoice_type=Invoice.Type.SUBSCRIPTION
+        )
+        if start:
+            invoices = invoices.filter(issued_date__gte=day_bounds(start)[0])
+        if end:
+            invoices = invoices.filter(issued_date__lt=day_bounds(end)[1])
+
+        stream_types = {
+            Stream.ROOMS: [Invoice.Type.BOOKING, Invoice.Type.OTHER],
+            Stream.SERVICES: [Invoice.Type.SERVICE],
+            Stream.EVENTS: [Invoice.Type.EVENT],
+            Stream.GYM: [Invoice.Type.GYM],
+        }
+        aggregates = {}
+        for stream, types in stream_types.items():
+            aggregates[f'{stream}_revenue'] = Sum('amount', filter=Q(invoice_type__in=types))
+            aggregates[f'{stream}_count'] = Count('id', filter=Q(invoice_type__in=types))
+        totals = invoices.aggregate(**aggregates)
+
+        return RevenueBreakdown(
+            revenue={stream: totals[f'{stream}_revenue'] for stream in stream_types},
+            counts={stream: totals[f'{stream}_count'] for stream in stream_types},
+        )
+
+    def daily_collected(self, start, end):
+        """
+        {date: paid amount} for every day from `start` to `end` (inclusive), one grouped query.
+        """
+        from billing.models import Invoice
+        from django.db.models.functions import TruncDate
+
+        rows = Invoice.objects.filter(
+            tenant=self.tenant,
+            status=Invoice.Status.PAID,
+            issued_date__gte=day_bounds(start)[0],
+            issued_date__lt=day_bounds(end)[1],
+        ).exclude(invoice_type=Invoice.Type.SUBSCRIPTION).annotate(
+            day=TruncDate('issued_date')
+        ).values('day').annotate(total=Sum('amount')).order_by()
+
+        by_day = {row['day']: row['total'] for row in rows}
+        days = (end - start).days + 1
+        return {
+            start + datetime.timedelta(days=i): by_day.get(start + datetime.timedelta(days=i)) or Decimal(0)
+            for i in range(days)
+        }
@@ -0,0 +1,73 @@
+"""
+Date-bounded trend rollups over DailyTenantStats.
+
+Each granularity only reads the facts inside its own window (e.g. the last 30
+days, the last 12 months) instead of grouping the full history and slicing
+the result in Python.
+"""
+import datetime
+from collections import namedtuple
+from django.db.models.functions import TruncDay, TruncWeek, TruncMonth, TruncQuarter, TruncYear
+from django.utils import timezone
+from .models import DailyTenantStats
+from .stats import get_stream_trend
+
+Granularity = namedtuple('Granularity', 'trunc buckets')
+
+# Default window per granularity (number of buckets, None = all history)
+GRANULARITIES = {
+    'daily': Granularity(TruncDay, 30),
+    'weekly': Granularity(TruncWeek, 12),
+    'monthly': Granularity(TruncMonth, 12),
+    'quarterly': Granularity(TruncQuarter, 8),
+    'yearly': Granularity(TruncYear, None),
+}
+
+
+def shift_months(day, months):
+    month_index = day.year * 12 + day.month - 1 + months
+    return datetime.date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def window_start(period, buckets, today=None):
+    """
+    First date of the oldest bucket when showing `buckets` periods up to today.
+    """
+    today = today or timezone.localdate()
+    if buckets is None:
+        return None
+    if period == 'daily':
+        return today - datetime.timedelta(days=buckets - 1)
+    if period == 'weekly':
+        monday = today - datetime.timedelta(days=today.weekday())
+        return monday - datetime.timedelta(weeks=buckets - 1)
+    if period == 'monthly':
+        return shift_months(today.replace(day=1), -(buckets - 1))
+    if period == 'quarterly':
+        quarter_start = today.replace(month=(today.month - 1) // 3 * 3 + 1, day=1)
+        return shift_months(quarter_start, -3 * (buckets - 1))
+    if period == 'yearly':
+        return datetime.date(today.year - buckets + 1, 1, 1)
+    raise ValueError(f"Unknown period: {period}")
+
+
+def get_rollup(tenant, period, buckets=None, stream=DailyTenantStats.Stream.ROOMS, today=None):
+    """
+    [{'period', 'sales', 'guests'}] for the last `buckets` periods (default:
+    the granularity's window), oldest first. Only buckets with data are returned.
+    """
+    granularity = GRANULARITIES[period]
+    buckets = buckets or granularity.buckets
+    rows = get_stream_trend(tenant, granularity.trunc, stream=stream)
+    start = window_start(period, buckets, today=today)
+    if start:
+        rows = rows.filter(date__gte=start)
+    return list(rows)
+
+
+def get_rollups(tenant, periods, buckets=None, **kwargs):
+    """
+    {period: rollup} for each requested period. `buckets` may map period -> window size.
+    """
+    buckets = buckets or {}
+    return {period: get_rollup(tenant, period, buckets=buckets.get(period), **kwargs) for period in periods}
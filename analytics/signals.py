@@ -0,0 +1,103 @@
+from django.db.models.signals import post_save, post_delete
+from django.db.models.functions import TruncDate
+from django.dispatch import receiver
+from django.utils import timezone
+from booking.models import Booking
+from services.models import GuestOrder
+from events.models import EventBooking
+from gym.models import GymMembership, GymPlan
+from billing.models import Invoice, Payment
+from hotel.models import Room, RoomType
+from .cache import bump_data_version
+from .models import DailyTenantStats
+from .stats import refresh_daily_stats
+
+
+def get_tenant_id(instance):
+    """Tenant of a source record, following the same relation the stream uses."""
+    if isinstance(instance, Booking):
+        return instance.tenant_id
+    if isinstance(instance, GuestOrder):
+        return instance.booking.tenant_id if instance.booking_id else None
+    if isinstance(instance, EventBooking):
+        return instance.hall.tenant_id if instance.hall_id else None
+    if isinstance(instance, GymMembership):
+        return instance.plan.tenant_id if instance.plan_id else None
+    return None
+
+
+STREAM_BY_MODEL = {
+    Booking: DailyTenantStats.Stream.ROOMS,
+    GuestOrder: DailyTenantStats.Stream.SERVICES,
+    EventBooking: DailyTenantStats.Stream.EVENTS,
+    GymMembership: DailyTenantStats.Stream.GYM,
+}
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_save, sender=GuestOrder)
+@receiver(post_save, sender=EventBooking)
+@receiver(post_save, sender=GymMembership)
+@receiver(post_delete, sender=Booking)
+@receiver(post_delete, sender=GuestOrder)
+@receiver(post_delete, sender=EventBooking)
+@receiver(post_delete, sender=GymMembership)
+def update_daily_stats(sender, instance, **kwargs):
+    # Runs inside the save's transaction, so the fact row commits (or rolls back) with it
+    if kwargs.get('raw') or not instance.created_at:
+        return
+    try:
+        tenant_id = get_tenant_id(instance)
+    except Exception:
+        # Related row already gone (cascade delete); the tenant's stats go with it
+        return
+    if tenant_id:
+        refresh_daily_stats(tenant_id, STREAM_BY_MODEL[sender], timezone.localdate(instance.created_at))
+
+
+@receiver(post_save, sender=GymPlan)
+def update_gym_plan_stats(sender, instance, created, **kwargs):
+    # Gym revenue is the plan's price, so an edit changes every day it was sold on
+    if kwargs.get('raw') or created or not instance.tenant_id:
+        return
+    days = GymMembership.objects.filter(plan=instance).annotate(
+        day=TruncDate('created_at')
+    ).values_list('day', flat=True).distinct().order_by()
+    for day in days:
+        refresh_daily_stats(instance.tenant_id, DailyTenantStats.Stream.GYM, day)
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_save, sender=Invoice)
+@receiver(post_save, sender=Payment)
+@receiver(post_save, sender=GuestOrder)
+@receiver(post_save, sender=EventBooking)
+@receiver(post_save, sender=GymMembership)
+@receiver(post_save, sender=GymPlan)
+@receiver(post_save, sender=Room)
+@receiver(post_save, sender=RoomType)
+@receiver(post_delete, sender=Booking)
+@receiver(post_delete, sender=Invoice)
+@receiver(post_delete, sender=Payment)
+@receiver(post_delete, sender=GuestOrder)
+@receiver(post_delete, sender=EventBooking)
+@receiver(post_delete, sender=GymMembership)
+@receiver(post_delete, sender=GymPlan)
+@receiver(post_delete, sender=Room)
+@receiver(post_delete, sender=RoomType)
+def bump_tenant_data_version(sender, instance, **kwargs):
+    # Invalidates the tenant's cached statistics (analytics.cache); room counts,
+    # room status and plan prices feed the KPIs too
+    if kwargs.get('raw'):
+        return
+    try:
+        if isinstance(instance, (Invoice, GymPlan, Room, RoomType)):
+            tenant_id = instance.tenant_id
+        elif isinstance(instance, Payment):
+            tenant_id = instance.invoice.tenant_id
+        else:
+            tenant_id = get_tenant_id(instance)
+    except Exception:
+        return
+    if tenant_id:
+        bump_data_version(tenant_id)
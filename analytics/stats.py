@@ -0,0 +1,137 @@
+"""
+Maintenance and reads for the DailyTenantStats fact table.
+
+Each revenue stream maps to a source model, the lookup to its tenant and the
+field holding its amount. Facts count non-cancelled records by the local date
+they were created.
+"""
+import datetime
+from collections import namedtuple
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .cache import bump_data_version
+from .models import DailyTenantStats
+
+StreamSource = namedtuple('StreamSource', 'model tenant_lookup amount_field')
+
+Stream = DailyTenantStats.Stream
+
+
+def get_stream_sources():
+    from booking.models import Booking
+    from services.models import GuestOrder
+    from events.models import EventBooking
+    from gym.models import GymMembership
+
+    return {
+        Stream.ROOMS: StreamSource(Booking, 'tenant', 'total_price'),
+        Stream.SERVICES: StreamSource(GuestOrder, 'booking__tenant', 'total_price'),
+        Stream.EVENTS: StreamSource(EventBooking, 'hall__tenant', 'total_price'),
+        Stream.GYM: StreamSource(GymMembership, 'plan__tenant', 'plan__price'),
+    }
+
+
+def source_queryset(stream, tenant=None):
+    source = get_stream_sources()[stream]
+    queryset = source.model.objects.exclude(status='CANCELLED').filter(**{f'{source.tenant_lookup}__isnull': False})
+    if tenant is not None:
+        queryset = queryset.filter(**{source.tenant_lookup: tenant})
+    return queryset
+
+
+def day_bounds(day):
+    """Aware [start, end) datetimes for a local date, so lookups stay index-friendly."""
+    start = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+    return start, start + datetime.timedelta(days=1)
+
+
+def refresh_daily_stats(tenant_id, stream, day):
+    """
+    Recomputes one (tenant, day, stream) bucket from its source rows.
+    Recomputing instead of adding deltas makes status/price changes and deletes
+    self-correcting.
+    """
+    source = get_stream_sources()[stream]
+    start, end = day_bounds(day)
+    totals = source_queryset(stream).filter(
+        **{f'{source.tenant_lookup}_id': tenant_id},
+        created_at__gte=start,
+        created_at__lt=end,
+    ).aggregate(count=Count('id'), revenue=Sum(source.amount_field))
+
+    with transaction.atomic():
+        if totals['count']:
+            DailyTenantStats.objects.update_or_create(
+                tenant_id=tenant_id, date=day, stream=stream,
+                defaults={'count': totals['count'], 'revenue': totals['revenue'] or 0},
+            )
+        else:
+            DailyTenantStats.objects.filter(tenant_id=tenant_id, date=day, stream=stream).delete()
+
+
+def rebuild_daily_stats(tenant=None, since=None):
+    """
+    Recomputes the fact table from the source tables with one grouped query per
+    stream. Scoped to one tenant and/or dates from `since` when given.
+    Returns the number of fact rows written.
+    """
+    facts = []
+    for stream, source in get_stream_sources().items():
+        queryset = source_queryset(stream, tenant=tenant)
+        if since:
+            queryset = queryset.filter(created_at__gte=day_bounds(since)[0])
+        tenant_field = f'{source.tenant_lookup}_id'
+        rows = queryset.annotate(day=TruncDate('created_at')).values(tenant_field, 'day').annotate(
+            count=Count('id'), revenue=Sum(source.amount_field)
+        ).order_by()
+        facts.extend(
+            DailyTenantStats(
+                tenant_id=row[tenant_field], date=row['day'], stream=stream,
+                count=row['count'], revenue=row['revenue'] or 0,
+            )
+            for row in rows
+        )
+
+    existing = DailyTenantStats.objects.all()
+    if tenant is not None:
+        existing = existing.filter(tenant=tenant)
+    if since:
+        existing = existing.filter(date__gte=since)
+
+    with transaction.atomic():
+        existing.delete()
+        DailyTenantStats.objects.bulk_create(facts, batch_size=1000)
+        bump_data_version(tenant.pk if tenant is not None else None)
+    return len(facts)
+
+
+def get_stream_totals(tenant, start=None, end=None):
+    """
+    {stream: {'count': n, 'revenue': Decimal}} for every stream, in one query.
+    `start`/`end` are inclusive dates.
+    """
+    facts = DailyTenantStats.objects.filter(tenant=tenant)
+    if start:
+        facts = facts.filter(date__gte=start)
+    if end:
+        facts = facts.filter(date__lte=end)
+
+    totals = {stream: {'count': 0, 'revenue': 0} for stream in Stream.values}
+    for row in facts.values('stream').annotate(count=Sum('count'), revenue=Sum('revenue')).order_by():
+        totals[row['stream']] = {'count': row['count'], 'revenue': row['revenue']}
+    return totals
+
+
+def get_stream_trend(tenant, trunc_func, stream=Stream.ROOMS):
+    """
+    Facts rolled up by `trunc_func` (TruncDay, TruncWeek, ...) as
+    [{'period', 'sales', 'guests'}], oldest first.
+    """
+    return DailyTenantStats.objects.filter(tenant=tenant, stream=stream).annotate(
+        period=trunc_func('date')
+    ).values('period').annotate(
+        sales=Sum('revenue'),
+        guests=Sum('count')
+    ).order_by('period')
@@ -1,3 +1,48 @@
 from django.contrib import admin
+from .models import JournalEntry, JournalLine, LedgerAccount, NightAuditSummary, PaymentEvent
 
-# Register your models here.
+@admin.register(PaymentEvent)
+class PaymentEventAdmin(admin.ModelAdmin):
+    list_display = ('gateway', 'reference', 'event_type', 'invoice', 'status', 'attempts', 'received_at', 'processed_at')
+    list_filter = ('gateway', 'status')
+    search_fields = ('reference',)
+    readonly_fields = ('received_at', 'processed_at')
+
+
+class ReadOnlyAdmin(admin.ModelAdmin):
+    # The journal is append-only; corrections are new entries
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+@admin.register(LedgerAccount)
+class LedgerAccountAdmin(ReadOnlyAdmin):
+    list_display = ('tenant', 'code', 'balance', 'sequence', 'updated_at')
+    list_filter = ('code',)
+
+class JournalLineInline(admin.TabularInline):
+    model = JournalLine
+    fields = ('account', 'amount', 'balance', 'sequence')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+@admin.register(JournalEntry)
+class JournalEntryAdmin(ReadOnlyAdmin):
+    list_display = ('id', 'tenant', 'kind', 'invoice', 'payment', 'memo', 'posted_at')
+    list_filter = ('kind',)
+    search_fields = ('memo',)
+    inlines = [JournalLineInline]
+
+@admin.register(NightAuditSummary)
+class NightAuditSummaryAdmin(ReadOnlyAdmin):
+    list_display = ('tenant', 'business_date', 'rooms_occupied', 'rooms_total', 'occupancy', 'room_revenue', 'payments_total', 'closed_at')
+    list_filter = ('tenant',)
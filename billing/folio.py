@@ -0,0 +1,72 @@
+"""
+Guest folios: every charge, payment and the balance for a stay or a guest.
+
+A folio is three queries however many invoices it has: the invoices with
+their booking/event/membership joined in, then their payments and their room
+service orders prefetched. Guest folios find invoices through the
+denormalized Invoice.guest column (invoice_guest_idx) rather than ORing the
+booking, event and gym joins.
+"""
+from decimal import Decimal
+from django.db.models import Prefetch
+from .models import Invoice, Payment
+
+
+def folio_queryset(queryset):
+    return queryset.select_related(
+        'tenant', 'booking__room__room_type', 'event_booking__hall', 'gym_membership__plan',
+    ).prefetch_related(
+        Prefetch('payments', queryset=Payment.objects.order_by('payment_date', 'id')),
+        'orders',
+    ).order_by('issued_date', 'id')
+
+
+def charge_description(invoice):
+    """What the invoice is for, from the relations folio_queryset loads."""
+    orders = invoice.orders.all()
+    if orders:
+        return f"Room Service Order #{orders[0].order_id or orders[0].pk}"
+    if invoice.event_booking_id:
+        return f"Event: {invoice.event_booking.event_name}"
+    if invoice.gym_membership_id:
+        return f"Gym Membership: {invoice.gym_membership.plan.name}"
+    if invoice.booking_id:
+        return f"Room {invoice.booking.room.room_number} ({invoice.booking.room.room_type.name})"
+    return invoice.get_invoice_type_display()
+
+
+def build_folio(queryset):
+    """
+    {'charges', 'payments', 'total_charged', 'total_paid', 'balance'} for the
+    invoices in `queryset`. Cancelled invoices are listed but not charged.
+    """
+    charges = list(folio_queryset(queryset))
+    payments = []
+    total_charged = total_paid = Decimal('0')
+    for invoice in charges:
+        invoice.description = charge_description(invoice)
+        invoice.paid_amount = sum((payment.amount for payment in invoice.payments.all()), Decimal('0'))
+        payments.extend(invoice.payments.all())
+        total_paid += invoice.paid_amount
+        if invoice.status != Invoice.Status.CANCELLED:
+            total_charged += invoice.amount
+    payments.sort(key=lambda payment: (payment.payment_date, payment.pk))
+    return {
+        'charges': charges,
+        'payments': payments,
+        'total_charged': total_charged,
+        'total_paid': total_paid,
+        'balance': total_charged - total_paid,
+    }
+
+
+def stay_folio(booking):
+    """The room charge and everything posted to the stay (room service)."""
+    return build_folio(Invoice.objects.filter(booking=booking))
+
+
+def guest_folio(user, tenant=None):
+    invoices = Invoice.objects.filter(guest=user)
+    if tenant:
+        invoices = invoices.filter(tenant=tenant)
+    return build_folio(invoices)
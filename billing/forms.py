@@ -1,5 +1,5 @@
 from django import forms
-from .models import Payment
+from .models import Payment, PaymentGateway
 
 class PaymentForm(forms.ModelForm):
     class Meta:
@@ -35,4 +35,20 @@ class PaymentGatewayForm(forms.Form):
     
     flutterwave_public_key = forms.CharField(required=False, widget=forms.TextInput(attrs={'class': 'w-full rounded-lg bg-background-dark border-border-dark text-text-main p-2.5'}))
     flutterwave_secret_key = forms.CharField(required=False, widget=forms.PasswordInput(render_value=True, attrs={'class': 'w-full rounded-lg bg-background-dark border-border-dark text-text-main p-2.5'}))
+    flutterwave_webhook_secret = forms.CharField(required=False, widget=forms.PasswordInput(render_value=True, attrs={'class': 'w-full rounded-lg bg-background-dark border-border-dark text-text-main p-2.5'}))
     flutterwave_active = forms.BooleanField(required=False, widget=forms.CheckboxInput(attrs={'class': 'rounded border-border-dark bg-background-dark text-primary focus:ring-primary'}))
+
+
+class SettlementUploadForm(forms.Form):
+    gateway = forms.ChoiceField(choices=PaymentGateway.Provider.choices, widget=forms.Select(attrs={'class': 'w-full rounded-lg bg-background-dark border-border-dark text-text-main p-2.5'}))
+    start_date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date', 'class': 'w-full rounded-lg bg-background-dark border-border-dark text-text-main p-2.5'}))
+    end_date = forms.DateField(widget=forms.DateInput(attrs={'type': 'date', 'class': 'w-full rounded-lg bg-background-dark border-border-dark text-text-main p-2.5'}))
+    settlement_file = forms.FileField(widget=forms.ClearableFileInput(attrs={'accept': '.csv', 'class': 'w-full text-sm text-text-main'}))
+    minor_units = forms.BooleanField(required=False, label="Amounts are in kobo/cents", widget=forms.CheckboxInput(attrs={'class': 'rounded border-border-dark bg-background-dark text-primary focus:ring-primary'}))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        start, end = cleaned_data.get('start_date'), cleaned_data.get('end_date')
+        if start and end and start > end:
+            raise forms.ValidationError("The start date must be on or before the end date.")
+        return cleaned_data
@@ -0,0 +1,240 @@
+"""
+Shared HTTP transport for the payment gateway APIs.
+
+Each provider gets one pooled keep-alive requests.Session per process, so
+calls skip the TCP/TLS handshake. Every call has strict (connect, read)
+timeouts. Idempotent calls are retried on transient errors with full-jitter
+exponential backoff. These are GETs, and POSTs carrying a reference the
+gateway dedupes.
+
+A circuit breaker per provider opens after GATEWAY_BREAKER_THRESHOLD
+transient failures in a row. While it is open, calls fail fast with
+CircuitOpenError instead of tying up worker threads on a dead gateway. After
+GATEWAY_BREAKER_RESET seconds one trial call is let through to close it
+again. Declines and other 4xx answers mean the gateway is up and do not count;
+any requests exception (connection, timeout, broken or undecodable response)
+is transient and does.
+
+The latency of every attempt is kept per process and endpoint; see
+gateway_metrics().
+"""
+import random
+import threading
+import time
+from collections import deque
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+
+class GatewayError(Exception):
+    """A charge/verification the gateway rejected (declined, bad token, ...)."""
+    transient = False
+
+
+class TransientGatewayError(GatewayError):
+    """Network errors, timeouts, 429 and 5xx responses; safe to retry with the same reference."""
+    transient = True
+
+
+class CircuitOpenError(TransientGatewayError):
+    """The provider failed repeatedly and calls are being refused until it recovers."""
+
+
+class DuplicateReferenceError(GatewayError):
+    """The gateway has already seen this reference (a previous attempt may have succeeded)."""
+
+
+def setting(name, default):
+    return getattr(settings, name, default)
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """
+        True if a call may go out now. Once open, one trial call is let through
+        every reset_timeout seconds; a trial that never reports back (it raised
+        something unexpected) doesn't keep the circuit shut for good.
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if now - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.opened_at = now
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class LatencyStats:
+    def __init__(self, window=500):
+        self.calls = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=window)
+
+    def record(self, elapsed, error=False):
+        self.calls += 1
+        self.errors += int(error)
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        self.recent.append(elapsed)
+
+    def snapshot(self):
+        recent = sorted(self.recent)
+
+        def percentile(p):
+            return recent[min(int(len(recent) * p), len(recent) - 1)] * 1000 if recent else 0
+
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'avg_ms': self.total / self.calls * 1000 if self.calls else 0,
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+            'max_ms': self.max * 1000,
+        }
+
+
+class GatewayClient:
+    """Pooled session, circuit breaker and metrics for one provider."""
+
+    def __init__(self, provider):
+        self.provider = provider
+        self.session = requests.Session()
+        pool_size = setting('GATEWAY_POOL_SIZE', 10)
+        # Retries are ours (jittered, idempotent calls only), not urllib3's
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.breaker = CircuitBreaker(setting('GATEWAY_BREAKER_THRESHOLD', 5), setting('GATEWAY_BREAKER_RESET', 30))
+        self.stats = {}
+        self._stats_lock = threading.Lock()
+
+    def record(self, endpoint, elapsed, error):
+        with self._stats_lock:
+            self.stats.setdefault(endpoint, LatencyStats()).record(elapsed, error)
+
+    def request(self, method, url, secret_key, endpoint, json=None, headers=None, idempotent=None, retries=None, timeout=None,
+                backoff=None):
+        """
+        Sends the call and returns the decoded JSON body. Raises
+        TransientGatewayError (retry later), DuplicateReferenceError or GatewayError.
+        """
+        if idempotent is None:
+            idempotent = method == 'GET'
+        if retries is None:
+            retries = setting('GATEWAY_RETRIES', 2)
+        if not idempotent:
+            retries = 0
+        timeout = timeout or (setting('GATEWAY_CONNECT_TIMEOUT', 3.05), setting('GATEWAY_READ_TIMEOUT', 15))
+        if backoff is None:
+            backoff = setting('GATEWAY_BACKOFF', 0.5)
+        backoff_max = setting('GATEWAY_BACKOFF_MAX', 5)
+
+        request_headers = {'Authorization': f'Bearer {secret_key}'}
+        if headers:
+            request_headers.update(headers)
+
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"{self.provider} is failing; calls paused for up to {self.breaker.reset_timeout}s")
+            try:
+                data = self._send(method, url, endpoint, json, request_headers, timeout)
+            except TransientGatewayError:
+                self.breaker.record_failure()
+                if attempt >= retries:
+                    raise
+                # Full jitter spreads out the retries of concurrent callers
+                time.sleep(random.uniform(0, min(backoff_max, backoff * (2 ** attempt))))
+                attempt += 1
+                continue
+            except GatewayError:
+                self.breaker.record_success()
+                raise
+            self.breaker.record_success()
+            return data
+
+    def _send(self, method, url, endpoint, json, headers, timeout):
+        started = time.perf_counter()
+        error = True
+        try:
+            try:
+                response = self.session.request(method, url, json=json, headers=headers, timeout=timeout)
+            except requests.RequestException as e:
+                raise TransientGatewayError(str(e)) from e
+
+            if response.status_code == 429 or response.status_code >= 500:
+                raise TransientGatewayError(f"{response.status_code} from {url}")
+
+            try:
+                data = response.json()
+            except ValueError as e:
+                # An error page from a proxy or load balancer in front of the gateway
+                raise TransientGatewayError(f"Undecodable {response.status_code} response from {url}") from e
+
+            error = False
+            if response.status_code >= 400:
+                message = data.get('message', '') if isinstance(data, dict) else ''
+                if 'duplicate' in message.lower():
+                    raise DuplicateReferenceError(message)
+                raise GatewayError(message or f"{response.status_code} from {url}")
+            return data
+        finally:
+            self.record(endpoint, time.perf_counter() - started, error)
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(provider):
+    """The process-wide client for `provider`, created on first use."""
+    client = _clients.get(provider)
+    if client is None:
+        with _clients_lock:
+            client = _clients.setdefault(provider, GatewayClient(provider))
+    return client
+
+
+def gateway_metrics():
+    """{provider: {'breaker': state, 'endpoints': {endpoint: latency snapshot}}} for this process."""
+    metrics = {}
+    for provider, client in list(_clients.items()):
+        with client._stats_lock:
+            endpoints = {endpoint: stats.snapshot() for endpoint, stats in client.stats.items()}
+        metrics[provider] = {'breaker': client.breaker.state, 'endpoints': endpoints}
+    return metrics
+
+
+def reset_clients():
+    """Closes all sessions and forgets breaker state and metrics (tests, benchmarks)."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.session.close()
+        _clients.clear()
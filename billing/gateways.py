@@ -0,0 +1,93 @@
+"""
+Thin server-side clients for the Paystack and Flutterwave APIs.
+
+API base URLs come from settings (PAYSTACK_API_BASE / FLUTTERWAVE_API_BASE),
+or per call from `api_base`, so the local stand-in in billing.mock_gateway can
+be used for testing. Calls go
+through billing.gateway_client (pooled sessions, timeouts, retries, circuit
+breaker).
+"""
+from decimal import Decimal
+from django.conf import settings
+# The exceptions are imported from here by views and commands
+from .gateway_client import (
+    CircuitOpenError, DuplicateReferenceError, GatewayError, TransientGatewayError, get_client,
+)
+
+
+def get_api_base(provider, api_base=None):
+    if api_base:
+        return api_base.rstrip('/')
+    if provider == 'FLUTTERWAVE':
+        return getattr(settings, 'FLUTTERWAVE_API_BASE', 'https://api.flutterwave.com').rstrip('/')
+    return getattr(settings, 'PAYSTACK_API_BASE', 'https://api.paystack.co').rstrip('/')
+
+
+def to_minor_units(amount):
+    """Paystack amounts are in kobo/cents."""
+    return int((Decimal(str(amount)) * 100).quantize(Decimal('1')))
+
+
+def fetch_transaction(gateway, reference, retries=None, timeout=None, api_base=None):
+    """
+    The gateway's record of the transaction as (successful, data). `data` has
+    the same shape as the `data` of its webhook notifications.
+    """
+    base = get_api_base(gateway.name, api_base)
+    client = get_client(gateway.name)
+    if gateway.name == 'FLUTTERWAVE':
+        response = client.request(
+            'GET', f'{base}/v3/transactions/verify_by_reference?tx_ref={reference}', gateway.secret_key,
+            endpoint='verify', retries=retries, timeout=timeout,
+        )
+        data = response.get('data') or {}
+        return response.get('status') == 'success' and data.get('status') == 'successful', data
+
+    response = client.request(
+        'GET', f'{base}/transaction/verify/{reference}', gateway.secret_key,
+        endpoint='verify', retries=retries, timeout=timeout,
+    )
+    data = response.get('data') or {}
+    return bool(response.get('status')) and data.get('status') == 'success', data
+
+
+def verify_transaction(gateway, reference, retries=None, timeout=None, api_base=None):
+    """
+    Returns True if the gateway reports the transaction as successful.
+    """
+    return fetch_transaction(gateway, reference, retries=retries, timeout=timeout, api_base=api_base)[0]
+
+
+def charge_authorization(gateway, authorization_code, email, amount, currency, reference, retries=None, timeout=None,
+                         api_base=None, backoff=None):
+    """
+    Charges a saved card authorization (recurring billing).
+
+    `reference` doubles as the idempotency key: the gateways reject a reused
+    reference, in which case we verify it to find out whether an earlier
+    attempt went through. That makes the charge safe to retry. Returns True
+    on success, False if declined.
+    """
+    base = get_api_base(gateway.name, api_base)
+    client = get_client(gateway.name)
+    try:
+        if gateway.name == 'FLUTTERWAVE':
+            data = client.request('POST', f'{base}/v3/tokenized-charges', gateway.secret_key, endpoint='charge', json={
+                'token': authorization_code,
+                'email': email,
+                'amount': str(amount),
+                'currency': currency,
+                'tx_ref': reference,
+            }, idempotent=True, retries=retries, timeout=timeout, backoff=backoff)
+            return data.get('status') == 'success' and data.get('data', {}).get('status') == 'successful'
+
+        data = client.request('POST', f'{base}/transaction/charge_authorization', gateway.secret_key, endpoint='charge', json={
+            'authorization_code': authorization_code,
+            'email': email,
+            'amount': to_minor_units(amount),
+            'currency': currency,
+            'reference': reference,
+        }, idempotent=True, retries=retries, timeout=timeout, backoff=backoff)
+        return bool(data.get('status')) and data.get('data', {}).get('status') == 'success'
+    except DuplicateReferenceError:
+        return verify_transaction(gateway, reference, retries=retries, timeout=timeout, api_base=api_base)
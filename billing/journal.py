@@ -0,0 +1,275 @@
+"""
+Double-entry journal of a tenant's invoices and payments.
+
+Invoice.save and Payment.save post here inside their own transaction:
+
+    charge   Dr RECEIVABLE  Cr REVENUE     (the invoice amount, nothing once cancelled)
+    payment  Dr CASH        Cr RECEIVABLE  (negative for refunds)
+
+Only the difference from what the journal already holds for the invoice or
+payment is posted, so amount changes and cancellations become ADJUSTMENT
+entries and saving twice posts nothing. The tenant's three accounts are
+locked before the journal is read, which serialises postings per tenant and
+keeps every line's running balance exact.
+
+Subscription invoices (the hotel paying the platform) are not journaled,
+matching the tenant transaction ledger.
+"""
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+from .models import Invoice, JournalEntry, JournalLine, LedgerAccount, Payment
+
+ZERO = Decimal('0')
+Code = LedgerAccount.Code
+Kind = JournalEntry.Kind
+
+
+def is_journaled(invoice):
+    return invoice.tenant_id is not None and invoice.invoice_type != Invoice.Type.SUBSCRIPTION
+
+
+def charge_amount(invoice):
+    if invoice.status == Invoice.Status.CANCELLED:
+        return ZERO
+    return Decimal(str(invoice.amount))
+
+
+def lock_accounts(tenant_id):
+    """The tenant's accounts by code, locked (in code order) for this transaction."""
+    accounts = {
+        account.code: account
+        for account in LedgerAccount.objects.select_for_update().filter(tenant_id=tenant_id).order_by('code')
+    }
+    if len(accounts) < len(Code.values):
+        for code in Code.values:
+            if code not in accounts:
+                LedgerAccount.objects.get_or_create(tenant_id=tenant_id, code=code)
+        return lock_accounts(tenant_id)
+    return accounts
+
+
+def charge_lines(amount):
+    return [(Code.RECEIVABLE, amount), (Code.REVENUE, -amount)]
+
+
+def payment_lines(amount):
+    return [(Code.CASH, amount), (Code.RECEIVABLE, -amount)]
+
+
+def append_entries(accounts, postings):
+    """
+    Writes `postings`, a list of (unsaved JournalEntry, [(code, amount), ...]),
+    onto the locked `accounts` with running balances, in two bulk inserts.
+    """
+    for entry, amounts in postings:
+        if sum(amount for _, amount in amounts) != 0:
+            raise ValueError(f"Unbalanced journal entry: {amounts}")
+
+    entries = JournalEntry.objects.bulk_create([entry for entry, _ in postings], batch_size=1000)
+    lines = []
+    for entry, (_, amounts) in zip(entries, postings):
+        for code, amount in amounts:
+            account = accounts[code]
+            account.balance += amount
+            account.sequence += 1
+            lines.append(JournalLine(
+                entry=entry, account=account, amount=amount,
+                balance=account.balance, sequence=account.sequence, posted_at=entry.posted_at,
+            ))
+    JournalLine.objects.bulk_create(lines, batch_size=1000)
+    for account in accounts.values():
+        account.save(update_fields=['balance', 'sequence', 'updated_at'])
+    return entries
+
+
+def posted_total(account, **entry_filter):
+    return JournalLine.objects.filter(
+        account=account, **{f"entry__{key}": value for key, value in entry_filter.items()}
+    ).aggregate(total=Sum('amount'))['total'] or ZERO
+
+
+def journal_invoice(invoice, adding=False):
+    """Posts the change in the invoice's charge since it was last journaled."""
+    if not is_journaled(invoice):
+        return
+    with transaction.atomic():
+        accounts = lock_accounts(invoice.tenant_id)
+        posted = ZERO if adding else -posted_total(accounts[Code.REVENUE], invoice=invoice)
+        delta = charge_amount(invoice) - posted
+        if not delta:
+            return
+        entry = JournalEntry(
+            tenant_id=invoice.tenant_id,
+            kind=Kind.ADJUSTMENT if posted else Kind.CHARGE,
+            invoice=invoice,
+            memo=f"Invoice #{invoice.pk} ({invoice.get_invoice_type_display()}, {invoice.get_status_display()})",
+            posted_at=timezone.now(),
+        )
+        append_entries(accounts, [(entry, charge_lines(delta))])
+
+
+def journal_payment(payment, adding=False):
+    """Posts the payment, or the change in its amount since it was last journaled."""
+    invoice = payment.invoice
+    if not is_journaled(invoice):
+        return
+    with transaction.atomic():
+        accounts = lock_accounts(invoice.tenant_id)
+        posted = ZERO if adding else posted_total(accounts[Code.CASH], payment=payment)
+        delta = Decimal(str(payment.amount)) - posted
+        if not delta:
+            return
+        if posted:
+            kind = Kind.ADJUSTMENT
+        else:
+            kind = Kind.PAYMENT if delta > 0 else Kind.REFUND
+        entry = JournalEntry(
+            tenant_id=invoice.tenant_id,
+            kind=kind,
+            invoice=invoice,
+            payment=payment,
+            memo=f"{payment.get_payment_method_display()} {payment.transaction_id}".strip(),
+            posted_at=timezone.now(),
+        )
+        append_entries(accounts, [(entry, payment_lines(delta))])
+
+
+def account_balance(tenant, code, at=None):
+    """
+    The account's balance now, or at the end of `at` (a datetime): the running
+    balance on its latest line up to then, one seek on journalline_balance_idx.
+    """
+    if at is None:
+        balance = LedgerAccount.objects.filter(tenant=tenant, code=code).values_list('balance', flat=True).first()
+    else:
+        balance = JournalLine.objects.filter(
+            account__tenant=tenant, account__code=code, posted_at__lte=at,
+        ).order_by('-posted_at', '-sequence').values_list('balance', flat=True).first()
+    return balance if balance is not None else ZERO
+
+
+def trial_balance(tenant, at=None):
+    return {code: account_balance(tenant, code, at) for code in Code.values}
+
+
+def missing_postings(tenant_id):
+    """
+    What the tenant's journal lacks compared with its invoices and payments,
+    as (entry, lines) postings in source date order, from grouped aggregates
+    rather than per-row queries. Postings of since-deleted invoices are reversed.
+    """
+    invoices = Invoice.objects.filter(tenant_id=tenant_id).exclude(invoice_type=Invoice.Type.SUBSCRIPTION)
+    payments = Payment.objects.filter(invoice__in=invoices)
+    lines = JournalLine.objects.filter(account__tenant_id=tenant_id)
+
+    posted_charges = dict(
+        lines.filter(account__code=Code.REVENUE).values('entry__invoice').annotate(total=Sum('amount'))
+        .values_list('entry__invoice', 'total')
+    )
+    posted_payments = dict(
+        lines.filter(account__code=Code.CASH).values('entry__payment').annotate(total=Sum('amount'))
+        .values_list('entry__payment', 'total')
+    )
+
+    postings = []
+    for pk, amount, status, issued_date in invoices.values_list('pk', 'amount', 'status', 'issued_date').iterator():
+        posted = -posted_charges.pop(pk, ZERO)
+        delta = (ZERO if status == Invoice.Status.CANCELLED else amount) - posted
+        if delta:
+            entry = JournalEntry(
+                tenant_id=tenant_id, kind=Kind.ADJUSTMENT if posted else Kind.CHARGE,
+                invoice_id=pk, memo=f"Invoice #{pk} (recomputed)", posted_at=issued_date,
+            )
+            postings.append((entry, charge_lines(delta)))
+
+    for pk, invoice_id, amount, payment_date in payments.values_list('pk', 'invoice_id', 'amount', 'payment_date').iterator():
+        posted = posted_payments.pop(pk, ZERO)
+        delta = amount - posted
+        if delta:
+            kind = Kind.ADJUSTMENT if posted else (Kind.PAYMENT if delta > 0 else Kind.REFUND)
+            entry = JournalEntry(
+                tenant_id=tenant_id, kind=kind, invoice_id=invoice_id, payment_id=pk,
+                memo=f"Payment #{pk} (recomputed)", posted_at=payment_date,
+            )
+            postings.append((entry, payment_lines(delta)))
+
+    # Whatever is left was posted for invoices and payments that no longer exist
+    now = timezone.now()
+    orphaned_charges = -sum(posted_charges.values(), ZERO)
+    orphaned_payments = sum(posted_payments.values(), ZERO)
+    if orphaned_charges:
+        postings.append((
+            JournalEntry(tenant_id=tenant_id, kind=Kind.ADJUSTMENT, memo="Reverse charges of deleted invoices", posted_at=now),
+            charge_lines(-orphaned_charges),
+        ))
+    if orphaned_payments:
+        postings.append((
+            JournalEntry(tenant_id=tenant_id, kind=Kind.ADJUSTMENT, memo="Reverse deleted payments", posted_at=now),
+            payment_lines(-orphaned_payments),
+        ))
+
+    postings.sort(key=lambda posting: posting[0].posted_at)
+    return postings
+
+
+def repair_journal(tenant_id):
+    """
+    Appends the missing postings. Backdated postings are moved up to the
+    journal's latest line so posted_at stays in sequence order. Returns the
+    number of entries written.
+    """
+    with transaction.atomic():
+        accounts = lock_accounts(tenant_id)
+        postings = missing_postings(tenant_id)
+        if not postings:
+            return 0
+        latest = JournalLine.objects.filter(account__tenant_id=tenant_id).aggregate(latest=Max('posted_at'))['latest']
+        for entry, _ in postings:
+            if latest and entry.posted_at < latest:
+                entry.posted_at = latest
+        append_entries(accounts, postings)
+    return len(postings)
+
+
+def integrity_errors(tenant_id=None):
+    """
+    Checks that entries balance, that each account's balance and sequence match
+    its lines, and that every line's running balance follows from the one
+    before. These cannot be repaired by appending; they are reported.
+    """
+    lines = JournalLine.objects.all()
+    accounts = LedgerAccount.objects.all()
+    if tenant_id:
+        lines = lines.filter(account__tenant_id=tenant_id)
+        accounts = accounts.filter(tenant_id=tenant_id)
+    errors = []
+
+    unbalanced = lines.values('entry').annotate(total=Sum('amount')).exclude(total=0).count()
+    if unbalanced:
+        errors.append(f"{unbalanced} unbalanced journal entries")
+
+    totals = {
+        row['account']: row
+        for row in lines.values('account').annotate(total=Sum('amount'), count=Count('id'), last=Max('sequence'))
+    }
+    for account in accounts:
+        row = totals.get(account.pk, {'total': ZERO, 'count': 0, 'last': 0})
+        if row['total'] != account.balance or row['last'] != account.sequence or row['count'] != account.sequence:
+            errors.append(
+                f"{account}: lines sum to {row['total']} over {row['count']} lines (last #{row['last']}), "
+                f"account holds {account.balance} at #{account.sequence}"
+            )
+
+    account_id = running = expected_sequence = None
+    rows = lines.order_by('account_id', 'sequence').values_list('account_id', 'sequence', 'amount', 'balance')
+    for line_account, sequence, amount, balance in rows.iterator(chunk_size=5000):
+        if line_account != account_id:
+            account_id, running, expected_sequence = line_account, ZERO, 1
+        running += amount
+        if sequence != expected_sequence or balance != running:
+            errors.append(f"Account {account_id} line #{sequence}: running balance {balance}, expected {running}")
+            running = balance
+        expected_sequence = sequence + 1
+    return errors
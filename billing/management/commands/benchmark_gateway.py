@@ -0,0 +1,53 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from billing.gateway_client import gateway_metrics, reset_clients
+from billing.gateways import charge_authorization, GatewayError, TransientGatewayError
+from billing.mock_gateway import start_mock_gateway
+from billing.models import PaymentGateway
+
+
+class Command(BaseCommand):
+    help = 'Exercises the gateway client against the local mock gateway and prints latency and circuit breaker metrics'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calls', type=int, default=500, help='Charges to make (each is then verified)')
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--provider', default='PAYSTACK', choices=PaymentGateway.Provider.values)
+        parser.add_argument('--latency', type=float, default=0, help='Seconds of delay added by the mock gateway')
+        parser.add_argument('--failure-rate', type=float, default=0, help='Fraction of mock requests answered with a 503')
+
+    def handle(self, *args, **options):
+        server = start_mock_gateway(latency=options['latency'], failure_rate=options['failure_rate'])
+        reset_clients()
+        gateway = PaymentGateway(name=options['provider'], secret_key='sk_test_mock', is_active=True)
+        prefix = f"BENCH-{int(time.time())}"
+        outcomes = {}
+
+        def run(i):
+            try:
+                charge_authorization(
+                    gateway, 'AUTH_mock', 'bench@example.com', 100, 'NGN', f"{prefix}-{i}", api_base=server.base_url,
+                )
+                return 'ok'
+            except TransientGatewayError as e:
+                return type(e).__name__
+            except GatewayError:
+                return 'rejected'
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as executor:
+            for outcome in executor.map(run, range(options['calls'])):
+                outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        elapsed = time.perf_counter() - started
+        server.shutdown()
+
+        self.stdout.write(f"{options['calls']} charges in {elapsed:.2f}s ({options['calls'] / elapsed:.0f}/s): "
+                          + ', '.join(f"{count} {outcome}" for outcome, count in sorted(outcomes.items())))
+        for provider, metrics in gateway_metrics().items():
+            self.stdout.write(f"{provider}: circuit {metrics['breaker']}")
+            for endpoint, stats in metrics['endpoints'].items():
+                self.stdout.write(
+                    f"  {endpoint}: {stats['calls']} attempts, {stats['errors']} errors, avg {stats['avg_ms']:.1f}ms, "
+                    f"p50 {stats['p50_ms']:.1f}ms, p95 {stats['p95_ms']:.1f}ms, max {stats['max_ms']:.1f}ms"
+                )
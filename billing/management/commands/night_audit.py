@@ -0,0 +1,59 @@
+import datetime
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from billing.night_audit import close_business_day, open_business_date
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = "Posts nightly room charges and closes each tenant's open business days up to yesterday"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', help='Tenant slug (default: all active tenants)')
+        parser.add_argument('--date', help="Close only this business date (YYYY-MM-DD); it must be the tenant's open one")
+        parser.add_argument('--through', help='Close open business dates up to and including this one (default: yesterday)')
+
+    def handle(self, *args, **options):
+        tenants = Tenant.objects.filter(is_active=True)
+        if options['tenant']:
+            tenants = Tenant.objects.filter(slug=options['tenant'])
+            if not tenants.exists():
+                raise CommandError(f"Tenant '{options['tenant']}' not found")
+
+        try:
+            only = datetime.date.fromisoformat(options['date']) if options['date'] else None
+            through = datetime.date.fromisoformat(options['through']) if options['through'] else None
+        except ValueError:
+            raise CommandError("--date and --through must be YYYY-MM-DD")
+        today = timezone.localdate()
+        through = through or today - datetime.timedelta(days=1)
+        if through >= today or (only and only >= today):
+            raise CommandError("Only days that are over can be closed; use a date before today")
+
+        started = time.perf_counter()
+        closed = charges = 0
+        for tenant in tenants:
+            business_date = only or open_business_date(tenant)
+            last = only or through
+            while business_date <= last:
+                try:
+                    summary, created = close_business_day(tenant, business_date)
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(f"{tenant.name} {business_date}: audit failed: {e}"))
+                    break
+                if created:
+                    closed += 1
+                    charges += summary.charges_posted
+                    self.stdout.write(
+                        f"{tenant.name} {business_date}: {summary.charges_posted} room charges, "
+                        f"occupancy {summary.occupancy}% ({summary.rooms_occupied}/{summary.rooms_total}), "
+                        f"room revenue {summary.room_revenue}, payments {summary.payments_total}"
+                    )
+                else:
+                    self.stdout.write(f"{tenant.name} {business_date}: already closed")
+                business_date += datetime.timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Closed {closed} business days, {charges} room charges posted in {time.perf_counter() - started:.1f}s."
+        ))
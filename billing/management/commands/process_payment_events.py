@@ -0,0 +1,33 @@
+import datetime
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+from billing.models import PaymentEvent
+from billing.webhooks import process_payment_event
+
+
+class Command(BaseCommand):
+    help = 'Applies payment webhook events that failed or were never picked up by a background worker'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stale-minutes', type=int, default=5, help='Retry received events older than this (default: 5)')
+        parser.add_argument('--max-attempts', type=int, default=5, help='Give up on events that failed this many times (default: 5)')
+        parser.add_argument('--limit', type=int, default=500)
+
+    def handle(self, *args, **options):
+        stale = timezone.now() - datetime.timedelta(minutes=options['stale_minutes'])
+        event_ids = list(
+            PaymentEvent.objects.filter(
+                Q(status=PaymentEvent.Status.RECEIVED, received_at__lt=stale)
+                | Q(status=PaymentEvent.Status.FAILED, attempts__lt=options['max_attempts'])
+            ).order_by('received_at').values_list('pk', flat=True)[:options['limit']]
+        )
+
+        counts = {}
+        for event_id in event_ids:
+            status = process_payment_event(event_id)
+            if status:
+                counts[status] = counts.get(status, 0) + 1
+
+        summary = ', '.join(f"{count} {status.lower()}" for status, count in sorted(counts.items())) or 'nothing to do'
+        self.stdout.write(self.style.SUCCESS(f"Processed {len(event_ids)} payment events: {summary}."))
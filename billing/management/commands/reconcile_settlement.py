@@ -0,0 +1,51 @@
+import datetime
+import time
+from django.core.management.base import BaseCommand, CommandError
+from billing.models import PaymentGateway, SettlementReport
+from billing.reconciliation import SettlementFileError, reconcile
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = "Reconciles a gateway settlement CSV against the tenant's recorded payments"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Settlement CSV exported from the gateway dashboard')
+        parser.add_argument('--tenant', required=True, help='Tenant slug')
+        parser.add_argument('--gateway', required=True, choices=[value.lower() for value in PaymentGateway.Provider.values])
+        parser.add_argument('--start', required=True, help='First payment date (YYYY-MM-DD)')
+        parser.add_argument('--end', required=True, help='Last payment date (YYYY-MM-DD)')
+        parser.add_argument('--minor-units', action='store_true', help='Amounts in the file are in kobo/cents')
+
+    def handle(self, *args, **options):
+        tenant = Tenant.objects.filter(slug=options['tenant']).first()
+        if not tenant:
+            raise CommandError(f"Tenant '{options['tenant']}' not found")
+        try:
+            start = datetime.date.fromisoformat(options['start'])
+            end = datetime.date.fromisoformat(options['end'])
+        except ValueError:
+            raise CommandError("--start and --end must be YYYY-MM-DD")
+
+        report = SettlementReport(
+            tenant=tenant,
+            gateway=options['gateway'].upper(),
+            start_date=start,
+            end_date=end,
+            source_name=options['path'],
+        )
+        started = time.perf_counter()
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as f:
+                reconcile(report, f, minor_units=options['minor_units'])
+        except (OSError, SettlementFileError) as e:
+            raise CommandError(str(e))
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{report.line_count} lines ({report.skipped_count} skipped): {report.matched_count} matched, "
+            f"{report.mismatch_count} amount mismatches, {report.duplicate_count} duplicates, "
+            f"{report.unrecorded_count} settled but not recorded, {report.unsettled_count} recorded but not settled."
+        )
+        self.stdout.write(f"Settled {report.settled_total}, recorded {report.recorded_total}.")
+        self.stdout.write(self.style.SUCCESS(f"Report #{report.pk} written in {elapsed:.1f}s ({report.line_count / max(elapsed, 0.001):.0f} lines/s)."))
@@ -0,0 +1,102 @@
+import datetime
+import os
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from tenants.models import Tenant
+from billing.receipts import (
+    daily_paid_invoices, get_branding, invoice_receipt_data, receipt_name, render_receipt, store_receipt,
+)
+
+
+class Command(BaseCommand):
+    help = "Renders the receipts of a day's paid invoices in parallel into one ZIP archive"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Business date (YYYY-MM-DD, default: today)')
+        parser.add_argument('--tenant', help='Tenant slug (default: all tenants)')
+        parser.add_argument('--output', help='ZIP file to write (default: receipts_<date>.zip)')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Render processes (default: CPU count)')
+        parser.add_argument('--no-cache', action='store_true', help='Re-render receipts already in media storage')
+
+    def handle(self, *args, **options):
+        day = timezone.localdate()
+        if options['date']:
+            try:
+                day = datetime.date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError("--date must be YYYY-MM-DD")
+
+        tenant = None
+        if options['tenant']:
+            tenant = Tenant.objects.filter(slug=options['tenant']).first()
+            if not tenant:
+                raise CommandError(f"Tenant '{options['tenant']}' not found")
+
+        invoices = daily_paid_invoices(day, tenant=tenant)
+        total = invoices.count()
+        if not total:
+            self.stdout.write(f"No paid invoices on {day}.")
+            return
+
+        output = options['output'] or f"receipts_{day:%Y%m%d}.zip"
+        workers = max(options['workers'], 1)
+        use_cache = not options['no_cache']
+        self.stdout.write(f"Rendering {total} receipts for {day} with {workers} workers into {output}")
+
+        self.total = total
+        self.done = 0
+        self.rendered = 0
+        self.started = time.perf_counter()
+        self.report_every = max(total // 20, 1)
+        brandings = {}
+        # Bounded number of renders in flight, so finished PDFs don't pile up in memory
+        window = workers * 4
+
+        with zipfile.ZipFile(output, 'w', zipfile.ZIP_DEFLATED) as archive, ProcessPoolExecutor(max_workers=workers) as pool:
+            pending = {}
+            for invoice in invoices.iterator(chunk_size=500):
+                arcname = f"{invoice.tenant.slug if invoice.tenant else 'platform'}/Receipt_{invoice.pk}.pdf"
+                name = receipt_name('invoice', invoice, invoice.tenant)
+                if use_cache and default_storage.exists(name):
+                    with default_storage.open(name, 'rb') as f:
+                        archive.writestr(arcname, f.read())
+                    self.progress()
+                    continue
+
+                if invoice.tenant_id not in brandings:
+                    brandings[invoice.tenant_id] = get_branding(invoice.tenant)
+                data = invoice_receipt_data(invoice, brandings[invoice.tenant_id])
+                pending[pool.submit(render_receipt, data)] = (arcname, name)
+                if len(pending) >= window:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    self.collect(archive, pending, finished, use_cache)
+
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                self.collect(archive, pending, finished, use_cache)
+
+        elapsed = time.perf_counter() - self.started
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {self.done} receipts ({self.rendered} rendered, {self.done - self.rendered} from cache) "
+            f"to {output} in {elapsed:.1f}s, {self.done / elapsed:.1f} receipts/s, {os.path.getsize(output) / 1024:.0f} KB."
+        ))
+
+    def collect(self, archive, pending, finished, use_cache):
+        for future in finished:
+            arcname, name = pending.pop(future)
+            content = future.result()
+            archive.writestr(arcname, content)
+            if use_cache:
+                store_receipt(name, content)
+            self.rendered += 1
+            self.progress()
+
+    def progress(self):
+        self.done += 1
+        if self.done % self.report_every == 0 or self.done == self.total:
+            elapsed = time.perf_counter() - self.started
+            self.stdout.write(f"  {self.done}/{self.total} ({self.done / elapsed:.1f}/s)")
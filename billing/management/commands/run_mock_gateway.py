@@ -0,0 +1,32 @@
+import time
+from django.core.management.base import BaseCommand
+from billing.mock_gateway import start_mock_gateway
+
+
+class Command(BaseCommand):
+    help = 'Run a local Paystack/Flutterwave stand-in for testing payment flows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0, help='Seconds of delay added to every request')
+        parser.add_argument('--failure-rate', type=float, default=0, help='Fraction of requests answered with a 503')
+        parser.add_argument('--verbose', action='store_true', help='Log every request')
+
+    def handle(self, *args, **options):
+        server = start_mock_gateway(
+            host=options['host'],
+            port=options['port'],
+            latency=options['latency'],
+            failure_rate=options['failure_rate'],
+            verbose=options['verbose'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Mock gateway listening on {server.base_url}"))
+        self.stdout.write(f"Run other commands with PAYSTACK_API_BASE={server.base_url} FLUTTERWAVE_API_BASE={server.base_url}")
+        self.stdout.write("Authorization codes starting with DECLINE are declined. Ctrl+C to stop.")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            server.shutdown()
+            self.stdout.write(f"Stopped. {len(server.charges)} charges recorded.")
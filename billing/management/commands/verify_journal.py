@@ -0,0 +1,54 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from billing.journal import integrity_errors, missing_postings, repair_journal
+from billing.models import Invoice, LedgerAccount
+from tenants.models import Tenant
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the double-entry journal from invoices and payments and reports (or repairs) differences'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', help='Tenant slug (default: all tenants)')
+        parser.add_argument('--repair', action='store_true', help='Append the missing postings (also journals pre-existing history)')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['tenant']:
+            tenant = Tenant.objects.filter(slug=options['tenant']).first()
+            if not tenant:
+                raise CommandError(f"Tenant '{options['tenant']}' not found")
+            tenant_ids = [tenant.pk]
+        else:
+            tenant_ids = sorted(
+                set(Invoice.objects.filter(tenant__isnull=False).values_list('tenant_id', flat=True).distinct())
+                | set(LedgerAccount.objects.values_list('tenant_id', flat=True).distinct())
+            )
+
+        drifted = 0
+        for tenant_id in tenant_ids:
+            if options['repair']:
+                written = repair_journal(tenant_id)
+                if written:
+                    drifted += 1
+                    self.stdout.write(f"Tenant {tenant_id}: appended {written} entries")
+                continue
+
+            postings = missing_postings(tenant_id)
+            if postings:
+                drifted += 1
+                amount = sum(abs(lines[0][1]) for _, lines in postings)
+                self.stdout.write(self.style.WARNING(f"Tenant {tenant_id}: {len(postings)} postings missing ({amount} in total)"))
+                for entry, lines in postings[:10]:
+                    self.stdout.write(f"  {entry.kind} invoice={entry.invoice_id} payment={entry.payment_id} {lines[0][1]}")
+
+        errors = integrity_errors(tenant_ids[0] if options['tenant'] else None)
+        for error in errors[:50]:
+            self.stdout.write(self.style.ERROR(error))
+
+        elapsed = time.perf_counter() - started
+        verb = 'repaired' if options['repair'] else 'out of balance'
+        summary = f"Checked {len(tenant_ids)} tenants in {elapsed:.1f}s: {drifted} {verb}, {len(errors)} integrity errors."
+        if errors or (drifted and not options['repair']):
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(summary))
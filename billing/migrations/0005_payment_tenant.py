@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_payment_tenant(apps, schema_editor):
+    Invoice = apps.get_model("billing", "Invoice")
+    Payment = apps.get_model("billing", "Payment")
+    Payment.objects.filter(tenant__isnull=True).update(
+        tenant_id=Subquery(Invoice.objects.filter(pk=OuterRef("invoice_id")).values("tenant_id")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("billing", "0004_payment_events"),
+        ("tenants", "0006_platform_metrics_snapshots"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payment",
+            name="tenant",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="payments",
+                to="tenants.tenant",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(
+                fields=["tenant", "payment_date", "id"], name="payment_tenant_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="payment",
+            index=models.Index(fields=["payment_date", "id"], name="payment_date_idx"),
+        ),
+        migrations.RunPython(backfill_payment_tenant, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("billing", "0005_payment_tenant"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="invoice",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
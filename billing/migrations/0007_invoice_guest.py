@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_invoice_guest(apps, schema_editor):
+    Invoice = apps.get_model("billing", "Invoice")
+    GuestOrder = apps.get_model("services", "GuestOrder")
+    Booking = apps.get_model("booking", "Booking")
+    EventBooking = apps.get_model("events", "EventBooking")
+    GymMembership = apps.get_model("gym", "GymMembership")
+    # Orders first: a room service invoice may point at someone else's booking
+    sources = [
+        ("orders", GuestOrder.objects.filter(invoice_id=OuterRef("pk")).order_by("pk")),
+        ("booking_id", Booking.objects.filter(pk=OuterRef("booking_id"))),
+        ("event_booking_id", EventBooking.objects.filter(pk=OuterRef("event_booking_id"))),
+        ("gym_membership_id", GymMembership.objects.filter(pk=OuterRef("gym_membership_id"))),
+    ]
+    for field, related in sources:
+        Invoice.objects.filter(guest__isnull=True, **{f"{field}__isnull": False}).update(
+            guest_id=Subquery(related.values("user_id")[:1])
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("billing", "0006_invoice_updated_at"),
+        ("booking", "0003_booking_stay_indexes"),
+        ("events", "0002_eventhall_amenities_alter_eventhall_description"),
+        ("gym", "0002_alter_gymmembership_end_date_and_more"),
+        ("services", "0003_guestorder_order_id_housekeepingrequest_request_id_and_more"),
+        ("tenants", "0007_tenant_branding_version"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="invoice",
+            name="guest",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="guest_invoices",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="invoice",
+            index=models.Index(
+                fields=["guest", "tenant", "issued_date"], name="invoice_guest_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_invoice_guest, migrations.RunPython.noop),
+    ]
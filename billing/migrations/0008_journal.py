@@ -0,0 +1,159 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("billing", "0007_invoice_guest"),
+        ("tenants", "0007_tenant_branding_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="JournalEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("CHARGE", "Charge"),
+                            ("PAYMENT", "Payment"),
+                            ("REFUND", "Refund"),
+                            ("ADJUSTMENT", "Adjustment"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("memo", models.CharField(blank=True, max_length=255)),
+                ("posted_at", models.DateTimeField()),
+                (
+                    "invoice",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="journal_entries",
+                        to="billing.invoice",
+                    ),
+                ),
+                (
+                    "payment",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="journal_entries",
+                        to="billing.payment",
+                    ),
+                ),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="journal_entries",
+                        to="tenants.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "journal entries",
+            },
+        ),
+        migrations.CreateModel(
+            name="LedgerAccount",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "code",
+                    models.CharField(
+                        choices=[
+                            ("RECEIVABLE", "Accounts Receivable"),
+                            ("REVENUE", "Revenue"),
+                            ("CASH", "Cash & Bank"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "balance",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("sequence", models.PositiveBigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ledger_accounts",
+                        to="tenants.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("tenant", "code")},
+            },
+        ),
+        migrations.CreateModel(
+            name="JournalLine",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=12)),
+                ("balance", models.DecimalField(decimal_places=2, max_digits=14)),
+                ("sequence", models.PositiveBigIntegerField()),
+                ("posted_at", models.DateTimeField()),
+                (
+                    "entry",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lines",
+                        to="billing.journalentry",
+                    ),
+                ),
+                (
+                    "account",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lines",
+                        to="billing.ledgeraccount",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["account", "posted_at", "sequence"],
+                        name="journalline_balance_idx",
+                    )
+                ],
+                "unique_together": {("account", "sequence")},
+            },
+        ),
+    ]
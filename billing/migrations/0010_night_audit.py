@@ -0,0 +1,136 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:12
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("billing", "0009_settlement_reports"),
+        ("booking", "0003_booking_stay_indexes"),
+        ("hotel", "0002_alter_roomtype_amenities_alter_roomtype_description"),
+        ("tenants", "0008_tenant_business_date"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="NightAuditSummary",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("business_date", models.DateField()),
+                ("rooms_total", models.PositiveIntegerField(default=0)),
+                ("rooms_occupied", models.PositiveIntegerField(default=0)),
+                (
+                    "occupancy",
+                    models.DecimalField(
+                        decimal_places=2, default=0, help_text="Percent", max_digits=5
+                    ),
+                ),
+                (
+                    "room_revenue",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "adr",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "revpar",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=12),
+                ),
+                (
+                    "revenue_by_stream",
+                    models.JSONField(
+                        default=dict,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                    ),
+                ),
+                (
+                    "payments_by_method",
+                    models.JSONField(
+                        default=dict,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                    ),
+                ),
+                (
+                    "payments_total",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                ("charges_posted", models.PositiveIntegerField(default=0)),
+                ("closed_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="night_audits",
+                        to="tenants.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name_plural": "night audit summaries",
+                "ordering": ["-business_date"],
+                "unique_together": {("tenant", "business_date")},
+            },
+        ),
+        migrations.CreateModel(
+            name="RoomCharge",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("business_date", models.DateField()),
+                ("amount", models.DecimalField(decimal_places=2, max_digits=10)),
+                ("posted_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "booking",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="room_charges",
+                        to="booking.booking",
+                    ),
+                ),
+                (
+                    "room",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="room_charges",
+                        to="hotel.room",
+                    ),
+                ),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="room_charges",
+                        to="tenants.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["tenant", "business_date"],
+                        name="roomcharge_tenant_date_idx",
+                    )
+                ],
+                "unique_together": {("booking", "business_date")},
+            },
+        ),
+    ]
@@ -0,0 +1,198 @@
+"""
+A local HTTP stand-in for the Paystack/Flutterwave APIs.
+
+Point PAYSTACK_API_BASE / FLUTTERWAVE_API_BASE at it (see the run_mock_gateway
+command) to exercise charge/verify flows without touching the real gateways.
+It remembers references, so replays behave like the real APIs (duplicate
+reference errors), and can inject latency, 5xx errors and declines.
+post_webhook() sends signed webhook notifications the way the gateways do.
+"""
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.parse import urlparse, parse_qs
+from urllib.request import Request, urlopen
+
+DECLINE_TOKEN_PREFIX = 'DECLINE'
+
+
+class MockGatewayHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if not length:
+            return {}
+        try:
+            return json.loads(self.rfile.read(length))
+        except ValueError:
+            return {}
+
+    def _simulate_network(self):
+        """Returns True if this request should fail with a 503."""
+        server = self.server
+        if server.latency:
+            time.sleep(server.latency)
+        return server.failure_rate and random.random() < server.failure_rate
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        data = self._read_json()
+        if self._simulate_network():
+            return self._send(503, {'status': False, 'message': 'Service temporarily unavailable'})
+
+        if path == '/transaction/charge_authorization':
+            reference = data.get('reference')
+            token = data.get('authorization_code', '')
+            charge = self.server.record_charge('PAYSTACK', reference, token, data.get('amount'), data.get('currency'))
+            if charge is None:
+                return self._send(400, {'status': False, 'message': 'Duplicate Transaction Reference'})
+            return self._send(200, {'status': True, 'message': 'Charge attempted', 'data': {
+                'reference': reference,
+                'amount': data.get('amount'),
+                'currency': data.get('currency'),
+                'status': 'success' if charge['success'] else 'failed',
+                'gateway_response': 'Approved' if charge['success'] else 'Declined',
+            }})
+
+        if path == '/v3/tokenized-charges':
+            reference = data.get('tx_ref')
+            charge = self.server.record_charge('FLUTTERWAVE', reference, data.get('token', ''), data.get('amount'), data.get('currency'))
+            if charge is None:
+                return self._send(400, {'status': 'error', 'message': 'Duplicate transaction reference'})
+            return self._send(200, {'status': 'success', 'message': 'Charge successful', 'data': {
+                'tx_ref': reference,
+                'amount': data.get('amount'),
+                'currency': data.get('currency'),
+                'status': 'successful' if charge['success'] else 'failed',
+            }})
+
+        self._send(404, {'status': False, 'message': 'Not found'})
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if self._simulate_network():
+            return self._send(503, {'status': False, 'message': 'Service temporarily unavailable'})
+
+        if parsed.path.startswith('/transaction/verify/'):
+            reference = parsed.path.rsplit('/', 1)[-1]
+            charge = self.server.charges.get(('PAYSTACK', reference))
+            if not charge:
+                return self._send(400, {'status': False, 'message': 'Transaction reference not found'})
+            return self._send(200, {'status': True, 'message': 'Verification successful', 'data': {
+                'reference': reference,
+                'amount': charge['amount'],
+                'currency': charge['currency'],
+                'status': 'success' if charge['success'] else 'failed',
+            }})
+
+        if parsed.path == '/v3/transactions/verify_by_reference':
+            reference = parse_qs(parsed.query).get('tx_ref', [''])[0]
+            charge = self.server.charges.get(('FLUTTERWAVE', reference))
+            if not charge:
+                return self._send(400, {'status': 'error', 'message': 'No transaction was found for this id'})
+            return self._send(200, {'status': 'success', 'message': 'Transaction fetched successfully', 'data': {
+                'tx_ref': reference,
+                'amount': charge['amount'],
+                'currency': charge['currency'],
+                'status': 'successful' if charge['success'] else 'failed',
+            }})
+
+        self._send(404, {'status': False, 'message': 'Not found'})
+
+
+class MockGatewayServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0, failure_rate=0, verbose=False):
+        super().__init__(address, MockGatewayHandler)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.verbose = verbose
+        self.charges = {}
+        # Tokens to decline as well, e.g. a card without funds
+        self.declined_tokens = set()
+        self._lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def record_charge(self, provider, reference, token, amount, currency):
+        """
+        Stores a charge keyed by reference. Returns None for a reused reference.
+        Tokens starting with DECLINE or in declined_tokens are declined.
+        """
+        with self._lock:
+            key = (provider, reference)
+            if key in self.charges:
+                return None
+            charge = {
+                'amount': amount,
+                'currency': currency,
+                'success': not (str(token).upper().startswith(DECLINE_TOKEN_PREFIX) or token in self.declined_tokens),
+            }
+            self.charges[key] = charge
+            return charge
+
+
+def start_mock_gateway(host='127.0.0.1', port=0, latency=0, failure_rate=0, verbose=False):
+    """
+    Starts the stand-in gateway on a background thread and returns the server.
+    Use port=0 for a free port; call server.shutdown() when done.
+    """
+    server = MockGatewayServer((host, port), latency=latency, failure_rate=failure_rate, verbose=verbose)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def post_webhook(url, provider, secret, reference, amount, currency='NGN', success=True, host=None, timeout=10):
+    """
+    POSTs a charge notification to `url`, signed like the real gateway:
+    Paystack with an HMAC-SHA512 of the body keyed by the secret key, Flutterwave
+    with the secret hash in verif-hash. `amount` is in major units.
+    Returns the HTTP status code.
+    """
+    if provider == 'FLUTTERWAVE':
+        payload = {'event': 'charge.completed', 'data': {
+            'tx_ref': reference, 'amount': amount, 'currency': currency,
+            'status': 'successful' if success else 'failed',
+        }}
+    else:
+        payload = {'event': 'charge.success', 'data': {
+            'reference': reference, 'amount': int(round(float(amount) * 100)), 'currency': currency,
+            'status': 'success' if success else 'failed',
+        }}
+    body = json.dumps(payload).encode()
+
+    headers = {'Content-Type': 'application/json'}
+    if provider == 'FLUTTERWAVE':
+        headers['verif-hash'] = secret
+    else:
+        headers['x-paystack-signature'] = hmac.new(secret.encode(), body, hashlib.sha512).hexdigest()
+    if host:
+        headers['Host'] = host
+
+    try:
+        with urlopen(Request(url, data=body, headers=headers, method='POST'), timeout=timeout) as response:
+            return response.status
+    except HTTPError as e:
+        return e.code
@@ -1,4 +1,6 @@
-from django.db import models
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
 from booking.models import Booking
 
 class Invoice(models.Model):
@@ -20,13 +22,38 @@ class Invoice(models.Model):
     # Add new relations for Events and Gym
     event_booking = models.ForeignKey('events.EventBooking', on_delete=models.CASCADE, related_name='invoices', null=True, blank=True)
     gym_membership = models.ForeignKey('gym.GymMembership', on_delete=models.CASCADE, related_name='invoices', null=True, blank=True)
+    # Who the charge is billed to, copied from the booking/order/event/membership so a guest's folio is one index lookup
+    guest = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, related_name='guest_invoices', null=True, blank=True)
     
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.PENDING)
     invoice_type = models.CharField(max_length=20, choices=Type.choices, default=Type.BOOKING)
     issued_date = models.DateTimeField(auto_now_add=True)
     due_date = models.DateField(null=True, blank=True)
-    
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['guest', 'tenant', 'issued_date'], name='invoice_guest_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.guest_id is None:
+            self.guest_id = self.billed_user_id()
+        adding = self._state.adding
+        # The journal entry commits or rolls back with the invoice
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            from .journal import journal_invoice
+            journal_invoice(self, adding=adding)
+
+    def billed_user_id(self):
+        # Room service invoices set the guest explicitly, the booking may belong to someone else
+        for relation in ('booking', 'event_booking', 'gym_membership'):
+            if getattr(self, f'{relation}_id'):
+                return getattr(self, relation).user_id
+        return None
+
     def __str__(self):
         return f"Invoice {self.id} - {self.booking}"
 
@@ -38,11 +65,28 @@ class Payment(models.Model):
         TRANSFER = 'TRANSFER', 'Bank Transfer'
 
     invoice = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name='payments')
+    # Copied from the invoice so the tenant's ledger can seek on one index
+    tenant = models.ForeignKey('tenants.Tenant', on_delete=models.CASCADE, related_name='payments', null=True, blank=True, editable=False)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     payment_method = models.CharField(max_length=20, choices=Method.choices)
     transaction_id = models.CharField(max_length=100, blank=True)
     payment_date = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'payment_date', 'id'], name='payment_tenant_date_idx'),
+            models.Index(fields=['payment_date', 'id'], name='payment_date_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.tenant_id is None and self.invoice_id:
+            self.tenant_id = self.invoice.tenant_id
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            from .journal import journal_payment
+            journal_payment(self, adding=adding)
+
     def __str__(self):
         return f"Payment {self.id} - {self.amount}"
 
@@ -55,6 +99,7 @@ class PaymentGateway(models.Model):
     name = models.CharField(max_length=20, choices=Provider.choices)
     public_key = models.CharField(max_length=255)
     secret_key = models.CharField(max_length=255)
+    webhook_secret = models.CharField(max_length=255, blank=True, help_text="Flutterwave secret hash (sent in the verif-hash header)")
     is_active = models.BooleanField(default=False)
     is_test_mode = models.BooleanField(default=True, help_text="Check to use Test Keys")
     created_at = models.DateTimeField(auto_now_add=True)
@@ -65,3 +110,227 @@ class PaymentGateway(models.Model):
 
     def __str__(self):
         return f"{self.get_name_display()} ({'Active' if self.is_active else 'Inactive'})"
+
+
+class PaymentEvent(models.Model):
+    """
+    Inbox of gateway payment notifications (webhooks and verified redirect
+    callbacks), one row per (gateway, reference). Recording is all the webhook
+    does; billing.webhooks.process_payment_event applies the payment once.
+    """
+    class Status(models.TextChoices):
+        RECEIVED = 'RECEIVED', 'Received'
+        PROCESSED = 'PROCESSED', 'Processed'
+        IGNORED = 'IGNORED', 'Ignored'
+        FAILED = 'FAILED', 'Failed'
+
+    gateway = models.CharField(max_length=20, choices=PaymentGateway.Provider.choices)
+    reference = models.CharField(max_length=100)
+    event_type = models.CharField(max_length=50, blank=True)
+    tenant = models.ForeignKey('tenants.Tenant', on_delete=models.CASCADE, related_name='payment_events', null=True, blank=True)
+    invoice = models.ForeignKey(Invoice, on_delete=models.SET_NULL, related_name='payment_events', null=True, blank=True)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.RECEIVED)
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('gateway', 'reference')
+        indexes = [
+            models.Index(fields=['status', 'received_at'], name='paymentevent_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_gateway_display()} {self.reference} ({self.status})"
+
+
+class LedgerAccount(models.Model):
+    """
+    A tenant's general ledger account. `balance` and `sequence` are those of
+    its latest journal line; the row is locked while lines are appended.
+    Balances are debit-positive, so revenue carries a negative balance.
+    """
+    class Code(models.TextChoices):
+        RECEIVABLE = 'RECEIVABLE', 'Accounts Receivable'
+        REVENUE = 'REVENUE', 'Revenue'
+        CASH = 'CASH', 'Cash & Bank'
+
+    tenant = models.ForeignKey('tenants.Tenant', on_delete=models.CASCADE, related_name='ledger_accounts')
+    code = models.CharField(max_length=20, choices=Code.choices)
+    balance = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    sequence = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('tenant', 'code')
+
+    def __str__(self):
+        return f"{self.tenant} {self.get_code_display()}: {self.balance}"
+
+
+class JournalEntry(models.Model):
+    """
+    One balanced posting (its lines sum to zero). Entries are append-only:
+    corrections are new ADJUSTMENT entries, never edits.
+    """
+    class Kind(models.TextChoices):
+        CHARGE = 'CHARGE', 'Charge'
+        PAYMENT = 'PAYMENT', 'Payment'
+        REFUND = 'REFUND', 'Refund'
+        ADJUSTMENT = 'ADJUSTMENT', 'Adjustment'
+
+    tenant = models.ForeignKey('tenants.Tenant', on_delete=models.CASCADE, related_name='journal_entries')
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    invoice = models.ForeignKey(Invoice, on_delete=models.SET_NULL, related_name='journal_entries', null=True, blank=True)
+    payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, related_name='journal_entries', null=True, blank=True)
+    memo = models.CharField(max_length=255, blank=True)
+    posted_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name_plural = 'journal entries'
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Journal entries are append-only")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Journal entries are append-only")
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} ({self.posted_at:%Y-%m-%d})"
+
+
+class JournalLine(models.Model):
+    """
+    A debit (positive amount) or credit (negative) to one account, with the
+    account's running balance after it, so a balance at any date is the
+    latest line on or before it.
+    """
+    entry = models.ForeignKey(JournalEntry, on_delete=models.CASCADE, related_name='lines')
+    account = models.ForeignKey(LedgerAccount, on_delete=models.CASCADE, related_name='lines')
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    balance = models.DecimalField(max_digits=14, decimal_places=2)
+    sequence = models.PositiveBigIntegerField()
+    posted_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('account', 'sequence')
+        indexes = [
+            models.Index(fields=['account', 'posted_at', 'sequence'], name='journalline_balance_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("Journal lines are append-only")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("Journal lines are append-only")
+
+    def __str__(self):
+        return f"{self.account.code} {self.amount} -> {self.balance}"
+
+
+class SettlementReport(models.Model):
+    """One reconciliation of a gateway settlement file against our payments."""
+    tenant = models.ForeignKey('tenants.Tenant', on_delete=models.CASCADE, related_name='settlement_reports')
+    gateway = models.CharField(max_length=20, choices=PaymentGateway.Provider.choices)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    source_name = models.CharField(max_length=255, blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, related_name='+', null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    line_count = models.PositiveIntegerField(default=0)
+    skipped_count = models.PositiveIntegerField(default=0)
+    matched_count = models.PositiveIntegerField(default=0)
+    unrecorded_count = models.PositiveIntegerField(default=0)
+    unsettled_count = models.PositiveIntegerField(default=0)
+    duplicate_count = models.PositiveIntegerField(default=0)
+    mismatch_count = models.PositiveIntegerField(default=0)
+    settled_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    recorded_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    @property
+    def exception_count(self):
+        return self.unrecorded_count + self.unsettled_count + self.duplicate_count + self.mismatch_count
+
+    def __str__(self):
+        return f"{self.get_gateway_display()} {self.start_date} - {self.end_date}"
+
+
+class SettlementItem(models.Model):
+    class Outcome(models.TextChoices):
+        MATCHED = 'MATCHED', 'Matched'
+        UNRECORDED = 'UNRECORDED', 'Settled, no payment recorded'
+        UNSETTLED = 'UNSETTLED', 'Recorded, not settled'
+        DUPLICATE = 'DUPLICATE', 'Duplicate'
+        MISMATCH = 'MISMATCH', 'Amount mismatch'
+
+    report = models.ForeignKey(SettlementReport, on_delete=models.CASCADE, related_name='items')
+    outcome = models.CharField(max_length=20, choices=Outcome.choices)
+    reference = models.CharField(max_length=100)
+    payment = models.ForeignKey(Payment, on_delete=models.SET_NULL, related_name='settlement_items', null=True, blank=True)
+    line_number = models.PositiveIntegerField(null=True, blank=True)
+    settled_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    recorded_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['report', 'outcome', 'id'], name='settlementitem_outcome_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.reference}: {self.outcome}"
+
+
+class RoomCharge(models.Model):
+    """One night's room charge for a stay, posted by the night audit."""
+    tenant = models.ForeignKey('tenants.Tenant', on_delete=models.CASCADE, related_name='room_charges')
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='room_charges')
+    room = models.ForeignKey('hotel.Room', on_delete=models.CASCADE, related_name='room_charges')
+    business_date = models.DateField()
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    posted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('booking', 'business_date')
+        indexes = [
+            models.Index(fields=['tenant', 'business_date'], name='roomcharge_tenant_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.booking} {self.business_date}: {self.amount}"
+
+
+class NightAuditSummary(models.Model):
+    """
+    A closed business day's figures, frozen when the night audit closes it so
+    daily reports never recompute them from source rows.
+    """
+    tenant = models.ForeignKey('tenants.Tenant', on_delete=models.CASCADE, related_name='night_audits')
+    business_date = models.DateField()
+    rooms_total = models.PositiveIntegerField(default=0)
+    rooms_occupied = models.PositiveIntegerField(default=0)
+    occupancy = models.DecimalField(max_digits=5, decimal_places=2, default=0, help_text="Percent")
+    room_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    adr = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    revpar = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    revenue_by_stream = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    payments_by_method = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    payments_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    charges_posted = models.PositiveIntegerField(default=0)
+    closed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ('tenant', 'business_date')
+        ordering = ['-business_date']
+        verbose_name_plural = 'night audit summaries'
+
+    def __str__(self):
+        return f"{self.tenant} {self.business_date}: {self.occupancy}% / {self.room_revenue}"
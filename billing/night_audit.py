@@ -0,0 +1,141 @@
+"""
+Night audit: posts the night's room charges and closes the business day.
+
+For each stay occupying a room on the night of the business date (confirmed,
+checked in, or checked out after that night, as in analytics.occupancy), one
+RoomCharge is posted. It is
+the stay's unposted balance spread over its remaining nights, so charges
+always add up to the booking's current total_price, even after
+extend_booking changes it. Stays are loaded in one range query and charges
+written with bulk_create, so the cost per tenant is a handful of queries
+however many rooms it has.
+
+The day's figures are then frozen in a NightAuditSummary and the tenant's
+business date moves on. A date that already has a summary is never posted
+again, so re-running the audit is safe. Days close in date order, from the
+tenant's open business date, and only once they are over.
+"""
+import datetime
+from decimal import Decimal, ROUND_HALF_UP
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from .models import Invoice, NightAuditSummary, Payment, RoomCharge
+
+CHARGE_BATCH_SIZE = 1000
+CENT = Decimal('0.01')
+
+
+def open_business_date(tenant, today=None):
+    """The tenant's business date, or yesterday for a tenant never audited."""
+    today = today or timezone.localdate()
+    return tenant.business_date or today - datetime.timedelta(days=1)
+
+
+def nightly_charges(tenant, business_date):
+    """Unsaved RoomCharge rows for the stays in house on the night of `business_date`."""
+    from analytics.stats import day_bounds
+    from booking.models import Booking
+
+    start, end = day_bounds(business_date)
+    stays = list(Booking.objects.filter(
+        tenant=tenant,
+        # Departures are checked out by the time their last night is audited
+        status__in=[Booking.Status.CONFIRMED, Booking.Status.CHECKED_IN, Booking.Status.CHECKED_OUT],
+        check_in_date__lt=end,
+        check_out_date__gte=end,
+    ).values_list('pk', 'room_id', 'check_in_date', 'check_out_date', 'total_price').order_by())
+
+    posted = dict(
+        RoomCharge.objects.filter(booking_id__in=[stay[0] for stay in stays], business_date__lt=business_date)
+        .values('booking_id').annotate(total=Sum('amount')).values_list('booking_id', 'total')
+    ) if stays else {}
+
+    charges = []
+    for booking_id, room_id, check_in, check_out, total_price in stays:
+        check_in, check_out = timezone.localdate(check_in), timezone.localdate(check_out)
+        if not check_in <= business_date < check_out:
+            continue
+        remaining_nights = (check_out - business_date).days
+        balance = total_price - posted.get(booking_id, Decimal('0'))
+        amount = (balance / remaining_nights).quantize(CENT, rounding=ROUND_HALF_UP)
+        charges.append(RoomCharge(
+            tenant=tenant, booking_id=booking_id, room_id=room_id, business_date=business_date, amount=amount,
+        ))
+    return charges
+
+
+def day_figures(tenant, business_date, charges):
+    """Summary fields for the day from the posted charges and one query per figure."""
+    from analytics.models import DailyTenantStats
+    from analytics.stats import day_bounds
+    from hotel.models import Room
+
+    rooms_total = Room.objects.filter(tenant=tenant).count()
+    rooms_occupied = len({charge.room_id for charge in charges})
+    room_revenue = sum((charge.amount for charge in charges), Decimal('0'))
+
+    # Other streams as booked that day; rooms as earned (the night's charges)
+    revenue_by_stream = dict(
+        DailyTenantStats.objects.filter(tenant=tenant, date=business_date).values_list('stream', 'revenue')
+    )
+    revenue_by_stream[DailyTenantStats.Stream.ROOMS] = room_revenue
+
+    start, end = day_bounds(business_date)
+    payments_by_method = dict(
+        Payment.objects.filter(tenant=tenant, payment_date__gte=start, payment_date__lt=end)
+        .exclude(invoice__invoice_type=Invoice.Type.SUBSCRIPTION)
+        .values('payment_method').annotate(total=Sum('amount')).values_list('payment_method', 'total')
+    )
+
+    def ratio(value, count):
+        return (Decimal(value) / count).quantize(CENT, rounding=ROUND_HALF_UP) if count else Decimal('0')
+
+    return {
+        'rooms_total': rooms_total,
+        'rooms_occupied': rooms_occupied,
+        'occupancy': ratio(rooms_occupied * 100, rooms_total),
+        'room_revenue': room_revenue,
+        'adr': ratio(room_revenue, rooms_occupied),
+        'revpar': ratio(room_revenue, rooms_total),
+        'revenue_by_stream': revenue_by_stream,
+        'payments_by_method': payments_by_method,
+        'payments_total': sum(payments_by_method.values(), Decimal('0')),
+        'charges_posted': len(charges),
+    }
+
+
+def close_business_day(tenant, business_date):
+    """
+    Posts the night's room charges, freezes the summary and rolls the tenant's
+    business date. Returns (summary, created); an already closed date returns
+    its existing summary and posts nothing. Raises ValueError for a date that
+    isn't over yet or lies past the tenant's open business date.
+    """
+    from tenants.models import Tenant
+
+    if business_date >= timezone.localdate():
+        raise ValueError(f"{business_date} is not over yet")
+
+    with transaction.atomic():
+        # Serialises audits of the same tenant
+        locked = Tenant.objects.select_for_update().get(pk=tenant.pk)
+        summary = NightAuditSummary.objects.filter(tenant=locked, business_date=business_date).first()
+        created = summary is None
+        if created:
+            # Charges spread a stay's balance over its remaining nights, so days close in order
+            if locked.business_date and business_date > locked.business_date:
+                raise ValueError(f"{locked.business_date} is still open; close it first")
+            if NightAuditSummary.objects.filter(tenant=locked, business_date__gt=business_date).exists():
+                raise ValueError(f"{business_date} is before a day that is already closed")
+            charges = nightly_charges(locked, business_date)
+            RoomCharge.objects.bulk_create(charges, batch_size=CHARGE_BATCH_SIZE)
+            summary = NightAuditSummary.objects.create(
+                tenant=locked, business_date=business_date, **day_figures(locked, business_date, charges)
+            )
+
+        next_date = business_date + datetime.timedelta(days=1)
+        if not locked.business_date or locked.business_date < next_date:
+            Tenant.objects.filter(pk=locked.pk).update(business_date=next_date)
+            tenant.business_date = next_date
+    return summary, created
@@ -0,0 +1,81 @@
+"""
+Applying a confirmed online payment to its invoice.
+
+Shared by the payment redirect callback and the webhook worker. The invoice row
+is locked while it is checked and updated, so however many times (and from
+however many places) a payment is confirmed, the Payment row, the status
+changes and the staff notifications happen once.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.urls import reverse
+from booking.models import Booking
+from core.notifications import notify_many
+from .models import Invoice, Payment
+
+
+def apply_invoice_payment(invoice_id, gateway, reference):
+    """
+    Records the payment and marks the invoice and what it pays for as paid.
+    Returns False if the invoice was already paid (nothing is changed).
+    """
+    with transaction.atomic():
+        invoice = Invoice.objects.select_for_update().get(pk=invoice_id)
+        if invoice.status == Invoice.Status.PAID:
+            return False
+
+        Payment.objects.create(
+            invoice=invoice,
+            amount=invoice.amount,
+            payment_method=gateway.upper(),
+            transaction_id=reference
+        )
+        invoice.status = Invoice.Status.PAID
+        invoice.save()
+
+        if invoice.orders.exists():
+            # Move orders from AWAITING_PAYMENT to PENDING (for kitchen)
+            for order in invoice.orders.all():
+                if order.status == 'AWAITING_PAYMENT':
+                    order.status = 'PENDING'
+                    order.save()
+                    transaction.on_commit(lambda order=order: notify_order_staff(invoice.tenant, order))
+
+        elif invoice.booking:
+            booking = invoice.booking
+            # Only update status if not already checked in/completed
+            if booking.status not in [Booking.Status.CHECKED_IN, Booking.Status.CHECKED_OUT, Booking.Status.CANCELLED]:
+                booking.status = Booking.Status.CONFIRMED
+                booking.save()
+
+        elif invoice.event_booking:
+            booking = invoice.event_booking
+            booking.status = 'CONFIRMED'
+            booking.save()
+
+        elif invoice.gym_membership:
+            membership = invoice.gym_membership
+            membership.status = 'ACTIVE'
+            membership.save()
+    return True
+
+
+def notify_order_staff(tenant, order):
+    User = get_user_model()
+    has_food = order.items.filter(menu_item__category='FOOD').exists()
+    has_drink = order.items.filter(menu_item__category='DRINK').exists()
+
+    # Admin/Manager always; Kitchen only for food, Bar only for drinks
+    roles_to_notify = [User.Role.ADMIN, User.Role.MANAGER]
+    if has_food:
+        roles_to_notify.append(User.Role.KITCHEN)
+    if has_drink:
+        roles_to_notify.append(User.Role.BAR)
+
+    notify_many(
+        tenant,
+        roles=roles_to_notify,
+        title="New Order Received",
+        message=f"Order #{order.order_id or order.id} ({'Food' if has_food else ''}{' & ' if has_food and has_drink else ''}{'Drink' if has_drink else ''}) needs attention.",
+        link=reverse('staff_order_list')
+    )
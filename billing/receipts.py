@@ -0,0 +1,348 @@
+"""
+Receipt PDFs, rendered once and served from media storage.
+
+A receipt is stored under a name derived from what it shows: the invoice (or
+booking) id, its status and last update, and the tenant's branding version
+(bumped whenever its TenantSetting is saved). Unchanged receipts are served
+straight from storage; any change produces a new name, and the superseded
+file for that invoice is removed when the new one is written. Names are keyed
+with SECRET_KEY, so they can't be guessed from invoice ids.
+
+Rendering works on plain dicts (receipt_data), so it can also run in worker
+processes (see the render_daily_receipts command).
+"""
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.utils.crypto import salted_hmac
+from fpdf import FPDF
+
+RECEIPTS_DIR = 'receipts'
+
+# Define Theme Colors (R, G, B)
+THEME_COLORS = {
+    'theme-default': (19, 236, 109),
+    'theme-light': (19, 236, 109),
+    'theme-blue': (59, 130, 246),
+    'theme-luxury': (212, 175, 55),
+    'theme-forest': (74, 222, 128),
+    'theme-ocean': (6, 182, 212),
+    'theme-sunset': (244, 114, 182),
+    'theme-royal': (167, 139, 250),
+    'theme-minimal': (113, 113, 122),
+}
+DEFAULT_COLOR = (19, 236, 109)
+
+
+def pdf_text(value):
+    # The core PDF fonts are latin-1 only (no ₦ or ₹)
+    try:
+        value.encode('latin-1')
+        return value
+    except UnicodeEncodeError:
+        return None
+
+
+def get_branding(tenant, default_currency='NGN'):
+    from core.models import TenantSetting
+
+    settings = TenantSetting.objects.filter(tenant=tenant).first() if tenant else None
+    if not settings:
+        return {'hotel_name': "Hotel Management System", 'color': DEFAULT_COLOR, 'currency': default_currency}
+    return {
+        'hotel_name': settings.hotel_name,
+        'color': THEME_COLORS.get(settings.theme, DEFAULT_COLOR),
+        'currency': pdf_text(settings.currency_symbol) or f"{settings.currency} ",
+    }
+
+
+# --- Data ---
+
+def invoice_receipt_data(invoice, branding):
+    guest_name = "Guest"
+    guest_email = ""
+    orders = list(invoice.orders.all())
+    payments = list(invoice.payments.all())
+
+    desc = "Service Charge"
+    if orders:
+        order = orders[0]
+        guest_name = f"{order.user.first_name} {order.user.last_name}"
+        guest_email = order.user.email
+        desc = f"Room Service Order #{order.order_id or order.id}"
+    elif invoice.booking:
+        guest_name = invoice.booking.guest_name
+        guest_email = invoice.booking.guest_email
+        desc = f"Hotel Booking: {invoice.booking.room.room_type.name}"
+    elif invoice.event_booking:
+        user = invoice.event_booking.user
+        guest_name = f"{user.first_name} {user.last_name}"
+        guest_email = user.email
+        desc = f"Event Booking: {invoice.event_booking.event_name}"
+    elif invoice.gym_membership:
+        user = invoice.gym_membership.user
+        guest_name = f"{user.first_name} {user.last_name}"
+        guest_email = user.email
+        desc = f"Gym Membership: {invoice.gym_membership.plan.name}"
+
+    payment = max(payments, key=lambda p: p.pk) if payments else None
+    return {
+        'kind': 'invoice',
+        'id': invoice.pk,
+        'branding': branding,
+        'issued_date': invoice.issued_date.strftime("%Y-%m-%d"),
+        'status': invoice.get_status_display().upper(),
+        'payment_method': payment.get_payment_method_display() if payment else None,
+        'payment_reference': payment.transaction_id if payment else None,
+        'guest_name': guest_name,
+        'guest_email': guest_email,
+        'description': desc,
+        'amount': str(invoice.amount),
+    }
+
+
+def booking_receipt_data(booking, branding):
+    return {
+        'kind': 'booking',
+        'id': booking.pk,
+        'branding': branding,
+        'booking_id': booking.booking_id,
+        'guest_name': booking.guest_name,
+        'room': f"{booking.room.room_number} ({booking.room.room_type.name})",
+        'check_in': booking.check_in_date.strftime('%Y-%m-%d %H:%M'),
+        'check_out': booking.check_out_date.strftime('%Y-%m-%d %H:%M'),
+        'total_price': f"{booking.total_price:,.2f}",
+    }
+
+
+# --- Rendering ---
+
+def render_invoice_receipt(data):
+    branding = data['branding']
+    primary_color = branding['color']
+    currency_symbol = branding['currency']
+
+    # Generate PDF (Standard Receipt Size - A5)
+    pdf = FPDF(orientation='P', unit='mm', format='A5')
+    pdf.set_auto_page_break(auto=False)
+    pdf.add_page()
+
+    # --- Decorative Header ---
+    pdf.set_y(10)
+    pdf.set_font("Arial", 'B', 16)
+    pdf.set_text_color(*primary_color)
+    pdf.cell(0, 8, txt=branding['hotel_name'].upper(), ln=1, align="R")
+
+    pdf.set_font("Arial", '', 8)
+    pdf.set_text_color(60, 60, 60)
+    pdf.cell(0, 4, txt="Official Receipt", ln=1, align="R")
+
+    pdf.ln(2)
+    pdf.set_draw_color(*primary_color)
+    pdf.set_line_width(0.5)
+    pdf.line(10, pdf.get_y(), 138, pdf.get_y())
+    pdf.set_line_width(0.2)
+
+    # --- Receipt Info ---
+    pdf.ln(5)
+    pdf.set_font("Arial", 'B', 20)
+    pdf.set_text_color(30, 41, 59)
+    pdf.cell(70, 10, txt="RECEIPT", ln=0, align="L")
+
+    pdf.set_fill_color(240, 240, 240)
+    pdf.set_font("Arial", 'B', 10)
+    pdf.cell(58, 10, txt=f"INV #{data['id']}", ln=1, align="R", fill=True)
+
+    pdf.ln(5)
+
+    # --- Details ---
+    col_y = pdf.get_y()
+
+    # Bill To
+    pdf.set_fill_color(*primary_color)
+    pdf.set_text_color(255, 255, 255)
+    pdf.set_font("Arial", 'B', 9)
+    pdf.cell(60, 6, txt="  BILL TO", ln=1, fill=True)
+
+    pdf.set_text_color(30, 41, 59)
+    pdf.set_font("Arial", 'B', 10)
+    pdf.ln(2)
+    pdf.cell(60, 5, txt=data['guest_name'], ln=1)
+    pdf.set_font("Arial", '', 9)
+    pdf.cell(60, 4, txt=data['guest_email'], ln=1)
+
+    # Details Column
+    pdf.set_xy(80, col_y)
+    pdf.set_fill_color(30, 41, 59)
+    pdf.set_text_color(255, 255, 255)
+    pdf.set_font("Arial", 'B', 9)
+    pdf.cell(58, 6, txt="  DETAILS", ln=1, fill=True)
+
+    pdf.set_x(80)
+    pdf.ln(2)
+
+    def print_detail_row(label, value):
+        x = pdf.get_x()
+        pdf.set_font("Arial", '', 8)
+        pdf.set_text_color(100, 100, 100)
+        pdf.cell(20, 4, txt=label, align="L")
+        pdf.set_font("Arial", 'B', 8)
+        pdf.set_text_color(30, 41, 59)
+        pdf.cell(38, 4, txt=value, align="R", ln=1)
+        pdf.set_x(x)
+
+    pdf.set_x(80)
+    print_detail_row("Date:", data['issued_date'])
+    print_detail_row("Status:", data['status'])
+
+    if data['payment_method']:
+        reference = data['payment_reference']
+        print_detail_row("Method:", data['payment_method'])
+        print_detail_row("Ref:", reference[:15] + "..." if len(reference) > 15 else reference)
+
+    pdf.ln(10)
+
+    # --- Line Items ---
+    pdf.set_y(max(pdf.get_y(), col_y + 35))
+
+    pdf.set_fill_color(240, 240, 240)
+    pdf.set_text_color(30, 41, 59)
+    pdf.set_font("Arial", 'B', 9)
+
+    w_desc = 98
+    w_total = 30
+
+    pdf.cell(w_desc, 8, txt="  Description", border="B", fill=True)
+    pdf.cell(w_total, 8, txt="Total  ", border="B", fill=True, align="R", ln=1)
+
+    pdf.set_font("Arial", '', 9)
+    pdf.cell(w_desc, 8, txt=f"  {data['description']}", border="B")
+    pdf.cell(w_total, 8, txt=f"{currency_symbol}{data['amount']}  ", border="B", align="R", ln=1)
+
+    # Totals
+    pdf.ln(5)
+    pdf.set_font("Arial", 'B', 11)
+    pdf.cell(w_desc, 8, txt="TOTAL", align="R")
+    pdf.cell(w_total, 8, txt=f"{currency_symbol}{data['amount']}  ", align="R", border="T")
+
+    return bytes(pdf.output())
+
+
+def render_booking_receipt(data):
+    branding = data['branding']
+
+    # Generate PDF (Standard Receipt Size - A5)
+    pdf = FPDF(orientation='P', unit='mm', format='A5')
+    pdf.set_auto_page_break(auto=False)
+    pdf.add_page()
+
+    # Header
+    pdf.set_font("Arial", 'B', 16)
+    pdf.cell(0, 10, branding['hotel_name'], ln=True, align='C')
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 10, "Booking Receipt", ln=True, align='C')
+    pdf.ln(5)
+
+    # Booking Info
+    pdf.set_font("Arial", '', 10)
+    pdf.cell(0, 8, f"Booking Ref: {data['booking_id']}", ln=True)
+    pdf.cell(0, 8, f"Guest: {data['guest_name']}", ln=True)
+    pdf.cell(0, 8, f"Room: {data['room']}", ln=True)
+    pdf.cell(0, 8, f"Check-in: {data['check_in']}", ln=True)
+    pdf.cell(0, 8, f"Check-out: {data['check_out']}", ln=True)
+    pdf.ln(5)
+
+    # Financials
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(0, 10, f"Total Paid: {branding['currency']}{data['total_price']}", ln=True)
+
+    return bytes(pdf.output())
+
+
+RENDERERS = {
+    'invoice': render_invoice_receipt,
+    'booking': render_booking_receipt,
+}
+
+
+def render_receipt(data):
+    return RENDERERS[data['kind']](data)
+
+
+# --- Storage ---
+
+def receipt_dir(kind, tenant_id, pk):
+    return f"{RECEIPTS_DIR}/{tenant_id or 'platform'}/{kind}-{pk}"
+
+
+def receipt_name(kind, obj, tenant):
+    fingerprint = f"{kind}:{obj.pk}:{obj.status}:{obj.updated_at.isoformat()}:{tenant.branding_version if tenant else 0}"
+    digest = salted_hmac('billing.receipts', fingerprint).hexdigest()[:32]
+    return f"{receipt_dir(kind, tenant.pk if tenant else None, obj.pk)}/{digest}.pdf"
+
+
+def store_receipt(name, content):
+    """
+    Saves the PDF under `name` and removes superseded receipts for the same invoice/booking.
+    """
+    directory, filename = name.rsplit('/', 1)
+    saved = default_storage.save(name, ContentFile(content))
+    if saved != name:
+        # Rendered concurrently; the first copy wins
+        default_storage.delete(saved)
+    try:
+        _, files = default_storage.listdir(directory)
+    except (FileNotFoundError, NotImplementedError):
+        files = []
+    for old in files:
+        if old != filename:
+            default_storage.delete(f"{directory}/{old}")
+    return name
+
+
+def get_invoice_receipt(invoice):
+    """Storage name of the invoice's current receipt, rendering it on first use."""
+    name = receipt_name('invoice', invoice, invoice.tenant)
+    if not default_storage.exists(name):
+        data = invoice_receipt_data(invoice, get_branding(invoice.tenant))
+        store_receipt(name, render_invoice_receipt(data))
+    return name
+
+
+def get_booking_receipt(booking):
+    name = receipt_name('booking', booking, booking.tenant)
+    if not default_storage.exists(name):
+        data = booking_receipt_data(booking, get_branding(booking.tenant, default_currency='$'))
+        store_receipt(name, render_booking_receipt(data))
+    return name
+
+
+def daily_paid_invoices(day, tenant=None):
+    """
+    Paid invoices with a payment on local date `day`, with everything their
+    receipts show loaded up front (one joined query plus two prefetches).
+    """
+    from analytics.stats import day_bounds
+    from .models import Invoice, Payment
+
+    start, end = day_bounds(day)
+    paid_that_day = Payment.objects.filter(payment_date__gte=start, payment_date__lt=end).values('invoice_id')
+    invoices = Invoice.objects.filter(
+        status=Invoice.Status.PAID, pk__in=paid_that_day,
+    ).select_related(
+        'tenant', 'booking__room__room_type', 'event_booking__user', 'gym_membership__user', 'gym_membership__plan',
+    ).prefetch_related('payments', 'orders__user').order_by('tenant_id', 'pk')
+    if tenant:
+        invoices = invoices.filter(tenant=tenant)
+    return invoices
+
+
+def prerender_receipts(invoice_id):
+    """Renders a paid invoice's receipt (and its booking's) ahead of the first download."""
+    from .models import Invoice
+
+    invoice = Invoice.objects.select_related('tenant', 'booking__tenant', 'booking__room__room_type').filter(pk=invoice_id).first()
+    if not invoice or invoice.status != Invoice.Status.PAID:
+        return
+    get_invoice_receipt(invoice)
+    if invoice.booking:
+        get_booking_receipt(invoice.booking)
@@ -0,0 +1,135 @@
+"""
+Gateway settlement reconciliation.
+
+Our payments for the period are bulk-loaded in one query into a dict keyed by
+reference (Payment.transaction_id). The settlement CSV is then streamed once,
+each line taking its reference out of the map, so a file of any size costs
+one query plus batched inserts of the report items. Whatever is left in the
+map afterwards was recorded by us but never settled.
+"""
+import csv
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from .models import Payment, SettlementItem
+
+ITEM_BATCH_SIZE = 1000
+# Header names used by Paystack and Flutterwave exports, lower-cased
+REFERENCE_COLUMNS = ('reference', 'transaction reference', 'transaction_reference', 'tx_ref', 'txref', 'merchant reference')
+AMOUNT_COLUMNS = ('amount', 'transaction amount', 'amount charged', 'charged_amount')
+STATUS_COLUMNS = ('status', 'transaction status')
+SETTLED_STATUSES = {'success', 'successful', 'settled', 'completed'}
+
+Outcome = SettlementItem.Outcome
+
+
+class SettlementFileError(Exception):
+    pass
+
+
+def find_column(fieldnames, candidates):
+    columns = {name.strip().lower(): name for name in fieldnames or []}
+    for candidate in candidates:
+        if candidate in columns:
+            return columns[candidate]
+    return None
+
+
+def parse_amount(value, minor_units=False):
+    try:
+        amount = Decimal((value or '').replace(',', '').strip())
+    except InvalidOperation:
+        return None
+    # Paystack's API and some exports report kobo
+    return amount / 100 if minor_units else amount
+
+
+def recorded_payments(tenant, gateway, start, end):
+    """{reference: [(payment_id, amount), ...]} for the gateway's payments from start to end (inclusive dates)."""
+    from analytics.stats import day_bounds
+
+    payments = Payment.objects.filter(
+        tenant=tenant,
+        payment_method=gateway,
+        payment_date__gte=day_bounds(start)[0],
+        payment_date__lt=day_bounds(end)[1],
+    )
+    recorded = {}
+    for pk, reference, amount in payments.values_list('pk', 'transaction_id', 'amount').iterator(chunk_size=5000):
+        recorded.setdefault(reference, []).append((pk, amount))
+    return recorded
+
+
+def reconcile(report, lines, minor_units=False):
+    """
+    Classifies every line of the settlement CSV `lines` (an iterable of text
+    lines) against our payments for the report's tenant, gateway and period,
+    writes the items and the report's counts and totals. Raises
+    SettlementFileError if the file has no reference or amount column.
+    """
+    reader = csv.DictReader(lines)
+    reference_column = find_column(reader.fieldnames, REFERENCE_COLUMNS)
+    amount_column = find_column(reader.fieldnames, AMOUNT_COLUMNS)
+    status_column = find_column(reader.fieldnames, STATUS_COLUMNS)
+    if not reference_column or not amount_column:
+        raise SettlementFileError("The file needs a reference and an amount column.")
+
+    with transaction.atomic():
+        report.save()
+        recorded = recorded_payments(report.tenant, report.gateway, report.start_date, report.end_date)
+        report.recorded_total = sum((amount for payments in recorded.values() for _, amount in payments), Decimal('0'))
+        counts = {outcome: 0 for outcome in Outcome.values}
+        settled_references = set()
+        items = []
+
+        def add(outcome, reference, **fields):
+            counts[outcome] += 1
+            items.append(SettlementItem(report=report, outcome=outcome, reference=reference, **fields))
+            if len(items) >= ITEM_BATCH_SIZE:
+                SettlementItem.objects.bulk_create(items)
+                items.clear()
+
+        # Line 1 is the header
+        for line_number, row in enumerate(reader, start=2):
+            report.line_count += 1
+            reference = (row.get(reference_column) or '').strip()
+            amount = parse_amount(row.get(amount_column), minor_units)
+            status = (row.get(status_column) or '').strip().lower() if status_column else 'success'
+            if not reference or amount is None or status not in SETTLED_STATUSES:
+                report.skipped_count += 1
+                continue
+
+            report.settled_total += amount
+            if reference in settled_references:
+                add(Outcome.DUPLICATE, reference, line_number=line_number, settled_amount=amount)
+                continue
+            settled_references.add(reference)
+
+            payments = recorded.pop(reference, None)
+            if payments is None:
+                add(Outcome.UNRECORDED, reference, line_number=line_number, settled_amount=amount)
+                continue
+
+            payment_id = payments[0][0]
+            recorded_amount = sum(payment_amount for _, payment_amount in payments)
+            if len(payments) > 1:
+                # Recorded more than once on our side
+                outcome = Outcome.DUPLICATE
+            elif recorded_amount != amount:
+                outcome = Outcome.MISMATCH
+            else:
+                outcome = Outcome.MATCHED
+            add(outcome, reference, payment_id=payment_id, line_number=line_number,
+                settled_amount=amount, recorded_amount=recorded_amount)
+
+        for reference, payments in recorded.items():
+            for payment_id, amount in payments:
+                add(Outcome.UNSETTLED, reference, payment_id=payment_id, recorded_amount=amount)
+
+        SettlementItem.objects.bulk_create(items)
+        report.matched_count = counts[Outcome.MATCHED]
+        report.unrecorded_count = counts[Outcome.UNRECORDED]
+        report.unsettled_count = counts[Outcome.UNSETTLED]
+        report.duplicate_count = counts[Outcome.DUPLICATE]
+        report.mismatch_count = counts[Outcome.MISMATCH]
+        report.save()
+    return report
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from core.tasks import run_in_background
+from .models import Invoice
+from .receipts import prerender_receipts
+
+
+@receiver(post_save, sender=Invoice)
+def prerender_paid_receipt(sender, instance, **kwargs):
+    # Receipts of paid invoices are rendered before anyone asks for them
+    if instance.status == Invoice.Status.PAID:
+        run_in_background(prerender_receipts, instance.pk)
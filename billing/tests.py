@@ -1,3 +1,462 @@
-from django.test import TestCase
+import datetime
+import json
+import shutil
+import tempfile
+import time
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+import requests
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from booking.models import Booking
+from core.audit import audit_buffer
+from hotel.models import Hotel, Room, RoomType
+from tenants.models import Membership, Tenant
+from .gateway_client import CircuitBreaker, CircuitOpenError, GatewayError, TransientGatewayError, get_client, reset_clients
+from .journal import account_balance, integrity_errors, missing_postings, repair_journal, trial_balance
+from .mock_gateway import start_mock_gateway
+from .models import (
+    Invoice, JournalEntry, JournalLine, LedgerAccount, NightAuditSummary, Payment, PaymentEvent, PaymentGateway, RoomCharge,
+    SettlementItem, SettlementReport,
+)
+from .night_audit import close_business_day
+from .reconciliation import SettlementFileError, reconcile
+from .webhooks import paystack_signature
 
-# Create your tests here.
+User = get_user_model()
+
+
+class MockGatewayTestCase(TestCase):
+    """Runs the tests against billing.mock_gateway instead of the real APIs."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.gateway_server = start_mock_gateway()
+        # Paid invoices pre-render their receipts
+        cls.media_root = tempfile.mkdtemp()
+        cls.gateway_settings = override_settings(
+            MEDIA_ROOT=cls.media_root,
+            PAYSTACK_API_BASE=cls.gateway_server.base_url,
+            FLUTTERWAVE_API_BASE=cls.gateway_server.base_url,
+            GATEWAY_BACKOFF=0,
+            TASKS_ALWAYS_EAGER=True,
+        )
+        cls.gateway_settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.gateway_settings.disable()
+        cls.gateway_server.shutdown()
+        cls.gateway_server.server_close()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        reset_clients()
+        super().tearDownClass()
+
+    def setUp(self):
+        reset_clients()
+        self.gateway_server.charges.clear()
+        self.gateway_server.failure_rate = 0
+
+
+class PaymentCallbackTests(MockGatewayTestCase):
+    def setUp(self):
+        super().setUp()
+        owner = User.objects.create_user('owner', 'owner@example.com', 'x')
+        self.tenant = Tenant.objects.create(
+            name='Hotel', slug='hotel', subdomain='hotel', owner=owner,
+            subscription_end_date=timezone.now() + datetime.timedelta(days=30),
+        )
+        self.gateway = PaymentGateway.objects.create(
+            tenant=self.tenant, name='PAYSTACK', public_key='pk', secret_key='sk', is_active=True,
+        )
+        self.invoice = Invoice.objects.create(tenant=self.tenant, amount=Decimal('500.00'), invoice_type=Invoice.Type.OTHER)
+
+    def charge(self, reference, amount, currency='NGN', token='AUTH'):
+        # Paystack amounts are in kobo
+        self.gateway_server.record_charge('PAYSTACK', reference, token, int(amount * 100), currency)
+
+    def callback(self, reference, invoice):
+        url = reverse('verify_payment', args=['paystack'])
+        return self.client.get(url, {'reference': reference, 'invoice_id': invoice.pk}, HTTP_HOST='hotel.localhost')
+
+    def assertPaid(self, invoice, paid=True):
+        invoice.refresh_from_db()
+        self.assertEqual(invoice.status == Invoice.Status.PAID, paid)
+
+    def test_verified_payment_marks_invoice_paid_once(self):
+        reference = f'HMS-INV-{self.invoice.pk}-1'
+        self.charge(reference, 500)
+        self.callback(reference, self.invoice)
+        self.callback(reference, self.invoice)
+        self.assertPaid(self.invoice)
+        self.assertEqual(Payment.objects.filter(transaction_id=reference).count(), 1)
+        self.assertEqual(PaymentEvent.objects.get(reference=reference).status, PaymentEvent.Status.PROCESSED)
+
+    def test_reference_of_another_invoice_is_rejected(self):
+        cheap = Invoice.objects.create(tenant=self.tenant, amount=Decimal('1.00'), invoice_type=Invoice.Type.OTHER)
+        reference = f'HMS-INV-{cheap.pk}-1'
+        self.charge(reference, 1)
+        self.callback(reference, self.invoice)
+        self.assertPaid(self.invoice, False)
+        self.assertFalse(Payment.objects.filter(invoice=self.invoice).exists())
+
+    def test_underpayment_is_rejected(self):
+        reference = f'HMS-INV-{self.invoice.pk}-1'
+        self.charge(reference, 1)
+        self.callback(reference, self.invoice)
+        self.assertPaid(self.invoice, False)
+        self.assertEqual(PaymentEvent.objects.get(reference=reference).status, PaymentEvent.Status.IGNORED)
+
+    def test_other_currency_is_rejected(self):
+        reference = f'HMS-INV-{self.invoice.pk}-1'
+        self.charge(reference, 500, currency='USD')
+        self.callback(reference, self.invoice)
+        self.assertPaid(self.invoice, False)
+
+    def test_reference_already_on_a_payment_is_rejected(self):
+        reference = f'HMS-INV-{self.invoice.pk}-1'
+        other = Invoice.objects.create(tenant=self.tenant, amount=Decimal('10.00'), invoice_type=Invoice.Type.OTHER)
+        Payment.objects.create(invoice=other, amount=Decimal('10.00'), payment_method='PAYSTACK', transaction_id=reference)
+        self.charge(reference, 500)
+        self.callback(reference, self.invoice)
+        self.assertPaid(self.invoice, False)
+
+    def test_declined_charge_is_rejected(self):
+        reference = f'HMS-INV-{self.invoice.pk}-1'
+        self.charge(reference, 500, token='DECLINE')
+        self.callback(reference, self.invoice)
+        self.assertPaid(self.invoice, False)
+
+    def test_failed_webhook_does_not_block_later_success(self):
+        reference = f'HMS-INV-{self.invoice.pk}-1'
+        url = reverse('payment_webhook', args=['paystack'])
+
+        def webhook(status):
+            body = json.dumps({'event': 'charge.success', 'data': {
+                'reference': reference, 'amount': 50000, 'currency': 'NGN', 'status': status,
+            }}).encode()
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(
+                    url, body, content_type='application/json', HTTP_HOST='hotel.localhost',
+                    HTTP_X_PAYSTACK_SIGNATURE=paystack_signature('sk', body),
+                )
+
+        webhook('failed')
+        self.assertPaid(self.invoice, False)
+        webhook('success')
+        self.assertPaid(self.invoice)
+
+
+@override_settings(GATEWAY_BREAKER_THRESHOLD=3, GATEWAY_BREAKER_RESET=0.2)
+class CircuitBreakerTests(MockGatewayTestCase):
+    def verify(self, retries=0):
+        client = get_client('PAYSTACK')
+        url = f'{self.gateway_server.base_url}/transaction/verify/REF'
+        return client.request('GET', url, 'sk', endpoint='verify', retries=retries)
+
+    def fail_until_open(self):
+        self.gateway_server.failure_rate = 1
+        for _ in range(3):
+            with self.assertRaises(TransientGatewayError):
+                self.verify()
+        self.assertEqual(get_client('PAYSTACK').breaker.state, CircuitBreaker.OPEN)
+
+    def test_opens_after_consecutive_failures_and_fails_fast(self):
+        self.fail_until_open()
+        with self.assertRaises(CircuitOpenError):
+            self.verify()
+
+    def test_declines_do_not_open_the_circuit(self):
+        for _ in range(5):
+            # Unknown reference: a 400, the gateway is up
+            with self.assertRaises(GatewayError):
+                self.verify()
+        self.assertEqual(get_client('PAYSTACK').breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_trial_closes_on_success(self):
+        self.fail_until_open()
+        self.gateway_server.failure_rate = 0
+        time.sleep(0.25)
+        with self.assertRaises(GatewayError):
+            self.verify()
+        self.assertEqual(get_client('PAYSTACK').breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_trial_reopens_on_failure(self):
+        self.fail_until_open()
+        time.sleep(0.25)
+        with self.assertRaises(TransientGatewayError):
+            self.verify()
+        breaker = get_client('PAYSTACK').breaker
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            self.verify()
+
+    def test_unexpected_request_errors_do_not_wedge_the_circuit(self):
+        self.fail_until_open()
+        self.gateway_server.failure_rate = 0
+        time.sleep(0.25)
+        client = get_client('PAYSTACK')
+        with mock.patch.object(client.session, 'request', side_effect=requests.exceptions.ChunkedEncodingError('cut off')):
+            with self.assertRaises(TransientGatewayError):
+                self.verify()
+        time.sleep(0.25)
+        with self.assertRaises(GatewayError):
+            self.verify()
+        self.assertEqual(client.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_undecodable_responses_are_transient(self):
+        page = requests.Response()
+        page.status_code = 200
+        page._content = b'<html>Bad gateway</html>'
+        client = get_client('PAYSTACK')
+        with mock.patch.object(client.session, 'request', return_value=page) as send:
+            for _ in range(3):
+                with self.assertRaises(TransientGatewayError):
+                    self.verify(retries=1)
+        self.assertEqual(send.call_count, 3)
+        self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+
+    def test_retries_recover_from_transient_errors(self):
+        self.gateway_server.record_charge('PAYSTACK', 'REF', 'AUTH', 100, 'NGN')
+        with mock.patch.object(get_client('PAYSTACK').session, 'request', wraps=get_client('PAYSTACK').session.request) as send:
+            send.side_effect = [requests.ConnectionError('reset'), mock.DEFAULT]
+            self.assertEqual(self.verify(retries=2)['data']['reference'], 'REF')
+        self.assertEqual(send.call_count, 2)
+
+
+def at(day, hour):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time(hour)))
+
+
+def create_stay(tenant, arrival, nights, total_price, **kwargs):
+    """A booking in a new room of `tenant`, arriving at 14:00 and leaving at 11:00."""
+    hotel = Hotel.objects.create(tenant=tenant, name=tenant.name, address='-', email='h@example.com', phone='1')
+    room_type = RoomType.objects.create(
+        tenant=tenant, hotel=hotel, name='Standard', price_per_night=Decimal('100.00'), capacity=2,
+    )
+    room = Room.objects.create(tenant=tenant, hotel=hotel, room_type=room_type, room_number='101')
+    return Booking.objects.create(
+        tenant=tenant, room=room, guest_name='Guest', total_price=total_price,
+        check_in_date=at(arrival, 14), check_out_date=at(arrival + datetime.timedelta(days=nights), 11), **kwargs,
+    )
+
+
+class NightAuditTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'x')
+        self.tenant = Tenant.objects.create(name='Hotel', slug='hotel', subdomain='hotel', owner=owner)
+        self.arrival = timezone.localdate() - datetime.timedelta(days=3)
+        self.booking = create_stay(self.tenant, self.arrival, 2, Decimal('200.00'), status=Booking.Status.CHECKED_IN)
+
+    def charges(self):
+        return list(RoomCharge.objects.filter(booking=self.booking).order_by('business_date').values_list('business_date', 'amount'))
+
+    def test_stay_checked_out_before_the_audit_is_charged_its_last_night(self):
+        last_night = self.arrival + datetime.timedelta(days=1)
+        close_business_day(self.tenant, self.arrival)
+        # Departure morning: the guest leaves before the last night is audited
+        Booking.objects.filter(pk=self.booking.pk).update(
+            status=Booking.Status.CHECKED_OUT, check_out_date=at(last_night + datetime.timedelta(days=1), 10),
+        )
+        summary, created = close_business_day(self.tenant, last_night)
+        self.assertTrue(created)
+        self.assertEqual(summary.rooms_occupied, 1)
+        self.assertEqual(self.charges(), [(self.arrival, Decimal('100.00')), (last_night, Decimal('100.00'))])
+
+    def test_rerunning_a_closed_day_posts_nothing(self):
+        first, created = close_business_day(self.tenant, self.arrival)
+        self.assertTrue(created)
+        again, created = close_business_day(self.tenant, self.arrival)
+        self.assertFalse(created)
+        self.assertEqual(again.pk, first.pk)
+        self.assertEqual(self.charges(), [(self.arrival, Decimal('100.00'))])
+
+    def test_days_that_are_not_over_are_refused(self):
+        for day in (timezone.localdate(), timezone.localdate() + datetime.timedelta(days=1)):
+            with self.assertRaises(ValueError):
+                close_business_day(self.tenant, day)
+        with self.assertRaises(CommandError):
+            call_command('night_audit', date=timezone.localdate().isoformat(), stdout=StringIO())
+        self.assertFalse(NightAuditSummary.objects.exists())
+
+    def test_days_close_in_order(self):
+        close_business_day(self.tenant, self.arrival)
+        # Skipping the open business date
+        with self.assertRaises(ValueError):
+            close_business_day(self.tenant, self.arrival + datetime.timedelta(days=2))
+        # Going back before a closed day
+        with self.assertRaises(ValueError):
+            close_business_day(self.tenant, self.arrival - datetime.timedelta(days=1))
+        self.assertEqual(self.charges(), [(self.arrival, Decimal('100.00'))])
+
+
+class FolioAccessTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'x')
+        self.tenant = Tenant.objects.create(name='Hotel', slug='hotel', subdomain='hotel', owner=owner)
+        self.other = Tenant.objects.create(name='Other', slug='other', subdomain='other', owner=owner)
+        self.booking = create_stay(self.tenant, timezone.localdate(), 1, Decimal('100.00'))
+        self.url = reverse('booking_folio', args=[self.booking.pk])
+        # Logins are audited; write them here rather than from the flush timer's thread
+        self.addCleanup(audit_buffer.flush)
+
+    def member(self, tenant, role, **kwargs):
+        user = User.objects.create_user(f'{role.lower()}-{tenant.slug}', password='x', **kwargs)
+        Membership.objects.create(user=user, tenant=tenant, role=role)
+        self.client.force_login(user)
+
+    def test_manager_of_the_hotel_sees_the_folio(self):
+        self.member(self.tenant, 'MANAGER')
+        response = self.client.get(self.url, HTTP_HOST='hotel.localhost')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['base_template'], 'dashboard_base.html')
+
+    def test_staff_of_another_hotel_is_refused(self):
+        self.member(self.other, 'MANAGER', is_staff=True)
+        self.assertEqual(self.client.get(self.url, HTTP_HOST='hotel.localhost').status_code, 302)
+        # Nor can it be opened from their own hotel's domain
+        self.assertEqual(self.client.get(self.url, HTTP_HOST='other.localhost').status_code, 404)
+
+
+class JournalTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'x')
+        self.tenant = Tenant.objects.create(name='Hotel', slug='hotel', subdomain='hotel', owner=owner)
+
+    def invoice(self, amount):
+        return Invoice.objects.create(tenant=self.tenant, amount=Decimal(amount), invoice_type=Invoice.Type.OTHER)
+
+    def balances(self):
+        return {code: balance for code, balance in trial_balance(self.tenant).items() if balance}
+
+    def test_amount_changes_and_cancellation_post_adjustments(self):
+        invoice = self.invoice('100.00')
+        invoice.amount = Decimal('150.00')
+        invoice.save()
+        invoice.status = Invoice.Status.CANCELLED
+        invoice.save()
+        invoice.save()
+
+        postings = [
+            (line.entry.kind, line.amount)
+            for line in JournalLine.objects.filter(account__code=LedgerAccount.Code.RECEIVABLE).select_related('entry').order_by('sequence')
+        ]
+        self.assertEqual(postings, [
+            (JournalEntry.Kind.CHARGE, Decimal('100.00')),
+            (JournalEntry.Kind.ADJUSTMENT, Decimal('50.00')),
+            (JournalEntry.Kind.ADJUSTMENT, Decimal('-150.00')),
+        ])
+        self.assertEqual(self.balances(), {})
+        self.assertEqual(integrity_errors(self.tenant.pk), [])
+
+    def test_refund(self):
+        invoice = self.invoice('100.00')
+        Payment.objects.create(invoice=invoice, amount=Decimal('100.00'), payment_method='CASH')
+        refund = Payment.objects.create(invoice=invoice, amount=Decimal('-40.00'), payment_method='CASH')
+
+        self.assertEqual(refund.journal_entries.get().kind, JournalEntry.Kind.REFUND)
+        self.assertEqual(self.balances(), {
+            LedgerAccount.Code.RECEIVABLE: Decimal('40.00'),
+            LedgerAccount.Code.REVENUE: Decimal('-100.00'),
+            LedgerAccount.Code.CASH: Decimal('60.00'),
+        })
+
+    def test_balance_at_a_past_time(self):
+        monday = timezone.now() - datetime.timedelta(days=7)
+        with mock.patch('billing.journal.timezone.now', return_value=monday):
+            self.invoice('100.00')
+        self.invoice('25.00')
+
+        receivable = LedgerAccount.Code.RECEIVABLE
+        self.assertEqual(account_balance(self.tenant, receivable, at=monday - datetime.timedelta(days=1)), Decimal('0'))
+        self.assertEqual(account_balance(self.tenant, receivable, at=monday + datetime.timedelta(days=1)), Decimal('100.00'))
+        self.assertEqual(account_balance(self.tenant, receivable), Decimal('125.00'))
+
+    def test_repair_journals_history_from_before_the_journal(self):
+        with mock.patch('billing.journal.journal_invoice'), mock.patch('billing.journal.journal_payment'):
+            invoice = self.invoice('100.00')
+            Payment.objects.create(invoice=invoice, amount=Decimal('60.00'), payment_method='CASH')
+        self.assertEqual(len(missing_postings(self.tenant.pk)), 2)
+        with self.assertRaises(CommandError):
+            call_command('verify_journal', tenant='hotel', stdout=StringIO())
+
+        call_command('verify_journal', tenant='hotel', repair=True, stdout=StringIO())
+        self.assertEqual(self.balances(), {
+            LedgerAccount.Code.RECEIVABLE: Decimal('40.00'),
+            LedgerAccount.Code.REVENUE: Decimal('-100.00'),
+            LedgerAccount.Code.CASH: Decimal('60.00'),
+        })
+        self.assertEqual(repair_journal(self.tenant.pk), 0)
+        call_command('verify_journal', tenant='hotel', stdout=StringIO())
+
+    def test_tampered_line_is_reported(self):
+        invoice = self.invoice('100.00')
+        Payment.objects.create(invoice=invoice, amount=Decimal('100.00'), payment_method='CASH')
+        self.assertEqual(integrity_errors(self.tenant.pk), [])
+
+        line = JournalLine.objects.get(account__code=LedgerAccount.Code.CASH)
+        JournalLine.objects.filter(pk=line.pk).update(amount=Decimal('10.00'))
+        errors = integrity_errors(self.tenant.pk)
+        self.assertTrue(any('unbalanced' in error for error in errors))
+        self.assertTrue(any(f'Account {line.account_id} line #1' in error for error in errors))
+
+
+class ReconciliationTests(TestCase):
+    def setUp(self):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'x')
+        self.tenant = Tenant.objects.create(name='Hotel', slug='hotel', subdomain='hotel', owner=owner)
+        invoice = Invoice.objects.create(tenant=self.tenant, amount=Decimal('1000.00'), invoice_type=Invoice.Type.OTHER)
+        for reference, amount in [('R1', '100.00'), ('R2', '50.00'), ('R3', '30.00'), ('R3', '30.00'), ('R4', '20.00')]:
+            Payment.objects.create(invoice=invoice, amount=Decimal(amount), payment_method='PAYSTACK', transaction_id=reference)
+        # Another gateway's payment is not part of the settlement
+        Payment.objects.create(invoice=invoice, amount=Decimal('5.00'), payment_method='CASH', transaction_id='R9')
+
+    def reconcile(self, csv_text, minor_units=False):
+        today = timezone.localdate()
+        report = SettlementReport(tenant=self.tenant, gateway='PAYSTACK', start_date=today, end_date=today, source_name='test.csv')
+        return reconcile(report, StringIO(csv_text), minor_units=minor_units)
+
+    def outcomes(self, report):
+        return sorted(report.items.values_list('reference', 'outcome'))
+
+    def test_lines_are_classified_against_recorded_payments(self):
+        report = self.reconcile(
+            "Reference,Amount,Status\n"
+            "R1,10000,success\n"
+            "R2,4000,success\n"
+            "R3,6000,success\n"
+            "R5,7000,success\n"
+            "R1,10000,success\n"
+            "R6,500,failed\n"
+            ",100,success\n",
+            minor_units=True,
+        )
+        Outcome = SettlementItem.Outcome
+        self.assertEqual(self.outcomes(report), [
+            ('R1', Outcome.DUPLICATE), ('R1', Outcome.MATCHED), ('R2', Outcome.MISMATCH),
+            ('R3', Outcome.DUPLICATE), ('R4', Outcome.UNSETTLED), ('R5', Outcome.UNRECORDED),
+        ])
+        self.assertEqual((report.line_count, report.skipped_count), (7, 2))
+        self.assertEqual(
+            (report.matched_count, report.mismatch_count, report.duplicate_count, report.unrecorded_count, report.unsettled_count),
+            (1, 1, 2, 1, 1),
+        )
+        self.assertEqual(report.settled_total, Decimal('370.00'))
+        self.assertEqual(report.recorded_total, Decimal('230.00'))
+
+    def test_amounts_in_major_units(self):
+        report = self.reconcile("tx_ref,amount\nR1,\"100.00\"\nR2,50\n")
+        self.assertEqual(report.matched_count, 2)
+        # Each payment of R3 and R4
+        self.assertEqual(report.unsettled_count, 3)
+
+    def test_file_without_an_amount_column_is_refused(self):
+        with self.assertRaises(SettlementFileError):
+            self.reconcile("reference,fee\nR1,1\n")
+        self.assertFalse(SettlementReport.objects.exists())
@@ -0,0 +1,104 @@
+"""
+Tenant payment ledger: keyset pagination and period totals.
+
+Pages seek on (payment_date, id) using payment_tenant_date_idx instead of
+OFFSET, so the thousandth page costs the same as the first. Cursors are the
+last row's (payment_date, id), base64 encoded.
+"""
+import base64
+from datetime import datetime
+from django.db.models import Q, Sum
+from django.utils import timezone
+from .models import Invoice, Payment
+
+LEDGER_PAGE_SIZE = 50
+MAX_LEDGER_PAGE_SIZE = 500
+
+
+def ledger_queryset(tenant):
+    # Subscription payments are the hotel paying the platform, not hotel income
+    return Payment.objects.filter(tenant=tenant).exclude(invoice__invoice_type=Invoice.Type.SUBSCRIPTION)
+
+
+def filter_ledger(queryset, params):
+    """
+    Applies the ledger's GET filters (start/end dates, method) to a queryset.
+    """
+    from analytics.exports import parse_date
+    from analytics.stats import day_bounds
+
+    start = parse_date(params.get('start'))
+    end = parse_date(params.get('end'))
+    method = params.get('method')
+    if start:
+        queryset = queryset.filter(payment_date__gte=day_bounds(start)[0])
+    if end:
+        queryset = queryset.filter(payment_date__lt=day_bounds(end)[1])
+    if method in Payment.Method.values:
+        queryset = queryset.filter(payment_method=method)
+    return queryset
+
+
+def encode_cursor(payment):
+    raw = f"{payment.payment_date.isoformat()}|{payment.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        payment_date, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(payment_date), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def ledger_page(queryset, cursor=None, page_size=LEDGER_PAGE_SIZE):
+    """
+    Returns (payments, next_cursor) for the page after `cursor`, newest first.
+    """
+    queryset = queryset.order_by('-payment_date', '-id')
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        payment_date, pk = position
+        queryset = queryset.filter(Q(payment_date__lt=payment_date) | Q(payment_date=payment_date, id__lt=pk))
+
+    payments = list(queryset.select_related('invoice')[:page_size + 1])
+    next_cursor = encode_cursor(payments[page_size - 1]) if len(payments) > page_size else None
+    return payments[:page_size], next_cursor
+
+
+def period_starts(now=None):
+    """Local midnight at the start of this week (Monday), month and year."""
+    now = timezone.localtime(now)
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return {
+        'week': today - timezone.timedelta(days=today.weekday()),
+        'month': today.replace(day=1),
+        'year': today.replace(month=1, day=1),
+    }
+
+
+def period_totals(queryset, now=None):
+    """
+    {'weekly_sales', 'monthly_sales', 'yearly_sales'} from one conditional
+    aggregate (the week can start in the previous year).
+    """
+    starts = period_starts(now)
+    totals = queryset.filter(payment_date__gte=min(starts.values())).aggregate(
+        weekly_sales=Sum('amount', filter=Q(payment_date__gte=starts['week'])),
+        monthly_sales=Sum('amount', filter=Q(payment_date__gte=starts['month'])),
+        yearly_sales=Sum('amount', filter=Q(payment_date__gte=starts['year'])),
+    )
+    return {key: value or 0 for key, value in totals.items()}
+
+
+def serialize_payment(payment):
+    return {
+        'id': payment.pk,
+        'invoice': payment.invoice_id,
+        'invoice_type': payment.invoice.invoice_type,
+        'amount': str(payment.amount),
+        'method': payment.payment_method,
+        'transaction_id': payment.transaction_id,
+        'payment_date': payment.payment_date.isoformat(),
+    }
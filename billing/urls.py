@@ -3,10 +3,18 @@ from . import views
 
 urlpatterns = [
     path('invoices/', views.invoice_list, name='invoice_list'),
+    path('transactions/', views.transaction_ledger, name='transaction_ledger'),
+    path('api/transactions/', views.transaction_ledger_api, name='transaction_ledger_api'),
+    path('settlements/', views.settlement_reconciliation, name='settlement_reconciliation'),
+    path('settlements/<int:pk>/', views.settlement_report_detail, name='settlement_report_detail'),
     path('my-invoices/', views.my_invoices, name='my_invoices'),
+    path('my-folio/', views.my_folio, name='my_folio'),
+    path('folio/booking/<int:pk>/', views.booking_folio, name='booking_folio'),
     path('invoices/<int:pk>/', views.invoice_detail, name='invoice_detail'),
     path('invoices/<int:pk>/pay/', views.make_payment, name='make_payment'),
+    path('invoices/<int:pk>/receipt/', views.download_receipt, name='download_invoice_receipt'),
     path('payment/select/<int:invoice_id>/', views.payment_selection, name='payment_selection'),
     path('payment/verify/<str:gateway>/', views.verify_payment, name='verify_payment'),
+    path('payment/webhook/<str:gateway>/', views.payment_webhook, name='payment_webhook'),
     path('settings/payments/', views.PaymentSettingsView.as_view(), name='payment_settings'),
 ]
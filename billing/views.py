@@ -2,25 +2,36 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib import messages
 from django.conf import settings
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, FileResponse
+from django.core.files.storage import default_storage
 from django.views.decorators.csrf import csrf_exempt
 from django.utils import timezone
-from django.db import models
-from .models import Invoice, Payment, PaymentGateway
-from .forms import PaymentGatewayForm
+from .models import Invoice, Payment, PaymentEvent, PaymentGateway, SettlementItem, SettlementReport
+from .gateways import fetch_transaction, GatewayError, TransientGatewayError
+from .folio import guest_folio, stay_folio
+from .reconciliation import SettlementFileError, reconcile
+from .receipts import get_invoice_receipt
+from .transactions import (
+    LEDGER_PAGE_SIZE, MAX_LEDGER_PAGE_SIZE, filter_ledger, ledger_page, ledger_queryset, period_totals, serialize_payment,
+)
+from .webhooks import (
+    HOTEL_CURRENCY, invoice_for_reference, invoice_id_for_reference, parse_event, process_payment_event,
+    record_event, verify_signature,
+)
+from .forms import PaymentGatewayForm, SettlementUploadForm
 from tenants.mixins import TenantAdminRequiredMixin
+from tenants.utils import has_tenant_permission
 from django.views.generic import FormView
 from django.urls import reverse_lazy
 from booking.models import Booking
 from core.models import Notification, TenantSetting
-from django.urls import reverse
+from core.tasks import run_in_background
+import codecs
+import csv
 import json
 import io
 import qrcode
 import base64
-from fpdf import FPDF
-import os
-import tempfile
 
 class PaymentSettingsView(TenantAdminRequiredMixin, FormView):
     template_name = 'billing/payment_settings.html'
@@ -43,6 +54,7 @@ class PaymentSettingsView(TenantAdminRequiredMixin, FormView):
             if flutterwave:
                 initial['flutterwave_public_key'] = flutterwave.public_key
                 initial['flutterwave_secret_key'] = flutterwave.secret_key
+                initial['flutterwave_webhook_secret'] = flutterwave.webhook_secret
                 initial['flutterwave_active'] = flutterwave.is_active
         return initial
 
@@ -70,6 +82,7 @@ class PaymentSettingsView(TenantAdminRequiredMixin, FormView):
             defaults={
                 'public_key': form.cleaned_data['flutterwave_public_key'],
                 'secret_key': form.cleaned_data['flutterwave_secret_key'],
+                'webhook_secret': form.cleaned_data['flutterwave_webhook_secret'],
                 'is_active': form.cleaned_data['flutterwave_active']
             }
         )
@@ -80,6 +93,9 @@ class PaymentSettingsView(TenantAdminRequiredMixin, FormView):
 def is_admin(user):
     return user.is_authenticated and user.is_staff
 
+# Tenant roles that may see the payment ledger
+LEDGER_ROLES = ['ADMIN', 'MANAGER']
+
 @login_required
 def invoice_list(request):
     # Base: Invoices for the current user (Guest View)
@@ -88,67 +104,169 @@ def invoice_list(request):
     # Financial Reports (Transactions, Monthly/Weekly Sales) - Only for Staff/Admin
     context = {'invoices': invoices}
     
-    # Check if user is staff OR manager/admin via role
-    is_staff_or_admin = request.user.is_staff or request.user.role in ['ADMIN', 'MANAGER']
+    # Managers/admins of the current tenant; nothing across tenants without one
+    is_staff_or_admin = request.tenant is not None and has_tenant_permission(request.user, request.tenant, LEDGER_ROLES)
     
     if is_staff_or_admin:
-        # Transactions (All Payments)
-        transactions = Payment.objects.all().order_by('-payment_date')
-        
-        # Calculate Date Ranges
-        now = timezone.now()
-        start_of_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        start_of_week = now - timezone.timedelta(days=now.weekday())
-        start_of_week = start_of_week.replace(hour=0, minute=0, second=0, microsecond=0)
-        start_of_year = now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-        
-        # Sales Aggregations
-        monthly_sales = Payment.objects.filter(payment_date__gte=start_of_month).aggregate(total=models.Sum('amount'))['total'] or 0
-        weekly_sales = Payment.objects.filter(payment_date__gte=start_of_week).aggregate(total=models.Sum('amount'))['total'] or 0
-        yearly_sales = Payment.objects.filter(payment_date__gte=start_of_year).aggregate(total=models.Sum('amount'))['total'] or 0
-        
+        # Transactions for the current TENANT (the full history is in the ledger)
+        payments = ledger_queryset(request.tenant)
+        transactions, _ = ledger_page(payments, page_size=5)
+
         # Admin Invoice View: Show ALL invoices for the current TENANT
-        all_invoices = Invoice.objects.all()
-        if request.tenant:
-            all_invoices = all_invoices.filter(tenant=request.tenant)
+        all_invoices = Invoice.objects.filter(tenant=request.tenant)
             
         # Update context
         context.update({
             'transactions': transactions,
-            'monthly_sales': monthly_sales,
-            'weekly_sales': weekly_sales,
-            'yearly_sales': yearly_sales,
+            **period_totals(payments),
             'invoices': all_invoices.order_by('-issued_date') # Staff sees all invoices
         })
         
     return render(request, 'billing/invoice_list.html', context)
 
 @login_required
+def transaction_ledger(request):
+    """The tenant's payments, newest first, with cursor (keyset) pagination"""
+    if not request.tenant:
+        messages.error(request, "No tenant context.")
+        return redirect('dashboard')
+
+    if not has_tenant_permission(request.user, request.tenant, LEDGER_ROLES):
+        messages.error(request, "Permission denied.")
+        return redirect('dashboard')
+
+    payments = filter_ledger(ledger_queryset(request.tenant), request.GET)
+    transactions, next_cursor = ledger_page(payments, cursor=request.GET.get('cursor'))
+
+    params = request.GET.copy()
+    params.pop('cursor', None)
+
+    return render(request, 'billing/transaction_ledger.html', {
+        'transactions': transactions,
+        'next_cursor': next_cursor,
+        'filter_query': params.urlencode(),
+        'methods': Payment.Method.choices,
+        **period_totals(payments),
+    })
+
+@login_required
+def transaction_ledger_api(request):
+    """
+    JSON ledger: ?cursor=&limit=&start=&end=&method=. Follow next_cursor until it is null.
+    """
+    if not request.tenant or not has_tenant_permission(request.user, request.tenant, LEDGER_ROLES):
+        return JsonResponse({'error': 'Permission denied.'}, status=403)
+
+    try:
+        limit = min(max(int(request.GET.get('limit', LEDGER_PAGE_SIZE)), 1), MAX_LEDGER_PAGE_SIZE)
+    except ValueError:
+        limit = LEDGER_PAGE_SIZE
+
+    payments = filter_ledger(ledger_queryset(request.tenant), request.GET)
+    transactions, next_cursor = ledger_page(payments, cursor=request.GET.get('cursor'), page_size=limit)
+    return JsonResponse({
+        'results': [serialize_payment(payment) for payment in transactions],
+        'next_cursor': next_cursor,
+    })
+
+SETTLEMENT_ITEMS_PAGE_SIZE = 200
+
+@login_required
+def settlement_reconciliation(request):
+    """Upload a gateway settlement file and list past reconciliations"""
+    if not request.tenant:
+        messages.error(request, "No tenant context.")
+        return redirect('dashboard')
+
+    if not has_tenant_permission(request.user, request.tenant, LEDGER_ROLES):
+        messages.error(request, "Permission denied.")
+        return redirect('dashboard')
+
+    form = SettlementUploadForm(request.POST or None, request.FILES or None)
+    if request.method == 'POST' and form.is_valid():
+        upload = form.cleaned_data['settlement_file']
+        report = SettlementReport(
+            tenant=request.tenant,
+            gateway=form.cleaned_data['gateway'],
+            start_date=form.cleaned_data['start_date'],
+            end_date=form.cleaned_data['end_date'],
+            source_name=upload.name,
+            created_by=request.user,
+        )
+        try:
+            # Decoded line by line, the upload is never read into memory whole
+            reconcile(report, codecs.iterdecode(upload, 'utf-8-sig'), minor_units=form.cleaned_data['minor_units'])
+        except (SettlementFileError, UnicodeDecodeError, csv.Error) as e:
+            messages.error(request, f"Could not read the settlement file: {e}")
+        else:
+            messages.success(request, f"Reconciled {report.line_count} lines: {report.exception_count} need attention.")
+            return redirect('settlement_report_detail', pk=report.pk)
+
+    reports = SettlementReport.objects.filter(tenant=request.tenant)[:50]
+    return render(request, 'billing/settlement_reconciliation.html', {'form': form, 'reports': reports})
+
+@login_required
+def settlement_report_detail(request, pk):
+    if not request.tenant or not has_tenant_permission(request.user, request.tenant, LEDGER_ROLES):
+        messages.error(request, "Permission denied.")
+        return redirect('dashboard')
+
+    report = get_object_or_404(SettlementReport, pk=pk, tenant=request.tenant)
+    outcome = request.GET.get('outcome')
+    if outcome not in SettlementItem.Outcome.values:
+        outcome = None
+
+    # Exceptions by default; matched lines only when asked for
+    items = report.items.select_related('payment__invoice')
+    items = items.filter(outcome=outcome) if outcome else items.exclude(outcome=SettlementItem.Outcome.MATCHED)
+    after = request.GET.get('after')
+    if after and after.isdigit():
+        items = items.filter(id__gt=int(after))
+    items = list(items.order_by('id')[:SETTLEMENT_ITEMS_PAGE_SIZE + 1])
+    next_after = items[SETTLEMENT_ITEMS_PAGE_SIZE - 1].pk if len(items) > SETTLEMENT_ITEMS_PAGE_SIZE else None
+
+    return render(request, 'billing/settlement_report_detail.html', {
+        'report': report,
+        'items': items[:SETTLEMENT_ITEMS_PAGE_SIZE],
+        'outcome': outcome,
+        'outcomes': SettlementItem.Outcome.choices,
+        'next_after': next_after,
+    })
+@login_required
 def my_invoices(request):
     """View for guests to see their own invoices."""
     if request.user.is_staff:
         return redirect('invoice_list')
         
-    invoices = Invoice.objects.filter(
-        models.Q(booking__user=request.user) |
-        models.Q(event_booking__user=request.user) |
-        models.Q(gym_membership__user=request.user)
-    ).distinct().order_by('-issued_date')
+    invoices = Invoice.objects.filter(guest=request.user).select_related('booking__room').order_by('-issued_date')
     
     return render(request, 'billing/my_invoices.html', {'invoices': invoices})
 
+@login_required
+def my_folio(request):
+    """The guest's full bill at this hotel: every charge, payment and the balance."""
+    folio = guest_folio(request.user, tenant=request.tenant)
+    return render(request, 'billing/folio.html', {**folio, 'base_template': 'guest_dashboard_base.html'})
+
+@login_required
+def booking_folio(request, pk):
+    """Everything billed to one stay, shown to the front desk at checkout."""
+    booking = get_object_or_404(Booking.objects.select_related('room'), pk=pk, tenant=request.tenant)
+
+    is_staff_or_admin = request.tenant is not None and has_tenant_permission(request.user, request.tenant, LEDGER_ROLES)
+    if not is_staff_or_admin and booking.user_id != request.user.pk:
+        messages.error(request, "Access denied.")
+        return redirect('home')
+
+    folio = stay_folio(booking)
+    base_template = 'dashboard_base.html' if is_staff_or_admin else 'guest_dashboard_base.html'
+    return render(request, 'billing/folio.html', {**folio, 'booking': booking, 'base_template': base_template})
+
 @login_required
 def invoice_detail(request, pk):
     invoice = get_object_or_404(Invoice, pk=pk)
     
-    # Determine user for permission check
-    invoice_user = None
-    if invoice.booking: invoice_user = invoice.booking.user
-    elif invoice.event_booking: invoice_user = invoice.event_booking.user
-    elif invoice.gym_membership: invoice_user = invoice.gym_membership.user
-    elif invoice.orders.exists(): invoice_user = invoice.orders.first().user
-    
-    if not (request.user.is_staff or request.user.role in ['ADMIN', 'MANAGER']) and invoice_user != request.user:
+    if not (request.user.is_staff or request.user.role in ['ADMIN', 'MANAGER']) and invoice.guest_id != request.user.pk:
         messages.error(request, "Access denied.")
         return redirect('home')
     return render(request, 'billing/invoice_detail.html', {'invoice': invoice})
@@ -162,7 +280,11 @@ def make_payment(request, pk):
     return redirect('payment_selection', invoice_id=invoice.pk)
 
 def payment_selection(request, invoice_id):
-    invoice = get_object_or_404(Invoice, pk=invoice_id)
+    invoice = get_object_or_404(
+        Invoice.objects.select_related('booking', 'event_booking__user', 'gym_membership__user', 'gym_membership__plan'),
+        pk=invoice_id,
+    )
+    order = invoice.orders.select_related('user').first()
     
     # Determine Context Object
     context_obj = None
@@ -173,8 +295,7 @@ def payment_selection(request, invoice_id):
     name = ''
     description = ''
     
-    if invoice.orders.exists():
-        order = invoice.orders.first()
+    if order:
         context_obj = order
         context_type = 'service'
         user = order.user
@@ -226,23 +347,9 @@ def payment_selection(request, invoice_id):
              messages.info(request, "This membership is already paid.")
              return redirect('gym_membership_list')
 
-    elif invoice.orders.exists():
-        order = invoice.orders.first()
-        context_obj = order
-        context_type = 'service'
-        user = order.user
-        email = user.email
-        phone = getattr(user, 'phone_number', '')
-        name = f"{user.first_name} {user.last_name}"
-        description = f"Room Service Order #{order.order_id or order.id}"
-        
-        if invoice.status == Invoice.Status.PAID:
-             messages.info(request, "This order is already paid.")
-             return redirect('my_orders')
-
     # Security Check
     if request.user.is_authenticated:
-        if not request.user.is_staff and user and user != request.user:
+        if not request.user.is_staff and invoice.guest_id and invoice.guest_id != request.user.pk:
              messages.error(request, "Access denied.")
              return redirect('home')
     
@@ -275,7 +382,7 @@ def payment_selection(request, invoice_id):
         'paystack_key': paystack_key,
         'flutterwave_key': flutterwave_key,
         'amount': int(invoice.amount * 100) if paystack_gw else invoice.amount, # Paystack uses kobo
-        'currency': 'NGN', # Assuming NGN for now
+        'currency': HOTEL_CURRENCY,
         'email': email,
         'phone': phone,
         'name': name,
@@ -283,322 +390,134 @@ def payment_selection(request, invoice_id):
     }
     return render(request, 'billing/payment_selection.html', context)
 
-from django.contrib.auth import get_user_model
-
 def verify_payment(request, gateway):
     """
-    Callback for payment verification
+    Redirect callback after checkout. The redirect itself proves nothing, so
+    the gateway's record of the reference is fetched and goes through the
+    PaymentEvent inbox like a webhook: the same reference, amount and currency
+    checks, applied once whichever arrives first.
     """
-    User = get_user_model()
     ref = request.GET.get('reference') or request.GET.get('tx_ref') # Paystack uses reference, FW uses tx_ref
     invoice_id = request.GET.get('invoice_id')
     
     if not ref or not invoice_id:
         messages.error(request, "Invalid payment verification parameters.")
         return redirect('home')
-        
-    invoice = get_object_or_404(Invoice, pk=invoice_id)
-    
-    # In a real app, verify with backend API using secret key
-    success = True # Simulate verification
-    
-    if success:
-        if invoice.status != Invoice.Status.PAID:
-            # Create Payment Record
-            Payment.objects.create(
-                invoice=invoice,
-                amount=invoice.amount,
-                payment_method=gateway.upper(),
-                transaction_id=ref
-            )
-            
-            # Update Invoice
-            invoice.status = Invoice.Status.PAID
-            invoice.save()
-            
-            # Handle Specific Object Updates & Notifications
-            redirect_url = 'home'
-            
-            if invoice.orders.exists():
-                # Orders handle their own status based on payment if needed
-                # Usually we move from AWAITING_PAYMENT to PENDING (for kitchen)
-                for order in invoice.orders.all():
-                    if order.status == 'AWAITING_PAYMENT':
-                        order.status = 'PENDING'
-                        order.save()
-                        
-                        # Notify Kitchen/Staff
-                        has_food = order.items.filter(menu_item__category='FOOD').exists()
-                        has_drink = order.items.filter(menu_item__category='DRINK').exists()
-                        
-                        roles_to_notify = [User.Role.ADMIN, User.Role.MANAGER]
-                        if has_food:
-                            roles_to_notify.append(User.Role.KITCHEN)
-                        if has_drink:
-                            roles_to_notify.append(User.Role.BAR)
-                            
-                        # Find users with these roles in the current tenant
-                        tenant_users = User.objects.filter(
-                            memberships__tenant=invoice.tenant,
-                            role__in=roles_to_notify
-                        ).distinct()
-                        
-                        for staff in tenant_users:
-                            # Only notify if role matches the content (e.g. Kitchen doesn't need to know about Drink-only)
-                            # But Admin/Manager always gets it.
-                            should_notify = False
-                            if staff.role in [User.Role.ADMIN, User.Role.MANAGER]:
-                                should_notify = True
-                            elif staff.role == User.Role.KITCHEN and has_food:
-                                should_notify = True
-                            elif staff.role == User.Role.BAR and has_drink:
-                                should_notify = True
-                                
-                            if should_notify:
-                                Notification.objects.create(
-                                    recipient=staff,
-                                    title="New Order Received",
-                                    message=f"Order #{order.order_id or order.id} ({'Food' if has_food else ''}{' & ' if has_food and has_drink else ''}{'Drink' if has_drink else ''}) needs attention.",
-                                    link=reverse('staff_order_list')
-                                )
-                        
-                redirect_url = 'my_orders'
-                redirect_pk = None
-
-            elif invoice.booking:
-                booking = invoice.booking
-                # Only update status if not already checked in/completed
-                if booking.status not in [Booking.Status.CHECKED_IN, Booking.Status.CHECKED_OUT, Booking.Status.CANCELLED]:
-                    booking.status = Booking.Status.CONFIRMED
-                    booking.save()
-                
-                # Check if Staff or Public
-                if request.user.is_staff:
-                    redirect_url = 'booking_detail'
-                    redirect_pk = booking.pk
-                else:
-                    # Public Success Page
-                    return render(request, 'booking/booking_success.html', {
-                        'booking': booking, 
-                        'site_settings': TenantSetting.objects.filter(tenant=invoice.tenant).first()
-                    })
-                
-            elif invoice.event_booking:
-                booking = invoice.event_booking
-                booking.status = 'CONFIRMED'
-                booking.save()
-                redirect_url = 'event_booking_detail'
-                redirect_pk = booking.pk
-                
-            elif invoice.gym_membership:
-                membership = invoice.gym_membership
-                membership.status = 'ACTIVE'
-                membership.save()
-                redirect_url = 'gym_membership_list'
-                redirect_pk = None
-            
-            messages.success(request, "Payment successful!")
-            if redirect_pk:
-                return redirect(redirect_url, pk=redirect_pk)
-            return redirect(redirect_url)
-            
-    messages.error(request, "Payment verification failed.")
-    return redirect('home')
-
-@login_required
-def download_receipt(request, pk):
-    invoice = get_object_or_404(Invoice, pk=pk)
-    
-    # Permission check: Owner or Staff
-    invoice_user = None
-    if invoice.booking: invoice_user = invoice.booking.user
-    elif invoice.event_booking: invoice_user = invoice.event_booking.user
-    elif invoice.gym_membership: invoice_user = invoice.gym_membership.user
-    elif invoice.orders.exists(): invoice_user = invoice.orders.first().user
+    # The reference names the invoice it was created for (payment_selection)
+    if str(invoice_id_for_reference(ref)) != invoice_id:
+        messages.error(request, "Payment verification failed.")
+        return redirect('home')
 
-    if not request.user.is_staff and invoice_user != request.user:
-         messages.error(request, "You do not have permission to download this receipt.")
-         return redirect('home')
+    invoice = get_object_or_404(Invoice, pk=invoice_id)
+    provider = gateway.upper()
 
-    tenant = invoice.tenant
-    settings = None
-    if tenant:
-        settings = TenantSetting.objects.filter(tenant=tenant).first()
-    
-    # Fallback values if no settings found
-    current_theme = settings.theme if settings else 'theme-default'
-    currency_symbol = settings.currency if settings else 'NGN' # Using currency code as symbol for now or mapping it
-    hotel_name = settings.hotel_name if settings else "Hotel Management System"
-    
-    # Simple currency mapping
-    CURRENCY_SYMBOLS = {
-        'USD': '$', 'EUR': '€', 'GBP': '£', 'NGN': '₦', 
-        'JPY': '¥', 'CAD': '$', 'AUD': '$', 'INR': '₹', 'ZAR': 'R'
-    }
-    if settings:
-        currency_symbol = CURRENCY_SYMBOLS.get(settings.currency, settings.currency)
-
-    # Define Theme Colors (R, G, B)
-    THEME_COLORS = {
-        'theme-default': (19, 236, 109),
-        'theme-light': (19, 236, 109), 
-        'theme-blue': (59, 130, 246), 
-        'theme-luxury': (212, 175, 55),
-        'theme-forest': (74, 222, 128),
-        'theme-ocean': (6, 182, 212),
-        'theme-sunset': (244, 114, 182),
-        'theme-royal': (167, 139, 250),
-        'theme-minimal': (113, 113, 122),
-    }
+    if invoice.status != Invoice.Status.PAID:
+        gateway_obj = PaymentGateway.objects.filter(tenant=invoice.tenant, name=provider, is_active=True).first()
+        if not gateway_obj:
+            messages.error(request, "Payment verification failed.")
+            return redirect('home')
+        try:
+            # One attempt: the guest is waiting and the webhook is the fallback
+            _, data = fetch_transaction(gateway_obj, ref, retries=0)
+        except TransientGatewayError as e:
+            print(f"Error verifying {provider} payment {ref}: {e}")
+            # The webhook will confirm it
+            messages.info(request, "We are confirming your payment with the gateway. You will be notified once it is confirmed.")
+            return redirect('home')
+        except GatewayError:
+            data = None
 
-    primary_color = THEME_COLORS.get(current_theme, (19, 236, 109))
-    
-    # Generate PDF (Standard Receipt Size - A5)
-    pdf = FPDF(orientation='P', unit='mm', format='A5')
-    pdf.set_auto_page_break(auto=False)
-    pdf.add_page()
-    
-    # --- Decorative Header ---
-    pdf.set_y(10)
-    pdf.set_font("Arial", 'B', 16)
-    pdf.set_text_color(*primary_color)
-    pdf.cell(0, 8, txt=hotel_name.upper(), ln=1, align="R")
-    
-    pdf.set_font("Arial", '', 8)
-    pdf.set_text_color(60, 60, 60)
-    pdf.cell(0, 4, txt="Official Receipt", ln=1, align="R")
-    
-    pdf.ln(2)
-    pdf.set_draw_color(*primary_color)
-    pdf.set_line_width(0.5)
-    pdf.line(10, pdf.get_y(), 138, pdf.get_y())
-    pdf.set_line_width(0.2)
-
-    # --- Receipt Info ---
-    pdf.ln(5)
-    pdf.set_font("Arial", 'B', 20)
-    pdf.set_text_color(30, 41, 59)
-    pdf.cell(70, 10, txt="RECEIPT", ln=0, align="L")
-    
-    pdf.set_fill_color(240, 240, 240)
-    pdf.set_font("Arial", 'B', 10)
-    pdf.cell(58, 10, txt=f"INV #{invoice.id}", ln=1, align="R", fill=True)
-    
-    pdf.ln(5)
-    
-    # --- Details ---
-    col_y = pdf.get_y()
-    
-    # Bill To
-    pdf.set_fill_color(*primary_color)
-    pdf.set_text_color(255, 255, 255)
-    pdf.set_font("Arial", 'B', 9)
-    pdf.cell(60, 6, txt="  BILL TO", ln=1, fill=True)
-    
-    pdf.set_text_color(30, 41, 59)
-    pdf.set_font("Arial", 'B', 10)
-    pdf.ln(2)
-    
-    guest_name = "Guest"
-    guest_email = ""
-    
-    if invoice.orders.exists():
-        order = invoice.orders.first()
-        guest_name = f"{order.user.first_name} {order.user.last_name}"
-        guest_email = order.user.email
-    elif invoice.booking:
-        guest_name = invoice.booking.guest_name
-        guest_email = invoice.booking.guest_email
-    elif invoice_user:
-        guest_name = f"{invoice_user.first_name} {invoice_user.last_name}"
-        guest_email = invoice_user.email
-        
-    pdf.cell(60, 5, txt=guest_name, ln=1)
-    pdf.set_font("Arial", '', 9)
-    pdf.cell(60, 4, txt=guest_email, ln=1)
-    
-    # Details Column
-    pdf.set_xy(80, col_y)
-    pdf.set_fill_color(30, 41, 59)
-    pdf.set_text_color(255, 255, 255)
-    pdf.set_font("Arial", 'B', 9)
-    pdf.cell(58, 6, txt="  DETAILS", ln=1, fill=True)
-    
-    pdf.set_x(80)
-    pdf.ln(2)
-    
-    def print_detail_row(label, value):
-        x = pdf.get_x()
-        pdf.set_font("Arial", '', 8)
-        pdf.set_text_color(100, 100, 100)
-        pdf.cell(20, 4, txt=label, align="L")
-        pdf.set_font("Arial", 'B', 8)
-        pdf.set_text_color(30, 41, 59)
-        pdf.cell(38, 4, txt=value, align="R", ln=1)
-        pdf.set_x(x)
-
-    pdf.set_x(80)
-    print_detail_row("Date:", invoice.issued_date.strftime("%Y-%m-%d"))
-    
-    status = invoice.get_status_display().upper()
-    print_detail_row("Status:", status)
-    
-    payment = invoice.payments.last()
-    if payment:
-        print_detail_row("Method:", payment.get_payment_method_display())
-        print_detail_row("Ref:", payment.transaction_id[:15] + "..." if len(payment.transaction_id) > 15 else payment.transaction_id)
+        if data:
+            payload = {'event': 'callback.verified', 'data': data}
+            event, _ = record_event(provider, ref, payload['event'], payload, tenant=invoice.tenant, invoice=invoice)
+            process_payment_event(event.pk)
+            invoice.refresh_from_db()
+        if invoice.status != Invoice.Status.PAID:
+            messages.error(request, "Payment verification failed.")
+            return redirect('home')
 
-    pdf.ln(10)
-    
-    # --- Line Items ---
-    pdf.set_y(max(pdf.get_y(), col_y + 35))
-    
-    pdf.set_fill_color(240, 240, 240)
-    pdf.set_text_color(30, 41, 59)
-    pdf.set_font("Arial", 'B', 9)
-    
-    w_desc = 98
-    w_total = 30
-    
-    pdf.cell(w_desc, 8, txt="  Description", border="B", fill=True)
-    pdf.cell(w_total, 8, txt="Total  ", border="B", fill=True, align="R", ln=1)
-    
-    pdf.set_font("Arial", '', 9)
-    
-    desc = "Service Charge"
+    # Redirect to whatever the invoice paid for
+    redirect_url = 'home'
+    redirect_pk = None
     if invoice.orders.exists():
-        desc = f"Room Service Order #{invoice.orders.first().order_id or invoice.orders.first().id}"
+        redirect_url = 'my_orders'
     elif invoice.booking:
-        desc = f"Hotel Booking: {invoice.booking.room.room_type.name}"
+        booking = invoice.booking
+        # Check if Staff or Public
+        if request.user.is_staff:
+            redirect_url = 'booking_detail'
+            redirect_pk = booking.pk
+        else:
+            # Public Success Page
+            return render(request, 'booking/booking_success.html', {
+                'booking': booking, 
+                'site_settings': TenantSetting.objects.filter(tenant=invoice.tenant).first()
+            })
     elif invoice.event_booking:
-        desc = f"Event Booking: {invoice.event_booking.event_name}"
+        redirect_url = 'event_booking_detail'
+        redirect_pk = invoice.event_booking.pk
     elif invoice.gym_membership:
-        desc = f"Gym Membership: {invoice.gym_membership.plan.name}"
-        
-    pdf.cell(w_desc, 8, txt=f"  {desc}", border="B")
-    pdf.cell(w_total, 8, txt=f"{currency_symbol}{invoice.amount}  ", border="B", align="R", ln=1)
-    
-    # Totals
-    pdf.ln(5)
-    pdf.set_font("Arial", 'B', 11)
-    pdf.cell(w_desc, 8, txt="TOTAL", align="R")
-    pdf.cell(w_total, 8, txt=f"{currency_symbol}{invoice.amount}  ", align="R", border="T")
-    
-    # Output
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_pdf:
-        tmp_pdf_path = tmp_pdf.name
+        redirect_url = 'gym_membership_list'
+
+    messages.success(request, "Payment successful!")
+    if redirect_pk:
+        return redirect(redirect_url, pk=redirect_pk)
+    return redirect(redirect_url)
+
+@csrf_exempt
+def payment_webhook(request, gateway):
+    """
+    Paystack/Flutterwave webhook. Checks the signature, records the event in
+    the inbox and answers 200 straight away; the payment is applied in the
+    background.
+    """
+    if request.method != 'POST':
+        return HttpResponse(status=405)
+    provider = gateway.upper()
+    if provider not in PaymentGateway.Provider.values:
+        return HttpResponse(status=404)
 
     try:
-        pdf.output(name=tmp_pdf_path, dest='F')
-        with open(tmp_pdf_path, 'rb') as f:
-            pdf_content = f.read()
-        response = HttpResponse(pdf_content, content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="Receipt_{invoice.id}.pdf"'
-    finally:
-        if os.path.exists(tmp_pdf_path):
-            os.unlink(tmp_pdf_path)
-            
-    return response
+        payload = json.loads(request.body)
+    except ValueError:
+        return HttpResponse(status=400)
+    if not isinstance(payload, dict):
+        return HttpResponse(status=400)
+
+    event_type, reference, _, _, _ = parse_event(provider, payload)
+    if not reference:
+        return HttpResponse(status=400)
+
+    invoice = invoice_for_reference(reference)
+    tenant = getattr(request, 'tenant', None)
+    if invoice and tenant and invoice.tenant_id != tenant.pk:
+        invoice = None
+    if invoice:
+        tenant = invoice.tenant
+
+    gateway_obj = PaymentGateway.objects.filter(tenant=tenant, name=provider).first()
+    if not gateway_obj or not verify_signature(gateway_obj, request.body, request.headers):
+        return HttpResponse(status=401)
+
+    event, created = record_event(provider, reference, event_type, payload, tenant=tenant, invoice=invoice)
+    if event.status in [PaymentEvent.Status.RECEIVED, PaymentEvent.Status.FAILED]:
+        run_in_background(process_payment_event, event.pk)
+    return HttpResponse(status=200)
+
+@login_required
+def download_receipt(request, pk):
+    invoice = get_object_or_404(
+        Invoice.objects.select_related('tenant', 'booking__user', 'event_booking__user', 'gym_membership__user'), pk=pk
+    )
+    
+    # Permission check: Owner or Staff
+    if not request.user.is_staff and invoice.guest_id != request.user.pk:
+         messages.error(request, "You do not have permission to download this receipt.")
+         return redirect('home')
+
+    # Rendered once per invoice state and branding, then served from storage
+    name = get_invoice_receipt(invoice)
+    return FileResponse(default_storage.open(name, 'rb'), as_attachment=True, filename=f"Receipt_{invoice.id}.pdf", content_type='application/pdf')
 
 @user_passes_test(is_admin)
 def payment_settings(request):
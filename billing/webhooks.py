@@ -0,0 +1,161 @@
+"""
+Paystack/Flutterwave payment webhooks.
+
+The webhook view only checks the signature and records the notification in the
+PaymentEvent inbox, whose unique (gateway, reference) key absorbs the gateways'
+redeliveries; process_payment_event then applies it in the background, once.
+`manage.py process_payment_events` retries failed and stranded events.
+
+Signatures:
+  Paystack:    x-paystack-signature = HMAC-SHA512 of the raw body, keyed with the secret key
+  Flutterwave: verif-hash = the secret hash set on the Flutterwave dashboard
+"""
+import hashlib
+import hmac
+import re
+from decimal import Decimal, InvalidOperation
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .models import Invoice, Payment, PaymentEvent, PaymentGateway
+from .payments import apply_invoice_payment
+
+# payment_selection builds references as HMS-INV-<invoice id>-<timestamp>
+INVOICE_REFERENCE_RE = re.compile(r'^HMS-INV-(\d+)-')
+
+# payment_selection charges hotel invoices in this currency
+HOTEL_CURRENCY = 'NGN'
+
+SUCCESS_STATUSES = {'success', 'successful'}
+
+
+def paystack_signature(secret_key, body):
+    return hmac.new(secret_key.encode(), body, hashlib.sha512).hexdigest()
+
+
+def verify_signature(gateway, body, headers):
+    if gateway.name == PaymentGateway.Provider.FLUTTERWAVE:
+        expected = gateway.webhook_secret
+        received = headers.get('verif-hash', '')
+    else:
+        expected = paystack_signature(gateway.secret_key, body)
+        received = headers.get('x-paystack-signature', '')
+    return bool(expected and received) and hmac.compare_digest(expected, received)
+
+
+def parse_event(provider, payload):
+    """
+    (event type, reference, successful, amount in major units, currency) from
+    a webhook payload.
+    """
+    data = payload.get('data') or {}
+    if provider == PaymentGateway.Provider.FLUTTERWAVE:
+        reference = data.get('tx_ref', '')
+        amount = data.get('amount')
+    else:
+        reference = data.get('reference', '')
+        # Paystack amounts are in kobo/cents
+        amount = Decimal(str(data['amount'])) / 100 if data.get('amount') is not None else None
+    try:
+        amount = Decimal(str(amount)) if amount is not None else None
+    except InvalidOperation:
+        amount = None
+    currency = str(data.get('currency') or '').upper()
+    return payload.get('event', ''), str(reference), data.get('status') in SUCCESS_STATUSES, amount, currency
+
+
+def invoice_id_for_reference(reference):
+    match = INVOICE_REFERENCE_RE.match(reference)
+    return int(match.group(1)) if match else None
+
+
+def invoice_for_reference(reference):
+    invoice_id = invoice_id_for_reference(reference)
+    if invoice_id is None:
+        return None
+    return Invoice.objects.filter(pk=invoice_id).select_related('tenant').first()
+
+
+def invoice_currency(invoice):
+    if invoice.invoice_type == Invoice.Type.SUBSCRIPTION and invoice.tenant and invoice.tenant.plan:
+        return invoice.tenant.plan.currency
+    return HOTEL_CURRENCY
+
+
+def record_event(provider, reference, event_type, payload, tenant=None, invoice=None):
+    """
+    Stores the notification in the inbox. Returns (event, created); a repeat
+    delivery of the same reference returns the existing event. An ignored event
+    (say, a failed attempt) is reopened by a delivery with a different payload,
+    so a later successful charge under the same reference is still applied.
+    """
+    try:
+        with transaction.atomic():
+            event = PaymentEvent.objects.create(
+                gateway=provider,
+                reference=reference,
+                event_type=event_type,
+                payload=payload,
+                tenant=tenant,
+                invoice=invoice,
+            )
+        return event, True
+    except IntegrityError:
+        event = PaymentEvent.objects.get(gateway=provider, reference=reference)
+    if event.status == PaymentEvent.Status.IGNORED and event.payload != payload:
+        reopened = PaymentEvent.objects.filter(pk=event.pk, status=PaymentEvent.Status.IGNORED).update(
+            status=PaymentEvent.Status.RECEIVED, event_type=event_type, payload=payload, error='', processed_at=None,
+        )
+        if reopened:
+            event.refresh_from_db()
+            return event, True
+    return event, False
+
+
+def apply_event(event):
+    """
+    Returns the (status, error) the event ends up in. The payment is applied
+    only if it is for this invoice's reference, covers the invoice in its
+    currency and its reference isn't already on a Payment.
+    """
+    _, reference, successful, amount, currency = parse_event(event.gateway, event.payload)
+    invoice = event.invoice
+    if not successful:
+        return PaymentEvent.Status.IGNORED, "Gateway reported the payment as unsuccessful."
+    if invoice is None:
+        return PaymentEvent.Status.IGNORED, "No invoice matches this reference."
+    if reference != event.reference or invoice_id_for_reference(reference) != invoice.pk:
+        return PaymentEvent.Status.IGNORED, f"Reference {reference} is not for invoice #{invoice.pk}."
+    if amount is None or amount < invoice.amount:
+        return PaymentEvent.Status.IGNORED, f"Paid {amount}, invoice is {invoice.amount}."
+    if currency != invoice_currency(invoice):
+        return PaymentEvent.Status.IGNORED, f"Paid in {currency or 'an unknown currency'}, invoice is in {invoice_currency(invoice)}."
+    if Payment.objects.filter(payment_method=event.gateway, transaction_id=reference).exists():
+        return PaymentEvent.Status.IGNORED, "A payment with this reference is already recorded."
+    apply_invoice_payment(event.invoice_id, event.gateway, event.reference)
+    return PaymentEvent.Status.PROCESSED, ''
+
+
+def process_payment_event(event_id):
+    """
+    Applies a received (or previously failed) event. The event row is locked
+    while it is applied, so concurrent workers can't apply it twice.
+    Returns the event's new status, or None if there was nothing to do.
+    """
+    with transaction.atomic():
+        event = PaymentEvent.objects.select_for_update(of=('self',)).select_related('invoice__tenant__plan').filter(
+            pk=event_id, status__in=[PaymentEvent.Status.RECEIVED, PaymentEvent.Status.FAILED]
+        ).first()
+        if event is None:
+            return None
+
+        event.attempts += 1
+        try:
+            with transaction.atomic():
+                event.status, event.error = apply_event(event)
+        except Exception as e:
+            print(f"Error processing payment event {event.gateway} {event.reference}: {e}")
+            event.status, event.error = PaymentEvent.Status.FAILED, str(e)
+        if event.status != PaymentEvent.Status.FAILED:
+            event.processed_at = timezone.now()
+        event.save(update_fields=['status', 'error', 'attempts', 'processed_at'])
+    return event.status
@@ -0,0 +1,43 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from booking.models import Booking
+from core.qr import CONTENT_TYPES, pregenerate_qr_codes
+from tenants.models import Tenant
+from tenants.utils import tenant_base_url
+
+
+class Command(BaseCommand):
+    help = 'Renders entry pass QR codes for confirmed and current bookings ahead of time'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', help='Tenant slug (default: all active tenants)')
+        parser.add_argument('--formats', default='svg,png', help='Comma separated formats (default: svg,png)')
+
+    def handle(self, *args, **options):
+        formats = [fmt.strip() for fmt in options['formats'].split(',') if fmt.strip()]
+        unknown = set(formats) - set(CONTENT_TYPES)
+        if unknown:
+            raise CommandError(f"Unknown formats: {', '.join(sorted(unknown))}")
+
+        tenants = Tenant.objects.filter(is_active=True)
+        if options['tenant']:
+            tenants = Tenant.objects.filter(slug=options['tenant'])
+            if not tenants.exists():
+                raise CommandError(f"Tenant '{options['tenant']}' not found")
+
+        started = time.perf_counter()
+        total = 0
+        for tenant in tenants:
+            base_url = tenant_base_url(tenant)
+            bookings = Booking.objects.filter(
+                tenant=tenant,
+                status__in=[Booking.Status.CONFIRMED, Booking.Status.CHECKED_IN],
+                check_out_date__gte=timezone.now(),
+            ).select_related('tenant').order_by('check_in_date')
+            payloads = (f"{base_url}{booking.verification_path}" for booking in bookings.iterator())
+            rendered = pregenerate_qr_codes(payloads, formats=formats)
+            total += rendered
+            self.stdout.write(f"{tenant.name}: {rendered} QR codes rendered ({base_url})")
+
+        self.stdout.write(self.style.SUCCESS(f"Rendered {total} QR codes in {time.perf_counter() - started:.1f}s."))
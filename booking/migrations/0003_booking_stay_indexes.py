@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:37
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("booking", "0002_booking_booking_reference_booking_sequence_number"),
+        ("hotel", "0002_alter_roomtype_amenities_alter_roomtype_description"),
+        ("tenants", "0005_subscriptionnotice"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["tenant", "check_out_date"], name="booking_tenant_checkout_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["tenant", "check_in_date"], name="booking_tenant_checkin_idx"
+            ),
+        ),
+    ]
@@ -30,11 +30,24 @@ class Booking(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Range lookups for occupancy over a window
+            models.Index(fields=['tenant', 'check_out_date'], name='booking_tenant_checkout_idx'),
+            models.Index(fields=['tenant', 'check_in_date'], name='booking_tenant_checkin_idx'),
+        ]
+
     @property
     def duration_days(self):
         days = (self.check_out_date - self.check_in_date).days
         return days if days > 0 else 1
 
+    @property
+    def verification_path(self):
+        """The verify page for this booking; entry pass QR codes encode its absolute URL."""
+        from django.urls import reverse
+        return f"{reverse('verify_booking')}?code={self.booking_id}"
+
     @property
     def booking_id(self):
         """
@@ -3,17 +3,18 @@ from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.utils import timezone
 from django.db.models import Q
-from django.http import HttpResponse, JsonResponse
+from django.http import HttpResponse, JsonResponse, FileResponse
+from django.core.files.storage import default_storage
 from django.urls import reverse
 from django.conf import settings
 from .models import Booking
 from .forms import BookingForm, AdminBookingForm
 from hotel.models import Room, RoomType
-from core.models import TenantSetting, Notification
+from core.models import Notification
 from billing.models import Invoice, Payment
-import qrcode
-import io
-from fpdf import FPDF
+from billing.receipts import get_booking_receipt
+from core.qr import CONTENT_TYPES as QR_CONTENT_TYPES, get_qr
+import base64
 import os
 import datetime
 
@@ -375,6 +376,12 @@ def check_out_booking(request, pk):
         # Notify Cleaners? (Handled by signals or manual check)
         
         messages.success(request, f"Checked out {booking.guest_name}. Room {room.room_number} marked for cleaning.")
+        # Settle the bill from the folio, for those who may see it
+        from billing.views import LEDGER_ROLES
+        from tenants.utils import has_tenant_permission
+        if request.tenant is not None and has_tenant_permission(request.user, request.tenant, LEDGER_ROLES):
+            return redirect('booking_folio', pk=pk)
+        return redirect('booking_detail', pk=pk)
     else:
         messages.error(request, "Booking is not currently CHECKED_IN.")
         
@@ -389,25 +396,14 @@ def download_barcode(request, pk):
          messages.error(request, "You do not have permission to download this barcode.")
          return redirect('home')
 
+    fmt = 'svg' if request.GET.get('format') == 'svg' else 'png'
     try:
-        # Generate Verification URL
-        verification_url = request.build_absolute_uri(reverse('verify_booking')) + f"?code={booking.booking_id}"
-        
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(verification_url)
-        qr.make(fit=True)
-
-        img = qr.make_image(fill_color="black", back_color="white")
-        buffer = io.BytesIO()
-        img.save(buffer, format="PNG")
-
-        response = HttpResponse(buffer.getvalue(), content_type='image/png')
-        response['Content-Disposition'] = f'attachment; filename="qrcode_{booking.booking_id}.png"'
+        # Verification URL, rendered once per payload by the QR service
+        verification_url = request.build_absolute_uri(booking.verification_path)
+        content = get_qr(verification_url, fmt)
+
+        response = HttpResponse(content, content_type=QR_CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = f'attachment; filename="qrcode_{booking.booking_id}.{fmt}"'
         return response
     except Exception as e:
         messages.error(request, f"Error generating QR code: {e}")
@@ -415,82 +411,16 @@ def download_barcode(request, pk):
 
 @login_required
 def download_receipt(request, pk):
-    booking = get_object_or_404(Booking, pk=pk)
+    booking = get_object_or_404(Booking.objects.select_related('tenant', 'room__room_type'), pk=pk)
     
     # Permission check: Owner or Staff
     if not request.user.is_staff and booking.user != request.user:
          messages.error(request, "You do not have permission to download this receipt.")
          return redirect('home')
 
-    # Import TenantSetting to get theme
-    settings = None
-    if request.tenant:
-        settings = TenantSetting.objects.filter(tenant=request.tenant).first()
-    
-    # Fallback values
-    current_theme = settings.theme if settings else 'theme-default'
-    hotel_name = settings.hotel_name if settings else "Hotel Management System"
-    
-    # Currency Symbol Mapping
-    CURRENCY_SYMBOLS = {
-        'USD': '$', 'EUR': '€', 'GBP': '£', 'NGN': '₦', 
-        'JPY': '¥', 'CAD': '$', 'AUD': '$', 'INR': '₹', 'ZAR': 'R'
-    }
-    currency_symbol = '$'
-    if settings:
-        currency_symbol = CURRENCY_SYMBOLS.get(settings.currency, settings.currency)
-        if hasattr(settings, 'currency_symbol'): # In case it was added as property
-             currency_symbol = settings.currency_symbol
-
-    # Define Theme Colors (R, G, B)
-    THEME_COLORS = {
-        'theme-default': (19, 236, 109),
-        'theme-light': (19, 236, 109), 
-        'theme-blue': (59, 130, 246), # #3b82f6
-        'theme-luxury': (212, 175, 55), # #d4af37
-        'theme-forest': (74, 222, 128), # #4ade80
-        'theme-ocean': (6, 182, 212), # #06b6d4
-        'theme-sunset': (244, 114, 182), # #f472b6
-        'theme-royal': (167, 139, 250), # #a78bfa
-        'theme-minimal': (113, 113, 122), # #71717a
-    }
-
-    primary_color = THEME_COLORS.get(current_theme, (19, 236, 109))
-    
-    # Generate PDF (Standard Receipt Size - A5)
-    pdf = FPDF(orientation='P', unit='mm', format='A5')
-    pdf.set_auto_page_break(auto=False)
-    pdf.add_page()
-    
-    # Header
-    pdf.set_font("Arial", 'B', 16)
-    pdf.cell(0, 10, hotel_name, ln=True, align='C')
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, "Booking Receipt", ln=True, align='C')
-    pdf.ln(5)
-    
-    # Booking Info
-    pdf.set_font("Arial", '', 10)
-    pdf.cell(0, 8, f"Booking Ref: {booking.booking_id}", ln=True)
-    pdf.cell(0, 8, f"Guest: {booking.guest_name}", ln=True)
-    pdf.cell(0, 8, f"Room: {booking.room.room_number} ({booking.room.room_type.name})", ln=True)
-    pdf.cell(0, 8, f"Check-in: {booking.check_in_date.strftime('%Y-%m-%d %H:%M')}", ln=True)
-    pdf.cell(0, 8, f"Check-out: {booking.check_out_date.strftime('%Y-%m-%d %H:%M')}", ln=True)
-    pdf.ln(5)
-    
-    # Financials
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(0, 10, f"Total Paid: {currency_symbol}{booking.total_price:,.2f}", ln=True)
-    
-    # Output
-    buffer = io.BytesIO()
-    pdf_content = pdf.output(dest='S').encode('latin-1')
-    buffer.write(pdf_content)
-    buffer.seek(0)
-    
-    response = HttpResponse(buffer, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="receipt_{booking.booking_id}.pdf"'
-    return response
+    # Rendered once per booking state and branding, then served from storage
+    name = get_booking_receipt(booking)
+    return FileResponse(default_storage.open(name, 'rb'), as_attachment=True, filename=f"receipt_{booking.booking_id}.pdf", content_type='application/pdf')
 
 @login_required
 def view_barcode_pass(request, pk):
@@ -499,8 +429,14 @@ def view_barcode_pass(request, pk):
     if not request.user.is_staff and booking.user != request.user:
         messages.error(request, "Access denied.")
         return redirect('home')
-        
-    return render(request, 'booking/barcode_pass.html', {'booking': booking})
+
+    barcode_base64 = None
+    try:
+        barcode_base64 = base64.b64encode(get_qr(request.build_absolute_uri(booking.verification_path))).decode()
+    except Exception as e:
+        print(f"Error generating QR code for booking {booking.pk}: {e}")
+
+    return render(request, 'booking/entry_pass.html', {'booking': booking, 'barcode_base64': barcode_base64})
 
 @login_required
 def my_bookings(request):
@@ -585,24 +521,18 @@ def extend_booking(request, pk):
             booking.save()
             
             # Notify Staff
-            from core.models import Notification
+            from core.notifications import notify_many
             from django.contrib.auth import get_user_model
             User = get_user_model()
             
-            staff_roles = [User.Role.ADMIN, User.Role.MANAGER, User.Role.RECEPTIONIST]
-            staff_users = User.objects.filter(role__in=staff_roles)
-            if request.tenant:
-                 # Ideally filter by tenant membership
-                 pass
-            
-            for staff in staff_users:
-                Notification.objects.create(
-                    recipient=staff,
-                    title="Stay Extended",
-                    message=f"Booking #{booking.id} (Room {booking.room.room_number}) extended by {additional_days} days.",
-                    notification_type=Notification.Type.INFO,
-                    link=reverse('booking_detail', args=[booking.pk])
-                )
+            notify_many(
+                request.tenant or booking.tenant,
+                roles=[User.Role.ADMIN, User.Role.MANAGER, User.Role.RECEPTIONIST],
+                title="Stay Extended",
+                message=f"Booking #{booking.id} (Room {booking.room.room_number}) extended by {additional_days} days.",
+                notification_type=Notification.Type.INFO,
+                link=reverse('booking_detail', args=[booking.pk])
+            )
             
             messages.success(request, f"Stay extended successfully! Additional cost: {additional_cost}")
             return redirect('booking_detail', pk=pk)
@@ -0,0 +1,232 @@
+"""
+Buffered AuditLog writer.
+
+log_audit() and the auth signal handlers queue entries here instead of doing
+one INSERT each. The buffer is written with a single bulk_create when it
+reaches AUDIT_BUFFER_SIZE entries, AUDIT_FLUSH_INTERVAL seconds after the first
+queued entry and at process exit. AuditFlushMiddleware flushes at the end of a
+request only if the buffer is overdue, as a backstop for a timer that didn't run. If the write fails the entries are appended to AUDIT_SPOOL_PATH as JSON
+lines; replay_audit_spool() (run by the archive_audit_logs command) loads them back.
+"""
+import atexit
+import base64
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import AuditLog
+
+SPOOL_FIELDS = ('tenant_id', 'user_id', 'action', 'module', 'details', 'ip_address')
+
+
+def get_buffer_size():
+    return getattr(settings, 'AUDIT_BUFFER_SIZE', 50)
+
+
+def get_flush_interval():
+    return getattr(settings, 'AUDIT_FLUSH_INTERVAL', 5)
+
+
+def get_spool_path():
+    return getattr(settings, 'AUDIT_SPOOL_PATH', os.path.join(settings.BASE_DIR, 'audit_spool.jsonl'))
+
+
+def serialize_entry(entry):
+    data = {field: getattr(entry, field) for field in SPOOL_FIELDS}
+    data['id'] = entry.pk
+    data['timestamp'] = entry.timestamp.isoformat()
+    return data
+
+
+def deserialize_entry(data):
+    return AuditLog(
+        timestamp=datetime.fromisoformat(data['timestamp']),
+        **{field: data.get(field) for field in SPOOL_FIELDS}
+    )
+
+
+class AuditBuffer:
+    def __init__(self):
+        self._entries = []
+        self._lock = threading.Lock()
+        self._timer = None
+        self._first_queued_at = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    def is_due(self):
+        """True if entries have waited longer than AUDIT_FLUSH_INTERVAL."""
+        first = self._first_queued_at
+        return first is not None and time.monotonic() - first >= get_flush_interval()
+
+    def add(self, entry):
+        with self._lock:
+            if not self._entries:
+                self._first_queued_at = time.monotonic()
+            self._entries.append(entry)
+            full = len(self._entries) >= get_buffer_size()
+            if not full and self._timer is None:
+                self._timer = threading.Timer(get_flush_interval(), self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            # Timer threads get their own DB connection
+            connection.close()
+
+    def flush(self):
+        """
+        Writes all queued entries with one bulk_create. Returns the number written.
+        """
+        with self._lock:
+            entries, self._entries = self._entries, []
+            self._first_queued_at = None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not entries:
+            return 0
+
+        try:
+            AuditLog.objects.bulk_create(entries)
+            return len(entries)
+        except Exception as e:
+            print(f"Audit log flush failed, spooling {len(entries)} entries: {e}")
+            spool_entries(entries)
+            return 0
+
+
+def spool_entries(entries):
+    path = get_spool_path()
+    try:
+        with open(path, 'a', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(serialize_entry(entry)) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+    except OSError as e:
+        print(f"Failed to spool audit entries to {path}: {e}")
+
+
+def replay_spool_file(path):
+    with open(path, encoding='utf-8') as f:
+        entries = [deserialize_entry(json.loads(line)) for line in f if line.strip()]
+    # All or nothing, so a failed replay can simply be run again
+    with transaction.atomic():
+        AuditLog.objects.bulk_create(entries, batch_size=500)
+    os.remove(path)
+    return len(entries)
+
+
+def replay_audit_spool():
+    """
+    Loads spooled entries back into the AuditLog table and removes the spool.
+    Returns the number of entries restored.
+    """
+    path = get_spool_path()
+    replaying = f"{path}.replaying"
+    restored = 0
+
+    # Left behind by a replay that failed; load it before it could be overwritten
+    if os.path.exists(replaying):
+        restored += replay_spool_file(replaying)
+
+    if os.path.exists(path):
+        # Move the spool aside first so entries spooled meanwhile aren't lost
+        os.replace(path, replaying)
+        restored += replay_spool_file(replaying)
+    return restored
+
+
+audit_buffer = AuditBuffer()
+atexit.register(audit_buffer.flush)
+
+
+def queue_audit(tenant=None, user=None, action=AuditLog.Action.OTHER, module='', details='', ip_address=None):
+    """
+    Queues an AuditLog entry for the next flush. The timestamp is taken now, not at flush time.
+    """
+    audit_buffer.add(AuditLog(
+        tenant=tenant,
+        user=user,
+        action=action,
+        module=module,
+        details=details,
+        ip_address=ip_address,
+        timestamp=timezone.now(),
+    ))
+
+
+class AuditFlushMiddleware:
+    """
+    Flushes queued audit entries once the response is ready, if they are
+    overdue. Flushing on every request would defeat the batching.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if audit_buffer.is_due():
+            audit_buffer.flush()
+        return response
+
+
+# --- Keyset pagination ---
+
+def encode_cursor(entry):
+    raw = f"{entry.timestamp.isoformat()}|{entry.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        timestamp, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(timestamp), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def audit_page(queryset, cursor=None, page_size=50):
+    """
+    Returns (entries, next_cursor) for the page after `cursor`, newest first.
+    Seeks on (timestamp, id) instead of OFFSET, so deep pages cost the same as the first.
+    """
+    queryset = queryset.order_by('-timestamp', '-id')
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        timestamp, pk = position
+        queryset = queryset.filter(Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=pk))
+
+    entries = list(queryset[:page_size + 1])
+    next_cursor = encode_cursor(entries[page_size - 1]) if len(entries) > page_size else None
+    return entries[:page_size], next_cursor
+
+
+def filter_audit_logs(queryset, params):
+    """
+    Applies the audit browser's GET filters (module, action, user search) to a queryset.
+    """
+    module = params.get('module')
+    action = params.get('action')
+    search = params.get('q')
+    if module:
+        queryset = queryset.filter(module=module)
+    if action:
+        queryset = queryset.filter(action=action)
+    if search:
+        queryset = queryset.filter(
+            Q(user__email__icontains=search) | Q(user__username__icontains=search) | Q(details__icontains=search)
+        )
+    return queryset
@@ -56,13 +56,10 @@ def get_email_connection(tenant=None):
         print(f"Error creating email connection: {e}")
         return get_connection() # Fallback to default
 
-def send_tenant_email(subject, message, recipient_list, tenant=None, html_message=None, from_email=None, fail_silently=True):
+def get_sender_email(tenant=None):
     """
-    Sends an email using the appropriate connection.
+    Returns the From address for a tenant (custom SMTP plans) or the platform default.
     """
-    connection = get_email_connection(tenant)
-    
-    # Determine Sender
     sender = settings.DEFAULT_FROM_EMAIL
     
     # Global Default
@@ -81,9 +78,15 @@ def send_tenant_email(subject, message, recipient_list, tenant=None, html_messag
                 sender = tenant_settings.default_from_email
         except TenantSetting.DoesNotExist:
             pass
-            
-    if from_email:
-        sender = from_email
+
+    return sender
+
+def send_tenant_email(subject, message, recipient_list, tenant=None, html_message=None, from_email=None, fail_silently=True):
+    """
+    Sends an email using the appropriate connection.
+    """
+    connection = get_email_connection(tenant)
+    sender = from_email or get_sender_email(tenant)
 
     email = EmailMessage(
         subject,
@@ -104,6 +107,59 @@ def send_tenant_email(subject, message, recipient_list, tenant=None, html_messag
             raise e
         return 0
 
+def send_tenant_mass_email(datatuple, tenant=None, fail_silently=True):
+    """
+    Sends several emails over a single SMTP connection.
+    datatuple is an iterable of (subject, message, recipient_list) or
+    (subject, message, recipient_list, html_message).
+    Returns the number of emails sent.
+    """
+    return sum(send_tenant_emails(datatuple, tenant=tenant, fail_silently=fail_silently))
+
+def send_tenant_emails(datatuple, tenant=None, fail_silently=True):
+    """
+    Like send_tenant_mass_email(), but returns one True/False per datatuple
+    item saying whether that email went out, so callers can retry the rest.
+    """
+    connection = get_email_connection(tenant)
+    sender = get_sender_email(tenant)
+
+    emails = []
+    for item in datatuple:
+        subject, message, recipient_list = item[:3]
+        html_message = item[3] if len(item) > 3 else None
+        email = EmailMessage(subject, message, sender, recipient_list, connection=connection)
+        if html_message:
+            email.content_subtype = "html"
+            email.body = html_message
+        emails.append(email)
+
+    if not emails:
+        return []
+
+    delivered = []
+    try:
+        # Opened once; send_messages() leaves an already open connection open
+        connection.open()
+        for email in emails:
+            try:
+                delivered.append(bool(connection.send_messages([email])))
+            except Exception as e:
+                print(f"Error sending email to {email.to}: {e}")
+                if not fail_silently:
+                    raise e
+                delivered.append(False)
+    except Exception as e:
+        if not fail_silently:
+            raise e
+        print(f"Error sending emails: {e}")
+    finally:
+        try:
+            connection.close()
+        except Exception:
+            pass
+    return delivered + [False] * (len(emails) - len(delivered))
+
 def send_branded_email(subject, template_name, context, recipient_list, tenant=None, from_email=None, fail_silently=True):
     """
     Sends a branded HTML email.
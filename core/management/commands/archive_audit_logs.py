@@ -0,0 +1,54 @@
+import gzip
+import json
+import os
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from core.models import AuditLog
+from core.audit import replay_audit_spool
+
+
+class Command(BaseCommand):
+    help = 'Moves audit log entries older than the retention period into gzipped JSON-lines archives'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=getattr(settings, 'AUDIT_RETENTION_DAYS', 365),
+                            help='Keep entries newer than this many days')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--dry-run', action='store_true', help='Count what would be archived without writing')
+
+    def handle(self, *args, **options):
+        restored = replay_audit_spool()
+        if restored:
+            self.stdout.write(f"Restored {restored} spooled audit entries.")
+
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        old_logs = AuditLog.objects.filter(timestamp__lt=cutoff)
+        total = old_logs.count()
+
+        if options['dry_run'] or not total:
+            self.stdout.write(self.style.SUCCESS(f"{total} audit entries older than {cutoff:%Y-%m-%d} to archive."))
+            return
+
+        archive_dir = getattr(settings, 'AUDIT_ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'archives', 'audit'))
+        os.makedirs(archive_dir, exist_ok=True)
+        path = os.path.join(archive_dir, f"audit-before-{cutoff:%Y%m%d}-{timezone.now():%Y%m%d%H%M%S}.jsonl.gz")
+
+        # Write the whole archive before deleting anything, so a crash never loses rows
+        archived_ids = []
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            rows = old_logs.order_by('id').values(
+                'id', 'tenant_id', 'user_id', 'action', 'module', 'details', 'ip_address', 'timestamp'
+            ).iterator(chunk_size=options['batch_size'])
+            for row in rows:
+                f.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+                archived_ids.append(row['id'])
+
+        batch_size = options['batch_size']
+        deleted = 0
+        for i in range(0, len(archived_ids), batch_size):
+            deleted += AuditLog.objects.filter(id__in=archived_ids[i:i + batch_size]).delete()[0]
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {len(archived_ids)} audit entries to {path} ({deleted} deleted)."))
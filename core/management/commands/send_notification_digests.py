@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from core.notifications import send_notification_digests
+
+class Command(BaseCommand):
+    help = 'Email batched/daily notification digests (run every few minutes via cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Send all pending digests regardless of each user\'s interval')
+
+    def handle(self, *args, **options):
+        digests, included = send_notification_digests(force=options['force'])
+        self.stdout.write(self.style.SUCCESS(f"Sent {digests} digest emails covering {included} notifications."))
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:18
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_existing_emailed(apps, schema_editor):
+    # Existing notifications were already emailed on creation; keep them out of digests
+    Notification = apps.get_model("core", "Notification")
+    Notification.objects.filter(emailed_at__isnull=True).update(emailed_at=F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0011_tenantsetting_custom_card_background_color_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="emailed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(mark_existing_emailed, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:25
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0012_notification_emailed_at"),
+        ("tenants", "0005_subscriptionnotice"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="auditlog",
+            name="timestamp",
+            field=models.DateTimeField(
+                db_index=True, default=django.utils.timezone.now
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="auditlog",
+            index=models.Index(
+                fields=["tenant", "timestamp"], name="auditlog_tenant_time_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="auditlog",
+            index=models.Index(
+                fields=["tenant", "module", "action"], name="auditlog_tenant_module_idx"
+            ),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from accounts.models import User
 
 class AuditLog(models.Model):
@@ -17,7 +18,13 @@ class AuditLog(models.Model):
     module = models.CharField(max_length=50, help_text="Module/App name (e.g. Booking, Billing)")
     details = models.TextField(help_text="Description of the action")
     ip_address = models.GenericIPAddressField(null=True, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True) # Set when queued, not when the buffer is flushed
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['tenant', 'timestamp'], name='auditlog_tenant_time_idx'),
+            models.Index(fields=['tenant', 'module', 'action'], name='auditlog_tenant_module_idx'),
+        ]
 
     def __str__(self):
         return f"[{self.timestamp}] {self.user} - {self.action} ({self.module})"
@@ -39,6 +46,7 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     link = models.CharField(max_length=255, blank=True, null=True) # Optional link to resource
+    emailed_at = models.DateTimeField(null=True, blank=True) # Null until emailed (immediately or in a digest)
 
     def __str__(self):
         return f"{self.title} - {self.recipient}"
@@ -0,0 +1,199 @@
+from itertools import groupby
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.dispatch import Signal
+from .models import Notification
+from .tasks import run_in_background
+
+# Sent after notify_many() bulk-inserts rows. bulk_create() skips post_save,
+# so anything that used to hook Notification post_save should listen here too.
+# Receivers get: notifications (list of saved Notification instances), tenant.
+notifications_created = Signal()
+
+
+def resolve_recipients(tenant, roles=None, users=None, exclude=None):
+    """
+    Returns the users to notify with a single query: members of the tenant
+    whose role is in `roles`, plus any explicitly passed `users`. Without a
+    tenant, `roles` matches nobody; it never fans out across hotels.
+    """
+    from accounts.models import User
+
+    condition = Q()
+    if roles and tenant:
+        condition |= Q(role__in=roles, memberships__tenant=tenant, memberships__is_active=True)
+    if users:
+        condition |= Q(pk__in=[u.pk if hasattr(u, 'pk') else u for u in users])
+
+    if not condition:
+        return User.objects.none()
+
+    recipients = User.objects.filter(condition, is_active=True)
+    if exclude:
+        recipients = recipients.exclude(pk__in=[u.pk if hasattr(u, 'pk') else u for u in exclude])
+    return recipients.distinct()
+
+
+def notify_many(tenant, title, message, roles=None, users=None, exclude=None,
+                notification_type=Notification.Type.INFO, link=None,
+                email_subject=None, email_message=None):
+    """
+    Creates one Notification per recipient with a single INSERT and queues
+    their emails as one batched background job.
+
+    Recipients are resolved from `roles` (scoped to the tenant's members)
+    and/or an explicit `users` list. `email_subject`/`email_message` override
+    the default "Notification: <title>" email for this fan-out.
+    Returns the list of created notifications.
+    """
+    recipients = list(resolve_recipients(tenant, roles=roles, users=users, exclude=exclude))
+    if not recipients:
+        return []
+
+    link = str(link) if link else None
+    notifications = Notification.objects.bulk_create([
+        Notification(
+            tenant=tenant,
+            recipient=recipient,
+            title=title,
+            message=message,
+            notification_type=notification_type,
+            link=link,
+        )
+        for recipient in recipients
+    ])
+
+    notifications_created.send(
+        sender=Notification,
+        notifications=notifications,
+        tenant=tenant,
+        email_subject=email_subject,
+        email_message=email_message,
+    )
+    return notifications
+
+
+def build_notification_email(notification, subject=None, message=None):
+    """
+    Returns the (subject, message, recipient_list) tuple for a notification email.
+    """
+    site_url = settings.SITE_URL if hasattr(settings, 'SITE_URL') else ''
+    return (
+        subject or f"Notification: {notification.title}",
+        f"{message or notification.message}\n\nLink: {site_url}{notification.link or ''}",
+        [notification.recipient.email],
+    )
+
+
+def send_notification_emails(notifications, tenant=None, subject=None, message=None):
+    """
+    Sends the emails for a batch of notifications over one SMTP connection.
+    Recipients on batched/daily delivery are skipped; send_notification_digests() picks them up.
+    """
+    from .email_utils import send_tenant_emails
+
+    immediate = [
+        n for n in notifications
+        if n.recipient and n.recipient.email and n.recipient.wants_immediate_notification_emails
+    ]
+    datatuple = [build_notification_email(n, subject=subject, message=message) for n in immediate]
+    delivered = send_tenant_emails(datatuple, tenant=tenant, fail_silently=True)
+    # Only what went out is marked emailed
+    sent_ids = [n.pk for n, ok in zip(immediate, delivered) if ok]
+    if sent_ids:
+        Notification.objects.filter(pk__in=sent_ids).update(emailed_at=timezone.now())
+    return len(sent_ids)
+
+
+def queue_notification_emails(notifications, tenant=None, subject=None, message=None):
+    """
+    Schedules send_notification_emails() to run after the current transaction commits.
+    """
+    if notifications:
+        run_in_background(send_notification_emails, list(notifications), tenant=tenant, subject=subject, message=message)
+
+
+# --- Digests ---
+
+def get_pending_digest_notifications():
+    """
+    Notifications not yet emailed whose recipient is on batched or daily delivery,
+    ordered so they can be grouped by (recipient, tenant).
+    """
+    from accounts.models import User
+
+    return Notification.objects.filter(
+        emailed_at__isnull=True,
+        recipient__isnull=False,
+    ).exclude(
+        recipient__notification_delivery=User.NotificationDelivery.IMMEDIATE
+    ).select_related('recipient', 'tenant', 'tenant__plan').order_by('recipient_id', 'tenant_id', 'created_at')
+
+
+def build_notification_digests(notifications=None, force=False):
+    """
+    Groups pending notifications per recipient and tenant.
+    Returns a list of (recipient, tenant, [notifications]) for recipients whose
+    digest is due (or all of them when force=True).
+    """
+    if notifications is None:
+        notifications = get_pending_digest_notifications()
+
+    digests = []
+    for (recipient_id, tenant_id), group in groupby(notifications, key=lambda n: (n.recipient_id, n.tenant_id)):
+        group = list(group)
+        recipient = group[0].recipient
+        if force or recipient.notification_digest_due:
+            digests.append((recipient, group[0].tenant, group))
+    return digests
+
+
+def send_notification_digests(force=False):
+    """
+    Emails one branded digest per recipient and tenant, then marks the
+    notifications as emailed. A digest that fails to send is left pending and
+    retried on the next run. Returns (digests_sent, notifications_included).
+    """
+    from accounts.models import User
+    from .email_utils import send_branded_email
+
+    now = timezone.now()
+    site_url = settings.SITE_URL if hasattr(settings, 'SITE_URL') else ''
+    digests_sent = 0
+    included_ids = []
+    recipient_ids = set()
+
+    for recipient, tenant, notifications in build_notification_digests(force=force):
+        # Read in-app already; no need to email, but don't keep them pending
+        unread = [n for n in notifications if not n.is_read]
+
+        if unread and recipient.email:
+            try:
+                sent = send_branded_email(
+                    subject=f"You have {len(unread)} new notification{'s' if len(unread) != 1 else ''}",
+                    template_name='emails/notification_digest.html',
+                    context={
+                        'user': recipient,
+                        'notifications': unread,
+                        'site_url': site_url,
+                        'delivery': recipient.get_notification_delivery_display(),
+                    },
+                    recipient_list=[recipient.email],
+                    tenant=tenant,
+                )
+            except Exception as e:
+                print(f"Failed to send digest to {recipient.email}: {e}")
+                sent = 0
+            if not sent:
+                continue
+            digests_sent += 1
+
+        included_ids.extend(n.pk for n in notifications)
+        recipient_ids.add(recipient.pk)
+
+    if included_ids:
+        Notification.objects.filter(pk__in=included_ids).update(emailed_at=now)
+        User.objects.filter(pk__in=recipient_ids).update(notification_digest_sent_at=now)
+
+    return digests_sent, len(included_ids)
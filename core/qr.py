@@ -0,0 +1,90 @@
+"""
+QR code rendering service.
+
+A code is looked up in a per-process LRU first, then in media storage under
+qr/<aa>/<sha256>.<ext> (keyed by a hash of the payload and rendering options),
+and only rendered on a miss; the rendered file is stored for every other
+process. Identical payloads are therefore rendered once.
+
+SVG output needs no PIL and scales cleanly for print; PNG is kept for
+downloads that expect an image file.
+"""
+import hashlib
+from functools import lru_cache
+from io import BytesIO
+import qrcode
+import qrcode.image.svg
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+QR_CACHE_DIR = 'qr'
+CONTENT_TYPES = {'svg': 'image/svg+xml', 'png': 'image/png'}
+
+
+def qr_key(payload, fmt='svg', box_size=10, border=4):
+    return hashlib.sha256(f"{fmt}:{box_size}:{border}:{payload}".encode()).hexdigest()
+
+
+def qr_storage_name(payload, fmt='svg', box_size=10, border=4):
+    key = qr_key(payload, fmt, box_size, border)
+    return f"{QR_CACHE_DIR}/{key[:2]}/{key}.{fmt}"
+
+
+def render_qr(payload, fmt='svg', box_size=10, border=4):
+    if fmt not in CONTENT_TYPES:
+        raise ValueError(f"Unsupported QR format: {fmt}")
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=box_size,
+        border=border,
+    )
+    qr.add_data(payload)
+    qr.make(fit=True)
+
+    if fmt == 'svg':
+        return qr.make_image(image_factory=qrcode.image.svg.SvgPathImage).to_string()
+    img = qr.make_image(fill_color="black", back_color="white")
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def ensure_qr(payload, fmt='svg', box_size=10, border=4):
+    """
+    Storage name of the code for `payload`, rendering and storing it if needed.
+    Returns (name, content); content is None when the file already existed.
+    """
+    name = qr_storage_name(payload, fmt, box_size, border)
+    if default_storage.exists(name):
+        return name, None
+    content = render_qr(payload, fmt, box_size, border)
+    saved = default_storage.save(name, ContentFile(content))
+    if saved != name:
+        # Stored concurrently by another process
+        default_storage.delete(saved)
+    return name, content
+
+
+@lru_cache(maxsize=getattr(settings, 'QR_MEMORY_CACHE_SIZE', 512))
+def get_qr(payload, fmt='svg', box_size=10, border=4):
+    """The code for `payload` as bytes, from memory, disk, or freshly rendered."""
+    name, content = ensure_qr(payload, fmt, box_size, border)
+    if content is None:
+        with default_storage.open(name, 'rb') as f:
+            content = f.read()
+    return content
+
+
+def pregenerate_qr_codes(payloads, formats=('svg',)):
+    """
+    Renders and stores the codes not yet on disk. Returns the number rendered.
+    """
+    rendered = 0
+    for payload in payloads:
+        for fmt in formats:
+            _, content = ensure_qr(payload, fmt)
+            if content is not None:
+                rendered += 1
+    return rendered
@@ -1,15 +1,19 @@
+from django.db.models import F
 from django.db.models.signals import post_save
 from django.contrib.auth.signals import user_logged_in, user_logged_out
 from django.dispatch import receiver
 from core.email_utils import send_tenant_email
 from django.conf import settings
-from .models import Notification, AuditLog
+from django.utils import timezone
+from .models import Notification, AuditLog, TenantSetting
 from .utils import log_audit, get_client_ip
+from .audit import queue_audit
+from .notifications import notifications_created, queue_notification_emails
 
 @receiver(user_logged_in)
 def log_user_login(sender, request, user, **kwargs):
     tenant = getattr(request, 'tenant', None)
-    AuditLog.objects.create(
+    queue_audit(
         tenant=tenant,
         user=user,
         action=AuditLog.Action.LOGIN,
@@ -22,7 +26,7 @@ def log_user_login(sender, request, user, **kwargs):
 def log_user_logout(sender, request, user, **kwargs):
     if user:
         tenant = getattr(request, 'tenant', None)
-        AuditLog.objects.create(
+        queue_audit(
             tenant=tenant,
             user=user,
             action=AuditLog.Action.LOGOUT,
@@ -31,17 +35,34 @@ def log_user_logout(sender, request, user, **kwargs):
             ip_address=get_client_ip(request)
         )
 
+@receiver(post_save, sender=TenantSetting)
+def bump_branding_version(sender, instance, **kwargs):
+    # Cached receipt PDFs are keyed by it (billing.receipts)
+    if instance.tenant_id:
+        from tenants.models import Tenant
+        Tenant.objects.filter(pk=instance.tenant_id).update(branding_version=F('branding_version') + 1)
+
 @receiver(post_save, sender=Notification)
 def send_notification_email(sender, instance, created, **kwargs):
     if created and instance.recipient and instance.recipient.email:
+        # Batched/daily recipients get this in their next digest instead
+        if not instance.recipient.wants_immediate_notification_emails:
+            return
         try:
-            send_tenant_email(
+            sent = send_tenant_email(
                 subject=f"Notification: {instance.title}",
                 message=f"{instance.message}\n\nLink: {settings.SITE_URL if hasattr(settings, 'SITE_URL') else ''}{instance.link or ''}",
                 recipient_list=[instance.recipient.email],
                 tenant=instance.tenant,
                 fail_silently=True,
             )
-            print(f"Email sent to {instance.recipient.email}")
+            if sent:
+                Notification.objects.filter(pk=instance.pk).update(emailed_at=timezone.now())
+                print(f"Email sent to {instance.recipient.email}")
         except Exception as e:
             print(f"Failed to send email: {e}")
+
+@receiver(notifications_created)
+def send_bulk_notification_emails(sender, notifications, tenant=None, email_subject=None, email_message=None, **kwargs):
+    # notify_many() uses bulk_create, which doesn't fire post_save
+    queue_notification_emails(notifications, tenant=tenant, subject=email_subject, message=email_message)
@@ -0,0 +1,24 @@
+import threading
+from django.conf import settings
+from django.db import connection, transaction
+
+
+def run_in_background(func, *args, **kwargs):
+    """
+    Runs func(*args, **kwargs) in a daemon thread once the current transaction commits.
+    Set TASKS_ALWAYS_EAGER = True in settings to run inline (tests, management commands).
+    """
+    if getattr(settings, 'TASKS_ALWAYS_EAGER', False):
+        transaction.on_commit(lambda: func(*args, **kwargs))
+        return
+
+    def _target():
+        try:
+            func(*args, **kwargs)
+        except Exception as e:
+            print(f"Background task {getattr(func, '__name__', func)} failed: {e}")
+        finally:
+            # Each thread gets its own DB connection; don't leak it
+            connection.close()
+
+    transaction.on_commit(lambda: threading.Thread(target=_target, daemon=True).start())
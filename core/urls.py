@@ -17,6 +17,7 @@ urlpatterns = [
     path('api/notifications/<int:notification_id>/read/', views.mark_notification_read, name='mark_notification_read'),
     path('dashboard/messages/', views.contact_message_list, name='contact_message_list'),
     path('dashboard/messages/<int:message_id>/', views.contact_message_detail, name='contact_message_detail'),
+    path('dashboard/audit-logs/', views.audit_log_list, name='audit_log_list'),
     
     # Facilities Management
     path('dashboard/facilities/', views.HotelFacilityListView.as_view(), name='facility_list'),
@@ -1,4 +1,5 @@
 from .models import AuditLog
+from .audit import queue_audit
 
 def get_client_ip(request):
     x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
@@ -10,14 +11,14 @@ def get_client_ip(request):
 
 def log_audit(request, action, module, details):
     """
-    Creates an audit log entry.
+    Queues an audit log entry; it is written with the next buffered flush.
     """
     if not request.user.is_authenticated:
         return
 
     tenant = getattr(request, 'tenant', None)
     
-    AuditLog.objects.create(
+    queue_audit(
         tenant=tenant,
         user=request.user,
         action=action,
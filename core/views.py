@@ -173,7 +173,9 @@ def about_us(request):
     return render(request, 'core/about_us.html')
 
 from django.core.mail import send_mail
+from accounts.models import User
 from .models import TenantSetting, Notification, AuditLog, ContactMessage
+from .notifications import notify_many
 
 def contact_us(request):
     """Public Contact Us Page"""
@@ -193,11 +195,10 @@ def contact_us(request):
         )
         
         # Notify Admins/Managers via Dashboard Notification
-        # Find staff users for this tenant
-        staff_users = User.objects.filter(tenant=request.tenant, role__in=['admin', 'manager'])
-        for user in staff_users:
-            Notification.objects.create(
-                recipient=user,
+        if request.tenant:
+            notify_many(
+                request.tenant,
+                roles=[User.Role.ADMIN, User.Role.MANAGER],
                 title=f"New Inquiry: {subject}",
                 message=f"From: {name} ({email})\n\n{message_text[:100]}...",
                 notification_type=Notification.Type.INFO,
@@ -397,3 +398,30 @@ def settings_view(request):
         'tenant': request.tenant,
         'platform_domain': platform_domain
     })
+
+@login_required
+def audit_log_list(request):
+    """Browse the tenant's audit trail, newest first, with cursor (keyset) pagination"""
+    from .audit import audit_page, filter_audit_logs
+
+    if not request.user.can_manage_settings:
+        messages.error(request, "Permission denied.")
+        return redirect('dashboard')
+
+    if not request.tenant:
+        messages.error(request, "No tenant context.")
+        return redirect('dashboard')
+
+    logs = filter_audit_logs(AuditLog.objects.filter(tenant=request.tenant).select_related('user'), request.GET)
+    entries, next_cursor = audit_page(logs, cursor=request.GET.get('cursor'))
+
+    params = request.GET.copy()
+    params.pop('cursor', None)
+
+    return render(request, 'core/audit_log_list.html', {
+        'logs': entries,
+        'next_cursor': next_cursor,
+        'filter_query': params.urlencode(),
+        'modules': AuditLog.objects.filter(tenant=request.tenant).values_list('module', flat=True).distinct().order_by('module'),
+        'actions': AuditLog.Action.choices,
+    })
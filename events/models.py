@@ -36,9 +36,6 @@ class EventHallImage(models.Model):
     def __str__(self):
         return f"Image for {self.hall.name}"
 
-import qrcode
-from io import BytesIO
-from django.core.files import File
 
 class EventBooking(models.Model):
     STATUS_CHOICES = [
@@ -89,25 +86,11 @@ class EventBooking(models.Model):
                 # Flat fee
                 self.total_price = hall_price
 
-        # Generate QR Code if confirmed and not yet generated
+        # Point at the QR service's stored code once confirmed (rendered once per payload)
         if self.status == 'CONFIRMED' and not self.qr_code:
+            from core.qr import ensure_qr
             qr_data = f"EVENT-BOOKING-{self.id}-{self.user.username}"
-            qr = qrcode.QRCode(
-                version=1,
-                error_correction=qrcode.constants.ERROR_CORRECT_L,
-                box_size=10,
-                border=4,
-            )
-            qr.add_data(qr_data)
-            qr.make(fit=True)
-            img = qr.make_image(fill_color="black", back_color="white")
-            
-            buffer = BytesIO()
-            img.save(buffer, format='PNG')
-            
-            timestamp = self.created_at.timestamp() if self.created_at else timezone.now().timestamp()
-            file_name = f'event_qr_{self.user.username}_{timestamp}.png'
-            self.qr_code.save(file_name, File(buffer), save=False)
+            self.qr_code.name, _ = ensure_qr(qr_data, 'svg')
             
         super().save(*args, **kwargs)
 
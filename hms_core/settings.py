@@ -54,6 +54,7 @@ INSTALLED_APPS = [
     "events",
     "gym",
     "tenants",
+    "analytics",
 ]
 
 AUTH_USER_MODEL = "accounts.User"
@@ -69,6 +70,7 @@ MIDDLEWARE = [
     "tenants.middleware_subscription.SubscriptionMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.audit.AuditFlushMiddleware",
 ]
 
 ROOT_URLCONF = "hms_core.urls"
@@ -164,3 +166,55 @@ SERVER_EMAIL = 'spaxce@techohr.com.ng'
 
 # Site URL for Emails
 SITE_URL = 'http://127.0.0.1:8000'
+
+# Payment Gateway APIs (point at the local stand-in from `manage.py run_mock_gateway` for testing)
+PAYSTACK_API_BASE = os.environ.get('PAYSTACK_API_BASE', 'https://api.paystack.co')
+FLUTTERWAVE_API_BASE = os.environ.get('FLUTTERWAVE_API_BASE', 'https://api.flutterwave.com')
+
+# Gateway HTTP client (billing/gateway_client.py)
+GATEWAY_CONNECT_TIMEOUT = 3.05 # seconds
+GATEWAY_READ_TIMEOUT = 15
+GATEWAY_POOL_SIZE = 10 # keep-alive connections per provider and process
+GATEWAY_RETRIES = 2 # idempotent calls only
+GATEWAY_BACKOFF = 0.5 # seconds, doubled per retry with full jitter
+GATEWAY_BACKOFF_MAX = 5
+GATEWAY_BREAKER_THRESHOLD = 5 # consecutive transient failures that open the circuit
+GATEWAY_BREAKER_RESET = 30 # seconds before a trial call is let through
+
+# Audit Log buffering (see core/audit.py)
+AUDIT_BUFFER_SIZE = 50
+AUDIT_FLUSH_INTERVAL = 5 # seconds
+AUDIT_SPOOL_PATH = BASE_DIR / "audit_spool.jsonl"
+AUDIT_ARCHIVE_DIR = BASE_DIR / "archives" / "audit"
+AUDIT_RETENTION_DAYS = 365
+
+# Caches. Statistics are cached in their own alias; set STATS_CACHE_BACKEND=file
+# to share them between worker processes (see analytics/cache.py)
+STATS_CACHE_TIMEOUT = 60 * 60 # seconds
+# Statistics PDFs whose tables cover more daily fact rows than this are rendered in the
+# background. Needs a shared stats cache (above); with local memory they render inline.
+STATISTICS_PDF_BACKGROUND_ROWS = 1000
+DASHBOARD_CACHE_TIMEOUT = 60 # seconds; booking, billing and room writes also invalidate it
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'stats': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'stats',
+    } if os.environ.get('STATS_CACHE_BACKEND') == 'file' else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'stats',
+    },
+}
+
+# Rows per chunk when loading bookings into the NumPy KPI engine (analytics/kpis.py)
+KPI_CHUNK_SIZE = 50000
+
+# On-the-books snapshots (analytics/pace.py)
+OTB_HORIZON_DAYS = 365 # future stay dates per snapshot
+OTB_KEEP_DAILY_DAYS = 90 # then weekly (Mondays)
+OTB_KEEP_WEEKLY_DAYS = 760 # then monthly (first Monday); keeps last year's pace comparison weekly
+
+# QR codes rendered per process before falling back to the media cache (core/qr.py)
+QR_MEMORY_CACHE_SIZE = 512
@@ -247,18 +247,18 @@ class RoomStatusUpdateView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
         # If status changed to AVAILABLE (Cleaned), notify Reception/Manager
         if room.status == Room.Status.AVAILABLE:
              from core.models import Notification
+             from core.notifications import notify_many
              from django.contrib.auth import get_user_model
              User = get_user_model()
              
-             receptionists = User.objects.filter(role__in=[User.Role.RECEPTIONIST, User.Role.MANAGER])
-             for recipient in receptionists:
-                 Notification.objects.create(
-                    recipient=recipient,
-                    title="Room Cleaned",
-                    message=f"Room {room.room_number} is now clean and available.",
-                    notification_type=Notification.Type.SUCCESS,
-                    link=reverse_lazy('staff_room_list')
-                 )
+             notify_many(
+                room.tenant,
+                roles=[User.Role.RECEPTIONIST, User.Role.MANAGER],
+                title="Room Cleaned",
+                message=f"Room {room.room_number} is now clean and available.",
+                notification_type=Notification.Type.SUCCESS,
+                link=reverse_lazy('staff_room_list')
+             )
         
         messages.success(self.request, f"Room {room.room_number} status updated to {room.get_status_display()}.")
         return response
@@ -8,6 +8,7 @@ from .forms import HousekeepingSettingsForm
 from booking.models import Booking
 from billing.models import Invoice
 from core.models import Notification, TenantSetting
+from core.notifications import notify_many
 from accounts.models import User
 from django.db.models import Q
 
@@ -201,6 +202,7 @@ def place_order(request):
                 invoice = Invoice.objects.create(
                     booking=active_booking, # Can be null
                     tenant=request.tenant, # Ensure invoice is scoped to tenant
+                    guest=request.user, # The orderer, not necessarily the booking's owner
                     amount=order.total_price,
                     status='PENDING',
                     invoice_type=Invoice.Type.SERVICE
@@ -378,39 +380,17 @@ def request_housekeeping(request):
             note=note
         )
 
-        # Notify Staff
-        staff_users = User.objects.filter(role__in=[User.Role.MANAGER, User.Role.RECEPTIONIST, User.Role.CLEANER])
-        if request.tenant:
-             # Filter staff by tenant membership?
-             # User model doesn't have tenant field directly, but we can assume role checks or use Membership
-             # Or rely on User.tenant field if implemented.
-             # Better: Use Membership
-             from tenants.models import Membership
-             staff_memberships = Membership.objects.filter(tenant=request.tenant, user__role__in=[User.Role.MANAGER, User.Role.RECEPTIONIST, User.Role.CLEANER])
-             staff_users = [m.user for m in staff_memberships]
-        
-        # Send Email
-        for staff in staff_users:
-            if staff.email:
-                try:
-                    send_tenant_email(
-                        subject=f"New Housekeeping Request: {room_num}",
-                        message=f"New housekeeping request for Room {room_num}.\n\nService: {service_type.name}\nNote: {note or 'N/A'}\n\nPlease attend to it.",
-                        recipient_list=[staff.email],
-                        tenant=request.tenant if hasattr(request, 'tenant') else None,
-                        fail_silently=True
-                    )
-                except Exception:
-                    pass
-
-        for staff in staff_users:
-            Notification.objects.create(
-                recipient=staff,
-                title="New Housekeeping Request",
-                message=f"{service_type.name} requested for Room {room_num}.",
-                notification_type=Notification.Type.WARNING,
-                link=reverse('staff_housekeeping_list')
-            )
+        # Notify Staff (one insert + one batched email job)
+        notify_many(
+            request.tenant or (active_booking.tenant if active_booking else None),
+            roles=[User.Role.MANAGER, User.Role.RECEPTIONIST, User.Role.CLEANER],
+            title="New Housekeeping Request",
+            message=f"{service_type.name} requested for Room {room_num}.",
+            notification_type=Notification.Type.WARNING,
+            link=reverse('staff_housekeeping_list'),
+            email_subject=f"New Housekeeping Request: {room_num}",
+            email_message=f"New housekeeping request for Room {room_num}.\n\nService: {service_type.name}\nNote: {note or 'N/A'}\n\nPlease attend to it."
+        )
 
         messages.success(request, "Housekeeping request sent successfully.")
         return redirect('my_requests')
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Tenant, Domain, Membership, Plan
+from .models import Tenant, Domain, Membership, Plan, SubscriptionNotice, PlatformMetricsSnapshot, PlanMetricsSnapshot
 
 @admin.register(Plan)
 class PlanAdmin(admin.ModelAdmin):
@@ -27,3 +27,19 @@ class MembershipAdmin(admin.ModelAdmin):
     list_display = ('user', 'tenant', 'role', 'date_joined', 'is_active')
     list_filter = ('tenant', 'role', 'is_active')
     search_fields = ('user__email', 'tenant__name')
+
+@admin.register(SubscriptionNotice)
+class SubscriptionNoticeAdmin(admin.ModelAdmin):
+    list_display = ('tenant', 'threshold_days', 'subscription_end_date', 'sent_at')
+    list_filter = ('threshold_days',)
+    search_fields = ('tenant__name',)
+
+class PlanMetricsSnapshotInline(admin.TabularInline):
+    model = PlanMetricsSnapshot
+    extra = 0
+
+@admin.register(PlatformMetricsSnapshot)
+class PlatformMetricsSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('date', 'active_tenants', 'paying_tenants', 'new_tenants', 'churned_tenants', 'bookings', 'subscription_revenue')
+    date_hierarchy = 'date'
+    inlines = [PlanMetricsSnapshotInline]
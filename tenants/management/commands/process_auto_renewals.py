@@ -1,40 +1,182 @@
+import hashlib
+import threading
+import time
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
 from django.core.management.base import BaseCommand
+from django.db import connection, transaction
 from django.utils import timezone
-from datetime import timedelta
 from tenants.models import Tenant
-from billing.models import Invoice, Payment
+from billing.models import Invoice, Payment, PaymentGateway
+from billing.gateway_client import gateway_metrics
+from billing.gateways import charge_authorization, GatewayError, TransientGatewayError
 from core.email_utils import send_branded_email
-import uuid
+
+RENEWED, DECLINED, FAILED, SKIPPED = 'renewed', 'declined', 'failed', 'skipped'
+
+
+def renewal_reference(tenant):
+    """
+    Idempotency key for one renewal attempt: the same tenant, billing period,
+    card and attempt always produce the same reference, so a concurrent or
+    re-run charge is rejected by the gateway instead of billing twice. A
+    recorded decline starts a new attempt, so the card can be charged again.
+    """
+    card = hashlib.sha1(tenant.payment_auth_code.encode()).hexdigest()[:8]
+    reference = f"RENEW-{tenant.pk}-{tenant.subscription_end_date:%Y%m%d}-{card}"
+    return f"{reference}-{tenant.renewal_attempts}" if tenant.renewal_attempts else reference
+
 
 class Command(BaseCommand):
     help = 'Process automatic renewals for expired subscriptions'
 
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Concurrent gateway charges')
+        parser.add_argument('--retries', type=int, default=3, help='Retries for transient gateway errors')
+        parser.add_argument('--backoff', type=float, help='Initial retry delay in seconds (default: GATEWAY_BACKOFF)')
+        parser.add_argument('--mock-gateway', action='store_true', help='Charge against the local stand-in gateway')
+
+    def handle(self, *args, **options):
+        self.retries = options['retries']
+        self.backoff = options['backoff']
+        self.api_base = None
+        self._sqlite_write_lock = threading.Lock()
+        mock_server = None
+
+        if options['mock_gateway']:
+            from billing.mock_gateway import start_mock_gateway
+            mock_server = start_mock_gateway()
+            self.api_base = mock_server.base_url
+            self.stdout.write(f"Using mock gateway at {mock_server.base_url}")
+
+        gateway = self.get_platform_gateway(mock=bool(mock_server))
+        if not gateway:
+            self.stdout.write(self.style.ERROR("No active platform payment gateway configured. Nothing charged."))
+            return
+
         now = timezone.now()
-        # Find tenants whose subscription has expired (or is about to expire today)
-        # and have auto-renew enabled
-        expired_tenants = Tenant.objects.filter(
+        # Find tenants whose subscription has expired and have auto-renew enabled
+        tenant_ids = list(Tenant.objects.filter(
             subscription_end_date__lte=now,
             auto_renew=True,
             is_active=True,
             plan__isnull=False
-        ).exclude(payment_auth_code__isnull=True).exclude(payment_auth_code='')
-
-        count = 0
-        for tenant in expired_tenants:
-            self.stdout.write(f"Processing renewal for {tenant.name}...")
-            
-            # Simulate Payment Processing with Auth Code
-            # In real life: call gateway.charge_authorization(tenant.payment_auth_code, amount)
-            success = True # Mock success
-            
-            if success:
-                # Calculate Amount
-                amount = tenant.plan.price
-                if tenant.billing_cycle == 'yearly':
-                    amount *= 12
-                
-                # Create Invoice
+        ).exclude(payment_auth_code__isnull=True).exclude(payment_auth_code='').values_list('pk', flat=True))
+
+        counts = {RENEWED: 0, DECLINED: 0, FAILED: 0, SKIPPED: 0}
+        started = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as executor:
+            futures = [executor.submit(self.renew_tenant, tenant_id, gateway, now) for tenant_id in tenant_ids]
+            for future in as_completed(futures):
+                try:
+                    result, message = future.result()
+                except Exception as e:
+                    result, message = FAILED, f"Unexpected error: {e}"
+                counts[result] += 1
+                if result == RENEWED:
+                    self.stdout.write(self.style.SUCCESS(message))
+                elif result == SKIPPED:
+                    self.stdout.write(message)
+                else:
+                    self.stdout.write(self.style.WARNING(message))
+
+        elapsed = time.monotonic() - started
+        rate = counts[RENEWED] / elapsed if elapsed else 0
+        if mock_server:
+            mock_server.shutdown()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Successfully processed {counts[RENEWED]} renewals in {elapsed:.2f}s ({rate:.1f} renewals/s). "
+            f"Declined: {counts[DECLINED]}, failed: {counts[FAILED]}, skipped: {counts[SKIPPED]}."
+        ))
+        for provider, metrics in gateway_metrics().items():
+            for endpoint, stats in metrics['endpoints'].items():
+                self.stdout.write(
+                    f"{provider} {endpoint}: {stats['calls']} calls, {stats['errors']} errors, "
+                    f"p50 {stats['p50_ms']:.0f}ms, p95 {stats['p95_ms']:.0f}ms (circuit {metrics['breaker']})"
+                )
+
+    def get_platform_gateway(self, mock=False):
+        gateways = {g.name: g for g in PaymentGateway.objects.filter(tenant=None, is_active=True)}
+        gateway = gateways.get('PAYSTACK') or gateways.get('FLUTTERWAVE')
+        if not gateway and mock:
+            gateway = PaymentGateway(name='PAYSTACK', secret_key='sk_test_mock', is_active=True)
+        return gateway
+
+    def charge(self, gateway, tenant, amount, reference):
+        """
+        Charges the saved authorization. The gateway client retries transient
+        errors with jittered backoff; retries reuse the same reference, so they can't double charge.
+        """
+        return charge_authorization(
+            gateway,
+            tenant.payment_auth_code,
+            tenant.owner.email,
+            amount,
+            tenant.plan.currency,
+            reference,
+            retries=self.retries,
+            backoff=self.backoff,
+            api_base=self.api_base,
+        )
+
+    def write_lock(self):
+        # SQLite allows a single writer; serialize the short write sections
+        # so threads don't fail with "database is locked". Charges stay concurrent.
+        if connection.vendor == 'sqlite':
+            return self._sqlite_write_lock
+        return nullcontext()
+
+    def renew_tenant(self, tenant_id, gateway, now):
+        """
+        Charges and renews one tenant. Runs on a worker thread.
+
+        The charge happens outside any transaction; the gateway reference stops
+        a concurrent run from charging twice, and the result is recorded under
+        the tenant's row lock so only one run writes the invoice and payment.
+        Returns (result, message).
+        """
+        try:
+            tenant = Tenant.objects.select_related('plan', 'owner').get(pk=tenant_id)
+
+            # Renewed by another run since we listed it
+            if not tenant.subscription_end_date or tenant.subscription_end_date > now:
+                return SKIPPED, f"Skipped {tenant.name}: already renewed"
+
+            reference = renewal_reference(tenant)
+            if Payment.objects.filter(transaction_id=reference).exists():
+                return SKIPPED, f"Skipped {tenant.name}: renewal {reference} already recorded"
+
+            # Calculate Amount
+            amount = tenant.plan.price
+            if tenant.billing_cycle == 'yearly':
+                amount *= 12
+
+            try:
+                success = self.charge(gateway, tenant, amount, reference)
+            except TransientGatewayError as e:
+                # Leave the subscription untouched; the next run retries with the same reference
+                return FAILED, f"Gateway unavailable for {tenant.name} after {self.retries} retries: {e}"
+            except GatewayError as e:
+                return FAILED, f"Gateway error for {tenant.name}: {e}"
+
+            with self.write_lock(), transaction.atomic():
+                tenant = Tenant.objects.select_for_update().select_related('plan', 'owner').get(pk=tenant_id)
+                if Payment.objects.filter(transaction_id=reference).exists():
+                    return SKIPPED, f"Skipped {tenant.name}: renewal {reference} recorded by another run"
+                # Another run recorded this attempt's decline, or renewed since
+                if renewal_reference(tenant) != reference:
+                    return SKIPPED, f"Skipped {tenant.name}: attempt {reference} recorded by another run"
+
+                if not success:
+                    # Payment Failed logic; the next run charges under a new reference
+                    tenant.subscription_status = 'past_due'
+                    tenant.renewal_attempts += 1
+                    tenant.save(update_fields=['subscription_status', 'renewal_attempts'])
+                    return DECLINED, f"Payment failed for {tenant.name}"
+
                 invoice = Invoice.objects.create(
                     tenant=tenant,
                     amount=amount,
@@ -42,39 +184,40 @@ class Command(BaseCommand):
                     invoice_type=Invoice.Type.SUBSCRIPTION,
                     due_date=now.date()
                 )
-                
-                # Create Payment
                 Payment.objects.create(
                     invoice=invoice,
                     amount=amount,
-                    payment_method='AUTO_RENEW', # Or gateway name
-                    transaction_id=f"AUTO-{uuid.uuid4().hex[:10]}",
+                    payment_method=gateway.name,
+                    transaction_id=reference,
                     payment_date=now
                 )
-                
+
                 # Extend Subscription
                 days = 365 if tenant.billing_cycle == 'yearly' else 30
                 tenant.subscription_end_date = now + timedelta(days=days)
                 tenant.subscription_status = 'active'
-                tenant.save()
-                
-                # Send Email
-                try:
-                    send_branded_email(
-                        subject=f"Subscription Renewed - {tenant.name}",
-                        message=f"Your subscription for {tenant.plan.name} has been successfully renewed. Amount: {amount}",
-                        recipient_list=[tenant.owner.email],
-                        tenant=None
-                    )
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f"Failed to send email: {e}"))
-                
-                count += 1
-                self.stdout.write(self.style.SUCCESS(f"Renewed {tenant.name}"))
-            else:
-                # Payment Failed logic
-                tenant.subscription_status = 'past_due'
-                tenant.save()
-                self.stdout.write(self.style.WARNING(f"Payment failed for {tenant.name}"))
-
-        self.stdout.write(self.style.SUCCESS(f"Successfully processed {count} renewals."))
+                tenant.renewal_attempts = 0
+                tenant.save(update_fields=['subscription_end_date', 'subscription_status', 'renewal_attempts'])
+
+            self.send_renewal_email(tenant, amount, reference)
+            return RENEWED, f"Renewed {tenant.name} ({reference})"
+        finally:
+            # Each worker thread has its own DB connection
+            connection.close()
+
+    def send_renewal_email(self, tenant, amount, reference):
+        try:
+            send_branded_email(
+                subject=f"Subscription Renewed - {tenant.name}",
+                template_name='emails/subscription_renewed.html',
+                context={
+                    'user': tenant.owner,
+                    'tenant': tenant,
+                    'amount': amount,
+                    'reference': reference,
+                },
+                recipient_list=[tenant.owner.email],
+                tenant=None
+            )
+        except Exception as e:
+            print(f"Failed to send renewal email for {tenant.name}: {e}")
@@ -1,52 +1,83 @@
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils import timezone
 from datetime import timedelta
-from tenants.models import Tenant
+from tenants.models import Tenant, SubscriptionNotice
 from core.models import Notification
-from core.email_utils import send_tenant_email
+from core.notifications import send_notification_emails
+
+# Notification thresholds (days before expiration)
+THRESHOLDS = [7, 3, 1]
+
 
 class Command(BaseCommand):
     help = 'Sends subscription expiration notifications to tenants'
 
     def handle(self, *args, **kwargs):
-        today = timezone.now().date()
-        
-        # Define notification thresholds (days before expiration)
-        thresholds = [7, 3, 1]
-        
-        for days in thresholds:
-            target_date = today + timedelta(days=days)
-            
-            # Find tenants expiring on this target date
-            expiring_tenants = Tenant.objects.filter(
-                subscription_end_date__date=target_date,
-                is_active=True,
-                auto_renew=False # Only notify if they haven't set auto-renew (or notify anyway about charge)
-            )
-            
-            for tenant in expiring_tenants:
-                days_left = (tenant.subscription_end_date.date() - today).days
-                
-                # Send In-App Notification
-                Notification.objects.create(
+        now = timezone.now()
+        today = timezone.localdate(now)
+        target_dates = [today + timedelta(days=days) for days in THRESHOLDS]
+
+        # One query for every threshold
+        expiring_tenants = list(Tenant.objects.filter(
+            subscription_end_date__date__in=target_dates,
+            is_active=True,
+            auto_renew=False # Only notify if they haven't set auto-renew (or notify anyway about charge)
+        ).select_related('owner'))
+
+        if not expiring_tenants:
+            self.stdout.write(self.style.SUCCESS('No subscriptions reaching a notice threshold today'))
+            return
+
+        with transaction.atomic():
+            # Claim the notices; rows that already exist (earlier run) are skipped by the
+            # unique constraint, so only the ones stamped with this run's sent_at are ours.
+            SubscriptionNotice.objects.bulk_create([
+                SubscriptionNotice(
+                    tenant=tenant,
+                    threshold_days=(timezone.localdate(tenant.subscription_end_date) - today).days,
+                    subscription_end_date=timezone.localdate(tenant.subscription_end_date),
+                    sent_at=now,
+                )
+                for tenant in expiring_tenants
+            ], ignore_conflicts=True)
+            claimed = set(SubscriptionNotice.objects.filter(
+                tenant__in=expiring_tenants, sent_at=now
+            ).values_list('tenant_id', flat=True))
+
+            to_notify = [t for t in expiring_tenants if t.pk in claimed]
+            notifications = Notification.objects.bulk_create([
+                Notification(
+                    tenant=tenant,
                     recipient=tenant.owner,
                     title="Subscription Expiring Soon",
-                    message=f"Your subscription for {tenant.name} will expire in {days_left} days. Please renew to avoid service interruption.",
-                    notification_type='warning',
-                    link='/tenant/settings/' 
+                    message=f"Your subscription for {tenant.name} will expire in {(timezone.localdate(tenant.subscription_end_date) - today).days} days. Please renew to avoid service interruption.",
+                    notification_type=Notification.Type.WARNING,
+                    link='/tenant/settings/'
                 )
-                
-                # Send Email
-                self.stdout.write(f"Sending email to {tenant.owner.email} for tenant {tenant.name} (Expiring in {days_left} days)")
-                
-                try:
-                    send_tenant_email(
-                        subject="Subscription Expiration Warning",
-                        message=f"Your plan for {tenant.name} expires in {days_left} days. Please renew to avoid service interruption.",
-                        recipient_list=[tenant.owner.email],
-                        tenant=None # Always use Global/Platform settings for billing emails
-                    )
-                except Exception as e:
-                    self.stdout.write(self.style.ERROR(f"Failed to send email: {e}"))
-
-        self.stdout.write(self.style.SUCCESS('Successfully sent expiration notifications'))
\ No newline at end of file
+                for tenant in to_notify
+            ])
+
+        skipped = len(expiring_tenants) - len(to_notify)
+        for tenant in to_notify:
+            self.stdout.write(f"Notifying {tenant.owner.email} for tenant {tenant.name} (Expiring on {timezone.localdate(tenant.subscription_end_date)})")
+
+        # Always use Global/Platform settings for billing emails; one SMTP connection for the batch
+        sent = send_notification_emails(notifications, tenant=None, subject="Subscription Expiration Warning")
+
+        # Release the claims whose email didn't go out, so the next run retries them
+        emailed = [n for n in notifications if n.recipient.email and n.recipient.wants_immediate_notification_emails]
+        failed = set(Notification.objects.filter(
+            pk__in=[n.pk for n in emailed], emailed_at__isnull=True
+        ).values_list('pk', flat=True))
+        if failed:
+            with transaction.atomic():
+                SubscriptionNotice.objects.filter(
+                    tenant_id__in=[n.tenant_id for n in notifications if n.pk in failed], sent_at=now
+                ).delete()
+                Notification.objects.filter(pk__in=failed).delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Sent {len(notifications) - len(failed)} expiration notifications ({sent} emails), '
+            f'skipped {skipped} already notified, {len(failed)} failed and will be retried'
+        ))
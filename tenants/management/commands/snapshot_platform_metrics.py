@@ -0,0 +1,31 @@
+import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from tenants.metrics import take_platform_snapshot
+
+
+class Command(BaseCommand):
+    help = "Rolls up platform-wide SaaS metrics (MRR, new/churned tenants, rooms, bookings) into today's snapshot"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Snapshot this date instead of today (YYYY-MM-DD)')
+        parser.add_argument('--yesterday', action='store_true', help="Close out yesterday's snapshot (for runs just after midnight)")
+
+    def handle(self, *args, **options):
+        day = None
+        if options['date']:
+            try:
+                day = datetime.date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError("--date must be YYYY-MM-DD")
+        elif options['yesterday']:
+            day = timezone.localdate() - datetime.timedelta(days=1)
+
+        snapshot = take_platform_snapshot(day)
+        mrr = ', '.join(
+            f"{row.plan_name}: {row.mrr:,.2f} {row.currency} ({row.paying_tenants})" for row in snapshot.plans.all()
+        ) or 'none'
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshot {snapshot.date}: {snapshot.active_tenants} active tenants, {snapshot.paying_tenants} paying, "
+            f"{snapshot.new_tenants} new, {snapshot.churned_tenants} churned, {snapshot.bookings} bookings. MRR {mrr}"
+        ))
@@ -0,0 +1,98 @@
+"""
+Platform SaaS metrics rollup.
+
+take_platform_snapshot() computes the day's platform-wide figures with a fixed
+number of aggregate queries and stores them in PlatformMetricsSnapshot /
+PlanMetricsSnapshot. The platform dashboard reads only those rows, so it costs
+the same however many tenants there are.
+"""
+import datetime
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from .models import Tenant, PlatformMetricsSnapshot, PlanMetricsSnapshot
+
+
+def paying_tenants(now=None):
+    """Active tenants on a paid plan whose subscription hasn't lapsed."""
+    now = now or timezone.now()
+    return Tenant.objects.filter(
+        is_active=True,
+        subscription_status='active',
+        plan__price__gt=0,
+        subscription_end_date__gt=now,
+    )
+
+
+def take_platform_snapshot(day=None):
+    """
+    Creates or refreshes the snapshot for `day` (default today): point-in-time
+    figures (tenants, MRR, rooms, users) as of now, flows (new and churned
+    tenants, bookings, subscription revenue) for that day so far.
+    """
+    from accounts.models import User
+    from booking.models import Booking
+    from billing.models import Payment, Invoice
+    from hotel.models import Room
+
+    now = timezone.now()
+    day = day or timezone.localdate(now)
+    start = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+    end = start + datetime.timedelta(days=1)
+
+    tenants = Tenant.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+        new=Count('id', filter=Q(created_at__gte=start, created_at__lt=end)),
+        # Renewals move the end date forward, so an end date inside this day that
+        # has already passed means the paid subscription lapsed
+        churned=Count('id', filter=Q(
+            plan__price__gt=0, subscription_end_date__gte=start,
+            subscription_end_date__lt=min(end, now),
+        )),
+    )
+
+    # MRR per plan: yearly tenants pay 12x the monthly price once a year, so both cycles contribute plan.price
+    plan_rows = list(paying_tenants(now).values('plan_id', 'plan__name', 'plan__currency').annotate(
+        tenant_count=Count('id'), mrr=Sum('plan__price')
+    ).order_by('plan__currency', 'plan__name'))
+
+    subscription_payments = Payment.objects.filter(invoice__invoice_type=Invoice.Type.SUBSCRIPTION).aggregate(
+        today=Sum('amount', filter=Q(payment_date__gte=start, payment_date__lt=end)),
+        lifetime=Sum('amount'),
+    )
+
+    with transaction.atomic():
+        snapshot, _ = PlatformMetricsSnapshot.objects.update_or_create(
+            date=day,
+            defaults={
+                'total_tenants': tenants['total'],
+                'active_tenants': tenants['active'],
+                'paying_tenants': sum(row['tenant_count'] for row in plan_rows),
+                'new_tenants': tenants['new'],
+                'churned_tenants': tenants['churned'],
+                'total_users': User.objects.count(),
+                'rooms_under_management': Room.objects.filter(tenant__is_active=True).count(),
+                'bookings': Booking.objects.filter(created_at__gte=start, created_at__lt=end).count(),
+                'subscription_revenue': subscription_payments['today'] or 0,
+                'lifetime_subscription_revenue': subscription_payments['lifetime'] or 0,
+            },
+        )
+        snapshot.plans.all().delete()
+        PlanMetricsSnapshot.objects.bulk_create([
+            PlanMetricsSnapshot(
+                snapshot=snapshot,
+                plan_id=row['plan_id'],
+                plan_name=row['plan__name'],
+                currency=row['plan__currency'],
+                paying_tenants=row['tenant_count'],
+                mrr=row['mrr'] or 0,
+            )
+            for row in plan_rows
+        ])
+    return snapshot
+
+
+def get_latest_snapshot():
+    """The most recent snapshot, taking one first if none exists yet."""
+    return PlatformMetricsSnapshot.objects.first() or take_platform_snapshot()
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tenants", "0004_tenant_email_tenant_phone_number"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SubscriptionNotice",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("threshold_days", models.PositiveSmallIntegerField()),
+                ("subscription_end_date", models.DateField()),
+                ("sent_at", models.DateTimeField()),
+                (
+                    "tenant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="subscription_notices",
+                        to="tenants.tenant",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {
+                    ("tenant", "threshold_days", "subscription_end_date")
+                },
+            },
+        ),
+    ]
@@ -0,0 +1,105 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tenants", "0005_subscriptionnotice"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PlatformMetricsSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(unique=True)),
+                ("total_tenants", models.PositiveIntegerField(default=0)),
+                ("active_tenants", models.PositiveIntegerField(default=0)),
+                ("paying_tenants", models.PositiveIntegerField(default=0)),
+                ("new_tenants", models.PositiveIntegerField(default=0)),
+                (
+                    "churned_tenants",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Paid subscriptions that lapsed this day without renewal",
+                    ),
+                ),
+                ("total_users", models.PositiveIntegerField(default=0)),
+                ("rooms_under_management", models.PositiveIntegerField(default=0)),
+                (
+                    "bookings",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Bookings created this day across all tenants",
+                    ),
+                ),
+                (
+                    "subscription_revenue",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        help_text="Subscription payments received this day",
+                        max_digits=14,
+                    ),
+                ),
+                (
+                    "lifetime_subscription_revenue",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=16),
+                ),
+                ("created_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "ordering": ["-date"],
+            },
+        ),
+        migrations.CreateModel(
+            name="PlanMetricsSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("plan_name", models.CharField(max_length=50)),
+                ("currency", models.CharField(max_length=3)),
+                ("paying_tenants", models.PositiveIntegerField(default=0)),
+                (
+                    "mrr",
+                    models.DecimalField(decimal_places=2, default=0, max_digits=14),
+                ),
+                (
+                    "plan",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="metric_snapshots",
+                        to="tenants.plan",
+                    ),
+                ),
+                (
+                    "snapshot",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="plans",
+                        to="tenants.platformmetricssnapshot",
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tenants", "0006_platform_metrics_snapshots"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tenant",
+            name="branding_version",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
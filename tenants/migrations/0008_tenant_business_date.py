@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tenants", "0007_tenant_branding_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tenant",
+            name="business_date",
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+    ]
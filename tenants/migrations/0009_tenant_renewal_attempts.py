@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tenants", "0008_tenant_business_date"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tenant",
+            name="renewal_attempts",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -35,6 +35,10 @@ class Tenant(models.Model):
     primary_color = models.CharField(max_length=7, default='#3b82f6')
     secondary_color = models.CharField(max_length=7, default='#1e293b')
     font_family = models.CharField(max_length=50, default='Inter')
+    # Bumped whenever the hotel's TenantSetting changes; keys cached receipts
+    branding_version = models.PositiveIntegerField(default=0, editable=False)
+    # The hotel day still open; the night audit closes it and moves this on
+    business_date = models.DateField(null=True, blank=True, editable=False)
     
     # Subscription/Plan info
     plan = models.ForeignKey(Plan, on_delete=models.SET_NULL, null=True, blank=True, related_name='tenants')
@@ -44,6 +48,8 @@ class Tenant(models.Model):
     subscription_end_date = models.DateTimeField(null=True, blank=True)
     auto_renew = models.BooleanField(default=True)
     payment_auth_code = models.CharField(max_length=255, blank=True, null=True, help_text="Token for recurring payments")
+    # Declined auto-renewal charges this billing period; part of the next charge's reference
+    renewal_attempts = models.PositiveIntegerField(default=0, editable=False)
     billing_cycle = models.CharField(max_length=10, choices=[('monthly', 'Monthly'), ('yearly', 'Yearly')], default='monthly')
 
     # Location
@@ -83,6 +89,55 @@ class Membership(models.Model):
     def __str__(self):
         return f"{self.user} in {self.tenant}"
 
+class SubscriptionNotice(models.Model):
+    """Ledger of subscription expiry warnings already sent, so reruns don't notify twice."""
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, related_name='subscription_notices')
+    threshold_days = models.PositiveSmallIntegerField()
+    subscription_end_date = models.DateField()
+    sent_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('tenant', 'threshold_days', 'subscription_end_date')
+
+    def __str__(self):
+        return f"{self.tenant} - {self.threshold_days} days before {self.subscription_end_date}"
+
+class PlatformMetricsSnapshot(models.Model):
+    """
+    Platform-wide SaaS metrics for one day, written by `manage.py snapshot_platform_metrics`
+    so the platform dashboard never has to scan tenant data.
+    """
+    date = models.DateField(unique=True)
+    total_tenants = models.PositiveIntegerField(default=0)
+    active_tenants = models.PositiveIntegerField(default=0)
+    paying_tenants = models.PositiveIntegerField(default=0)
+    new_tenants = models.PositiveIntegerField(default=0)
+    churned_tenants = models.PositiveIntegerField(default=0, help_text="Paid subscriptions that lapsed this day without renewal")
+    total_users = models.PositiveIntegerField(default=0)
+    rooms_under_management = models.PositiveIntegerField(default=0)
+    bookings = models.PositiveIntegerField(default=0, help_text="Bookings created this day across all tenants")
+    subscription_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, help_text="Subscription payments received this day")
+    lifetime_subscription_revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    created_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-date']
+
+    def __str__(self):
+        return f"Platform metrics {self.date}"
+
+class PlanMetricsSnapshot(models.Model):
+    """MRR and paying tenants per plan (and so per currency) for a PlatformMetricsSnapshot."""
+    snapshot = models.ForeignKey(PlatformMetricsSnapshot, on_delete=models.CASCADE, related_name='plans')
+    plan = models.ForeignKey(Plan, on_delete=models.SET_NULL, null=True, blank=True, related_name='metric_snapshots')
+    plan_name = models.CharField(max_length=50)
+    currency = models.CharField(max_length=3)
+    paying_tenants = models.PositiveIntegerField(default=0)
+    mrr = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.snapshot.date} {self.plan_name}: {self.mrr} {self.currency}"
+
 class TenantAwareModel(models.Model):
     tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE)
 
@@ -7,7 +7,7 @@ from django.urls import reverse_lazy
 from django.db.models import Q
 from .forms import TenantForm, PlanForm
 from .payment_forms import PaymentGatewayForm
-from .models import Tenant, Domain, Membership, Plan
+from .models import Tenant, Domain, Membership, Plan, PlatformMetricsSnapshot
 from billing.models import PaymentGateway, Payment
 from core.models import GlobalSetting, AuditLog
 from core.forms import GlobalSettingForm
@@ -56,12 +56,27 @@ class PlatformFinanceSettingsView(SuperUserRequiredMixin, TemplateView):
         return context
 
 # --- Audit Logs ---
-class PlatformLogListView(SuperUserRequiredMixin, ListView):
-    model = AuditLog
+class PlatformLogListView(SuperUserRequiredMixin, TemplateView):
     template_name = 'platform/log_list.html'
-    context_object_name = 'logs'
-    paginate_by = 50
-    ordering = ['-timestamp']
+
+    def get_context_data(self, **kwargs):
+        from core.audit import audit_page, filter_audit_logs
+
+        context = super().get_context_data(**kwargs)
+        logs = AuditLog.objects.select_related('user', 'tenant')
+        tenant_id = self.request.GET.get('tenant', '')
+        if tenant_id.isdigit():
+            logs = logs.filter(tenant_id=tenant_id)
+        logs = filter_audit_logs(logs, self.request.GET)
+
+        # Keyset pagination: the cursor seeks on (timestamp, id), no OFFSET scans
+        context['logs'], context['next_cursor'] = audit_page(logs, cursor=self.request.GET.get('cursor'))
+        params = self.request.GET.copy()
+        params.pop('cursor', None)
+        context['filter_query'] = params.urlencode()
+        context['tenants'] = Tenant.objects.order_by('name').only('id', 'name')
+        context['actions'] = AuditLog.Action.choices
+        return context
 
 # --- Platform Settings (Payments) ---
 from core.utils import log_audit
@@ -118,20 +133,29 @@ class PlatformGatewayUpdateView(SuperUserRequiredMixin, FormView):
 
 from django.db.models import Sum
 from billing.models import Payment, Invoice
+from .metrics import get_latest_snapshot
 
 # --- Platform Dashboard ---
 @login_required
 @user_passes_test(is_superuser)
 def platform_dashboard(request):
-    total_revenue = Payment.objects.filter(
-        invoice__invoice_type=Invoice.Type.SUBSCRIPTION
-    ).aggregate(Sum('amount'))['amount__sum'] or 0
+    # Platform-wide figures come from the latest metrics snapshot (snapshot_platform_metrics)
+    snapshot = get_latest_snapshot()
+    plan_metrics = list(snapshot.plans.order_by('currency', '-mrr'))
+
+    mrr_by_currency = {}
+    for row in plan_metrics:
+        mrr_by_currency[row.currency] = mrr_by_currency.get(row.currency, 0) + row.mrr
 
     context = {
-        'total_tenants': Tenant.objects.count(),
-        'active_tenants': Tenant.objects.filter(is_active=True).count(),
-        'total_users': User.objects.count(),
-        'total_revenue': total_revenue,
+        'snapshot': snapshot,
+        'total_tenants': snapshot.total_tenants,
+        'active_tenants': snapshot.active_tenants,
+        'total_users': snapshot.total_users,
+        'total_revenue': snapshot.lifetime_subscription_revenue,
+        'mrr_by_currency': mrr_by_currency,
+        'plan_metrics': plan_metrics,
+        'metrics_trend': PlatformMetricsSnapshot.objects.all()[:14],
         'recent_tenants': Tenant.objects.order_by('-created_at')[:5],
         'recent_users': User.objects.order_by('-date_joined')[:5],
         'recent_transactions': Payment.objects.filter(
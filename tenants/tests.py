@@ -0,0 +1,93 @@
+import datetime
+import shutil
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+from django.utils import timezone
+from billing.gateway_client import reset_clients
+from billing.mock_gateway import start_mock_gateway
+from billing.models import Invoice, Payment, PaymentGateway
+from tenants.management.commands.process_auto_renewals import renewal_reference
+from tenants.models import Plan, Tenant
+
+User = get_user_model()
+
+
+class AutoRenewalTests(TransactionTestCase):
+    """process_auto_renewals against billing.mock_gateway; workers need committed data."""
+
+    def setUp(self):
+        reset_clients()
+        self.gateway_server = start_mock_gateway()
+        self.media_root = tempfile.mkdtemp()
+        settings_override = override_settings(
+            PAYSTACK_API_BASE=self.gateway_server.base_url, MEDIA_ROOT=self.media_root, TASKS_ALWAYS_EAGER=True,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.media_root, True)
+        self.addCleanup(self.gateway_server.server_close)
+        self.addCleanup(self.gateway_server.shutdown)
+        self.addCleanup(reset_clients)
+
+        PaymentGateway.objects.create(name='PAYSTACK', public_key='pk', secret_key='sk', is_active=True)
+        plan = Plan.objects.create(name='Basic', price=Decimal('100.00'))
+        owner = User.objects.create_user('owner', 'owner@example.com', 'x')
+        self.expired_at = timezone.now() - datetime.timedelta(hours=1)
+        self.tenant = Tenant.objects.create(
+            name='Hotel', slug='hotel', owner=owner, plan=plan, payment_auth_code='AUTH_card',
+            subscription_end_date=self.expired_at,
+        )
+
+    def renew(self):
+        call_command('process_auto_renewals', workers=2, retries=0, backoff=0, stdout=StringIO())
+        self.tenant.refresh_from_db()
+
+    def test_renewal_charges_once_and_extends_subscription(self):
+        reference = renewal_reference(self.tenant)
+        self.renew()
+        self.assertGreater(self.tenant.subscription_end_date, timezone.now())
+        self.assertEqual(Payment.objects.get(transaction_id=reference).amount, Decimal('100.00'))
+
+        self.renew()
+        self.assertEqual(Payment.objects.filter(transaction_id=reference).count(), 1)
+        self.assertEqual(len(self.gateway_server.charges), 1)
+
+    def test_rerun_after_unrecorded_charge_reuses_the_reference(self):
+        # A run that charged the card but died before recording it
+        reference = renewal_reference(self.tenant)
+        self.gateway_server.record_charge('PAYSTACK', reference, 'AUTH_card', 10000, 'NGN')
+
+        self.renew()
+        self.assertEqual(Payment.objects.filter(transaction_id=reference).count(), 1)
+        self.assertEqual(len(self.gateway_server.charges), 1)
+        self.assertEqual(self.tenant.subscription_status, 'active')
+
+    def test_declined_card_marks_subscription_past_due(self):
+        Tenant.objects.filter(pk=self.tenant.pk).update(payment_auth_code='DECLINE_card')
+        self.renew()
+        self.assertEqual(self.tenant.subscription_status, 'past_due')
+        self.assertEqual(self.tenant.subscription_end_date, self.expired_at)
+        self.assertFalse(Invoice.objects.filter(invoice_type=Invoice.Type.SUBSCRIPTION).exists())
+
+    def test_renewal_is_retried_after_a_decline(self):
+        # A card without funds, topped up before the next run
+        self.gateway_server.declined_tokens.add('AUTH_card')
+        declined = renewal_reference(self.tenant)
+        self.renew()
+        self.assertEqual(self.tenant.subscription_status, 'past_due')
+
+        self.gateway_server.declined_tokens.clear()
+        self.renew()
+        self.assertEqual(self.tenant.subscription_status, 'active')
+        self.assertGreater(self.tenant.subscription_end_date, timezone.now())
+        payment = Payment.objects.get(invoice__tenant=self.tenant)
+        self.assertNotEqual(payment.transaction_id, declined)
+        self.assertEqual(len(self.gateway_server.charges), 2)
+
+        self.renew()
+        self.assertEqual(Payment.objects.filter(invoice__tenant=self.tenant).count(), 1)
+        self.assertEqual(len(self.gateway_server.charges), 2)
@@ -3,6 +3,8 @@ from django.core.exceptions import PermissionDenied
 from django.shortcuts import redirect
 from django.contrib import messages
 from functools import wraps
+from urllib.parse import urlsplit
+from django.conf import settings
 
 _thread_locals = local()
 
@@ -12,6 +14,18 @@ def get_current_tenant():
 def set_current_tenant(tenant):
     _thread_locals.tenant = tenant
 
+def tenant_base_url(tenant):
+    """
+    Absolute base URL of a tenant's site outside a request: its primary custom
+    domain, else its subdomain of SITE_URL (as TenantMiddleware resolves them).
+    """
+    site = urlsplit(getattr(settings, 'SITE_URL', 'http://localhost:8000'))
+    domain = tenant.domains.order_by('-is_primary', 'pk').values_list('domain', flat=True).first()
+    if domain:
+        return f"{site.scheme}://{domain}"
+    host = f"{tenant.subdomain}.{site.hostname}" if tenant.subdomain else site.hostname
+    return f"{site.scheme}://{host}{f':{site.port}' if site.port else ''}"
+
 def has_tenant_permission(user, tenant, required_roles):
     """
     Checks if user has a membership in the tenant with one of the required roles.
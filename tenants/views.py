@@ -295,32 +295,17 @@ def process_payment(request, tenant_id):
         # We need to fetch the platform gateway credentials (tenant=None)
         
         from billing.models import PaymentGateway
-        import requests
+        from billing.gateways import GatewayError, verify_transaction
         
-        try:
-            if gateway_name == 'PAYSTACK':
-                gateway = PaymentGateway.objects.filter(tenant=None, name='PAYSTACK', is_active=True).first()
-                if gateway and gateway.secret_key:
-                    headers = {'Authorization': f'Bearer {gateway.secret_key}'}
-                    response = requests.get(f'https://api.paystack.co/transaction/verify/{reference}', headers=headers)
-                    if response.status_code == 200:
-                        data = response.json()
-                        if data['status'] and data['data']['status'] == 'success':
-                            success = True
-                            
-            elif gateway_name == 'FLUTTERWAVE':
-                gateway = PaymentGateway.objects.filter(tenant=None, name='FLUTTERWAVE', is_active=True).first()
-                if gateway and gateway.secret_key:
-                    headers = {'Authorization': f'Bearer {gateway.secret_key}'}
-                    response = requests.get(f'https://api.flutterwave.com/v3/transactions/{reference}/verify', headers=headers)
-                    if response.status_code == 200:
-                        data = response.json()
-                        if data['status'] == 'success':
-                            success = True
-        except Exception as e:
-            print(f"Payment Verification Error: {e}")
-            # Fallback to False if verification fails/errors out
-            success = False
+        if gateway_name in PaymentGateway.Provider.values:
+            gateway = PaymentGateway.objects.filter(tenant=None, name=gateway_name, is_active=True).first()
+            if gateway and gateway.secret_key:
+                try:
+                    success = verify_transaction(gateway, reference)
+                except GatewayError as e:
+                    print(f"Payment Verification Error: {e}")
+                    # Fallback to False if verification fails/errors out
+                    success = False
             
         # success = True # REMOVE THIS IN PRODUCTION - Only for dev if APIs fail
         # For now, if no gateway is configured, we might want to allow dev bypass?